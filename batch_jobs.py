@@ -0,0 +1,98 @@
+"""
+Background jobs for large /ask/batch requests
+Jobs run in a thread and collect results as they complete so clients can poll
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+import config
+
+
+class BatchJob:
+    """State of one batch question-answering job"""
+
+    def __init__(self, questions: List[str], top_k: Optional[int]):
+        self.job_id = uuid.uuid4().hex
+        self.questions = questions
+        self.top_k = top_k
+        self.status = "pending"
+        self.results: List[Dict] = []
+        self.error: Optional[str] = None
+        self.created_at = datetime.now().isoformat()
+        self.finished_at: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def to_dict(self, offset: int = 0) -> Dict:
+        """Job status plus results completed so far, starting at `offset` in completion order"""
+        with self.lock:
+            return {
+                'job_id': self.job_id,
+                'status': self.status,
+                'total': len(self.questions),
+                'completed': len(self.results),
+                'created_at': self.created_at,
+                'finished_at': self.finished_at,
+                'error': self.error,
+                'results': list(self.results[offset:])
+            }
+
+
+class BatchJobStore:
+    """In-memory registry of batch jobs; keeps the most recent finished jobs"""
+
+    def __init__(self, retention: int = None):
+        self.retention = retention or config.BATCH_JOB_RETENTION
+        self._jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, engine, questions: List[str], top_k: Optional[int]) -> BatchJob:
+        """Create a job and start answering its questions in the background"""
+        job = BatchJob(questions, top_k)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict()
+        threading.Thread(target=self._run, args=(engine, job), name=f"batch-{job.job_id[:8]}", daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("completed", "failed")]
+        for job_id in finished[:max(0, len(self._jobs) - self.retention)]:
+            del self._jobs[job_id]
+
+    def _run(self, engine, job: BatchJob):
+        job.status = "running"
+        try:
+            for index, result, error in engine.answer_questions(job.questions, top_k=job.top_k):
+                item = format_batch_result(job.questions, index, result, error)
+                with job.lock:
+                    job.results.append(item)
+            job.status = "completed"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        job.finished_at = datetime.now().isoformat()
+
+
+def format_batch_result(questions: List[str], index: int, result: Optional[Dict], error: Optional[Exception]) -> Dict:
+    """One batch result line, shaped like an /ask response plus its index"""
+    if error is not None:
+        return {
+            'index': index,
+            'question': questions[index],
+            'error': str(error)
+        }
+    return {
+        'index': index,
+        'question': questions[index],
+        'answer': result['answer'],
+        'sources': result['sources'],
+        'context_used': result['context_used'],
+        'answer_path': result.get('answer_path')
+    }
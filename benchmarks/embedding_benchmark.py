@@ -0,0 +1,99 @@
+"""
+Local embedding benchmark: texts/s on CPU for float32 vs. int8 weights,
+across inference batch sizes and thread counts
+Texts are chunk-sized passages from the synthetic site. Point --model-dir at
+an ONNX export holding model.onnx and tokenizer.json.
+
+Examples:
+  python benchmarks/embedding_benchmark.py
+  python benchmarks/embedding_benchmark.py --texts 2000 --batch-sizes 1 16 64 --threads 1 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_site import generate_site
+import html_extract
+
+
+def build_texts(num_texts: int, words_per_text: int) -> List[str]:
+    """Passages of about `words_per_text` words cut from the synthetic site's pages"""
+    texts = []
+    pages = max(1, num_texts * words_per_text // 500 + 1)
+    for path, html in generate_site(pages).items():
+        words = html_extract.extract_page(html.encode('utf-8'), f"http://fixture.local{path}")['text'].split()
+        for i in range(0, len(words) - words_per_text + 1, words_per_text):
+            texts.append(" ".join(words[i:i + words_per_text]))
+    return (texts * (num_texts // max(1, len(texts)) + 1))[:num_texts]
+
+
+def bench_embed(texts: List[str], model_dir: str, quantize: bool, batch_size: int, threads: int) -> Dict:
+    """Texts/s for embedding every text once (after a warm-up call)"""
+    from embeddings import LocalEmbeddingProvider
+
+    provider = LocalEmbeddingProvider(model_dir, batch_size=batch_size, threads=threads, quantize=quantize)
+    provider.embed(texts[:batch_size])
+    start = time.perf_counter()
+    provider.embed(texts)
+    elapsed = time.perf_counter() - start
+    return {
+        'weights': 'int8' if quantize else 'fp32',
+        'batch_size': batch_size,
+        'threads': threads,
+        'texts': len(texts),
+        'seconds': elapsed,
+        'texts_per_second': len(texts) / elapsed if elapsed else 0.0
+    }
+
+
+def print_table(title: str, rows: List[Dict]):
+    print(f"\n{title}")
+    print(f"{'weights':8s} {'batch':>6s} {'threads':>8s} {'texts':>7s} {'seconds':>9s} {'texts/s':>10s}")
+    for row in rows:
+        print(f"{row['weights']:8s} {row['batch_size']:6d} {row['threads']:8d} {row['texts']:7d} "
+              f"{row['seconds']:9.2f} {row['texts_per_second']:10.1f}")
+
+
+def main():
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    import config
+
+    parser = argparse.ArgumentParser(description='Benchmark local embedding throughput on CPU')
+    parser.add_argument('--model-dir', type=str, default=config.LOCAL_EMBEDDING_MODEL_DIR,
+                        help='Directory with model.onnx and tokenizer.json')
+    parser.add_argument('--texts', type=int, default=500, help='Passages to embed per run')
+    parser.add_argument('--words-per-text', type=int, default=300, help='Words per passage (about a chunk)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32], help='Inference batch sizes')
+    parser.add_argument('--threads', type=int, nargs='+', default=sorted({1, config.LOCAL_EMBEDDING_THREADS}),
+                        help='Thread pool sizes')
+    parser.add_argument('--output', '-o', type=str, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    texts = build_texts(args.texts, args.words_per_text)
+    print(f"Embedding {len(texts)} passages of {args.words_per_text} words with {args.model_dir} "
+          f"({os.cpu_count()} CPUs)")
+
+    results = [
+        bench_embed(texts, args.model_dir, quantize, batch_size, threads)
+        for quantize in (False, True)
+        for threads in args.threads
+        for batch_size in args.batch_sizes
+    ]
+    print_table("Local embedding throughput", results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'params': vars(args), 'results': results}, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
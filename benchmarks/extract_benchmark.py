@@ -0,0 +1,119 @@
+"""
+HTML extraction benchmark: BeautifulSoup vs. the lxml fast path, inline vs. a process pool
+Parses a fixture corpus from the synthetic site, then optionally crawls it
+end to end so the effect of overlapping extraction with fetching shows up
+
+Examples:
+  python benchmarks/extract_benchmark.py
+  python benchmarks/extract_benchmark.py --pages 1000 --workers 4 --crawl --site-latency-ms 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_site import generate_site, start_site
+import html_extract
+
+
+def build_corpus(num_pages: int, words_per_page: int) -> List[Tuple[bytes, str]]:
+    """(html, url) pairs for every page of the synthetic site"""
+    site = generate_site(num_pages, words_per_page=words_per_page)
+    return [(html.encode('utf-8'), f"http://fixture.local{path}") for path, html in site.items()]
+
+
+def bench_parse(corpus: List[Tuple[bytes, str]], fast: bool, workers: int) -> Dict:
+    """Pages/s for extracting the whole corpus, inline or in a process pool"""
+    start = time.perf_counter()
+    if workers <= 0:
+        for html, url in corpus:
+            html_extract.extract_page(html, url, fast)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            htmls = [html for html, _ in corpus]
+            urls = [url for _, url in corpus]
+            list(pool.map(html_extract.extract_page, htmls, urls, [fast] * len(corpus), chunksize=8))
+    elapsed = time.perf_counter() - start
+    return {
+        'parser': 'lxml' if fast else 'soup',
+        'workers': workers,
+        'pages': len(corpus),
+        'seconds': elapsed,
+        'pages_per_second': len(corpus) / elapsed if elapsed else 0.0
+    }
+
+
+def bench_crawl(num_pages: int, latency_ms: float, words_per_page: int, fast: bool, workers: int) -> Dict:
+    """Pages/s for a full crawl of the local site"""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    import config
+    from crawler import WebCrawler
+
+    # No politeness delay against the local site
+    config.REQUEST_DELAY = 0
+    site, site_url = start_site(num_pages, latency_ms=latency_ms, words_per_page=words_per_page)
+    try:
+        crawler = WebCrawler(site_url, num_pages, extract_workers=workers, fast_extract=fast)
+        start = time.perf_counter()
+        pages = crawler.crawl()
+        elapsed = time.perf_counter() - start
+    finally:
+        site.shutdown()
+    return {
+        'parser': 'lxml' if fast else 'soup',
+        'workers': workers,
+        'pages': len(pages),
+        'seconds': elapsed,
+        'pages_per_second': len(pages) / elapsed if elapsed else 0.0
+    }
+
+
+def print_table(title: str, rows: List[Dict]):
+    print(f"\n{title}")
+    print(f"{'parser':8s} {'workers':>8s} {'pages':>7s} {'seconds':>9s} {'pages/s':>10s}")
+    for row in rows:
+        print(f"{row['parser']:8s} {row['workers']:8d} {row['pages']:7d} "
+              f"{row['seconds']:9.2f} {row['pages_per_second']:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTML extraction throughput')
+    parser.add_argument('--pages', type=int, default=500, help='Fixture corpus size')
+    parser.add_argument('--words-per-page', type=int, default=600, help='Body words per fixture page')
+    parser.add_argument('--workers', type=int, default=4, help='Extraction processes for the pooled runs')
+    parser.add_argument('--crawl', action='store_true', help='Also crawl the synthetic site end to end')
+    parser.add_argument('--site-latency-ms', type=float, default=0, help='Synthetic site response latency')
+    parser.add_argument('--output', '-o', type=str, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.pages, args.words_per_page)
+    megabytes = sum(len(html) for html, _ in corpus) / 1e6
+    print(f"Fixture corpus: {len(corpus)} pages, {megabytes:.1f} MB")
+
+    variants = [(False, 0), (True, 0), (False, args.workers), (True, args.workers)]
+    results = {'parse': [bench_parse(corpus, fast, workers) for fast, workers in variants]}
+    print_table("Extraction only", results['parse'])
+
+    if args.crawl:
+        results['crawl'] = [
+            bench_crawl(args.pages, args.site_latency_ms, args.words_per_page, fast, workers)
+            for fast, workers in variants
+        ]
+        print_table("End-to-end crawl", results['crawl'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'params': vars(args), 'results': results}, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
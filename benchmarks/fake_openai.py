@@ -0,0 +1,253 @@
+"""
+Local OpenAI stand-in for offline benchmarks
+Serves /v1/embeddings and /v1/chat/completions with deterministic output
+and configurable latency, so the real client code can run without network
+
+Embeddings are hashed bag-of-words vectors: texts sharing words get similar
+vectors, which keeps retrieval results meaningful for evaluation runs.
+
+Chat completions can also be streamed (`"stream": true`): the first token
+arrives after the chat latency, then one word per token latency. With
+--max-concurrency the server handles that many completions at once and
+queues the rest, like a local model server with a fixed number of slots.
+
+Example:
+  python benchmarks/fake_openai.py --port 8100 --embed-latency-ms 20 --chat-latency-ms 300
+  OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=sk-fake python main.py
+
+  # As a local model server
+  python benchmarks/fake_openai.py --port 8080 --token-latency-ms 20 --max-concurrency 4
+  GENERATION_PROVIDER=local LOCAL_LLM_BASE_URL=http://127.0.0.1:8080/v1 python main.py
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashedEmbedder:
+    """Deterministic bag-of-words embedder"""
+
+    def __init__(self, dimensions: int = 1536):
+        self.dimensions = dimensions
+        self._word_vectors: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.sha256(word.encode('utf-8')).digest()[:8], 'little')
+            vector = np.random.default_rng(seed).standard_normal(self.dimensions).astype(np.float32)
+            with self._lock:
+                self._word_vectors[word] = vector
+        return vector
+
+    def embed(self, text: str) -> List[float]:
+        words = WORD_RE.findall(text.lower()) or [""]
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in words:
+            vector += self._word_vector(word)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Implements the subset of the OpenAI HTTP API used by the bot"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {"object": "list", "data": [
+                {"id": self.server.chat_model, "object": "model", "owned_by": "benchmark"}
+            ]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.endswith('/embeddings'):
+            self._handle_embeddings(request)
+        elif self.path.endswith('/chat/completions'):
+            self._handle_chat(request)
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def _handle_embeddings(self, request: Dict):
+        inputs = request.get('input', [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        time.sleep(self.server.embed_latency)
+        self.server.record("embeddings", len(inputs))
+
+        data = [
+            {"object": "embedding", "index": i, "embedding": self.server.embedder.embed(text)}
+            for i, text in enumerate(inputs)
+        ]
+        tokens = sum(count_tokens(text) for text in inputs)
+        self._send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": request.get('model', 'fake-embedding'),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        })
+
+    def _write_chunk(self, data: bytes, last: bool = False):
+        """One chunk of a chunked-encoding response, with the terminating chunk if `last`"""
+        payload = f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n"
+        # Clients stop reading at [DONE]; sending the terminator with it lets them reuse the connection
+        self.wfile.write(payload + b"0\r\n\r\n" if last else payload)
+        self.wfile.flush()
+
+    def _stream_chat(self, request: Dict, answer: str):
+        """Server-sent events in the OpenAI chunk format, one word per chunk"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(self.server.chat_latency)
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.token_latency)
+            chunk = {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get('model', self.server.chat_model),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else " " + word},
+                    "finish_reason": "stop" if i == len(words) - 1 else None
+                }]
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        self._write_chunk(b"data: [DONE]\n\n", last=True)
+
+    def _handle_chat(self, request: Dict):
+        with self.server.slots:
+            self._complete_chat(request)
+
+    def _complete_chat(self, request: Dict):
+        messages = request.get('messages', [])
+        prompt = "\n".join(str(m.get('content', '')) for m in messages)
+        if "Latest question:" in prompt:
+            # Follow-up rewriting: echo the question as the standalone query
+            answer = prompt.rsplit("Latest question:", 1)[-1].strip()
+        else:
+            question = prompt.rsplit("Question:", 1)[-1].split("\n", 1)[0].strip() or "your question"
+            answer = f"Based on the provided context, here is the answer to: {question}"
+
+        self.server.record("chat", 1)
+        if request.get('stream'):
+            self._stream_chat(request, answer)
+            return
+
+        # Without streaming the whole answer is generated before responding
+        time.sleep(self.server.chat_latency + self.server.token_latency * (len(answer.split(" ")) - 1))
+
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(answer)
+        self._send_json(200, {
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get('model', self.server.chat_model),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], embed_latency_ms: float, chat_latency_ms: float,
+                 dimensions: int, chat_model: str = "gpt-3.5-turbo", token_latency_ms: float = 0,
+                 max_concurrency: int = 0):
+        super().__init__(address, FakeOpenAIHandler)
+        self.embed_latency = embed_latency_ms / 1000.0
+        self.chat_latency = chat_latency_ms / 1000.0
+        self.token_latency = token_latency_ms / 1000.0
+        # Completions beyond max_concurrency wait for a free slot
+        self.slots = threading.Semaphore(max_concurrency) if max_concurrency > 0 else contextlib.nullcontext()
+        self.embedder = HashedEmbedder(dimensions)
+        self.chat_model = chat_model
+        self.request_counts = {"embeddings": 0, "embedded_inputs": 0, "chat": 0}
+        self._counts_lock = threading.Lock()
+
+    def record(self, kind: str, items: int):
+        with self._counts_lock:
+            self.request_counts[kind] += 1
+            if kind == "embeddings":
+                self.request_counts["embedded_inputs"] += items
+
+
+def start_server(port: int = 0, embed_latency_ms: float = 20, chat_latency_ms: float = 300,
+                 dimensions: int = 1536, token_latency_ms: float = 0,
+                 max_concurrency: int = 0) -> Tuple[FakeOpenAIServer, str]:
+    """Start the stand-in in a background thread; returns (server, base_url)"""
+    server = FakeOpenAIServer(("127.0.0.1", port), embed_latency_ms, chat_latency_ms, dimensions,
+                              token_latency_ms=token_latency_ms, max_concurrency=max_concurrency)
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local OpenAI-compatible stand-in')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--embed-latency-ms', type=float, default=20)
+    parser.add_argument('--chat-latency-ms', type=float, default=300)
+    parser.add_argument('--dimensions', type=int, default=1536)
+    parser.add_argument('--token-latency-ms', type=float, default=0, help='Delay per generated word')
+    parser.add_argument('--max-concurrency', type=int, default=0, help='Completions served at once (0 = unlimited)')
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.port, args.embed_latency_ms, args.chat_latency_ms, args.dimensions,
+                                    args.token_latency_ms, args.max_concurrency)
+    print(f"Fake OpenAI API listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
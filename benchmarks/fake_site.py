@@ -0,0 +1,151 @@
+"""
+Synthetic website for offline crawl benchmarks
+Generates a deterministic set of linked HTML pages (with nav, header,
+footer and scripts to strip, plus a cookie banner and sidebar repeated on
+every page) and serves them from a local HTTP server
+
+Example:
+  python benchmarks/fake_site.py --pages 500 --port 8200
+  python indexer.py --url http://127.0.0.1:8200/ --max-pages 500 --reset
+"""
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+
+TOPICS = {
+    "pricing": "plan price cost monthly annual discount invoice billing free trial upgrade",
+    "support": "contact email ticket chat hours response team help phone escalate",
+    "account": "login password reset profile settings security twofactor username delete",
+    "features": "dashboard reports export integration api automation alerts workflow sync",
+    "install": "download install requirements windows mac linux version update setup",
+    "privacy": "data privacy gdpr retention encryption compliance cookies consent policy",
+}
+FILLER = (
+    "the a to of and for with your you our this that can will is are on in by "
+    "when how what which more each any all from use using also then after before"
+).split()
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><title>{title}</title>
+<script>window.analytics = {{ page: "{path}" }};</script>
+<style>body {{ font-family: sans-serif; }}</style>
+</head>
+<body>
+<header><a href="/">Home</a> | Sign in | Start free trial</header>
+<nav>{nav}</nav>
+<div class="cookie-banner">We use cookies to improve your experience on our site. By continuing to browse you agree to our use of cookies. Accept all cookies or manage your preferences.</div>
+<main>
+<h1>{title}</h1>
+{body}
+<p>Related: {related}</p>
+</main>
+<aside>Need help getting started? Our customer success team is available around the clock to answer your questions. Book a free onboarding session today and get the most out of every feature.</aside>
+<footer>Copyright Example Corp. All rights reserved. Privacy | Terms | Cookies</footer>
+</body>
+</html>
+"""
+
+
+def _paragraph(rng: random.Random, topic_words: list, words: int) -> str:
+    tokens = [
+        rng.choice(topic_words) if rng.random() < 0.35 else rng.choice(FILLER)
+        for _ in range(words)
+    ]
+    return "<p>" + " ".join(tokens).capitalize() + ".</p>"
+
+
+def generate_site(num_pages: int = 200, words_per_page: int = 600, links_per_page: int = 5,
+                  seed: int = 42) -> Dict[str, str]:
+    """Return a mapping of URL path -> HTML for a linked synthetic site"""
+    rng = random.Random(seed)
+    topic_names = sorted(TOPICS)
+    paths = ["/"] + [f"/{topic_names[i % len(topic_names)]}/page-{i}" for i in range(1, num_pages)]
+    nav = " ".join(
+        f'<a href="{paths[i + 1]}">{name.title()}</a>' for i, name in enumerate(topic_names) if i + 1 < len(paths)
+    )
+
+    pages = {}
+    for i, path in enumerate(paths):
+        topic = topic_names[i % len(topic_names)]
+        topic_words = TOPICS[topic].split()
+        body = "\n".join(
+            _paragraph(rng, topic_words, 60) for _ in range(max(1, words_per_page // 60))
+        )
+        # Link forward so a breadth-first crawl can reach every page
+        targets = [paths[(i + k) % len(paths)] for k in range(1, links_per_page + 1)]
+        related = " ".join(f'<a href="{target}">{target}</a>' for target in targets)
+        pages[path] = PAGE_TEMPLATE.format(
+            title=f"{topic.title()} guide {i}",
+            path=path,
+            nav=nav,
+            body=body,
+            related=related
+        )
+    return pages
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid the delayed-ACK stall on keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        html = self.server.pages.get(self.path.split('?')[0].split('#')[0])
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if html is None:
+            body = b"Not found"
+            self.send_response(404)
+        else:
+            body = html.encode('utf-8')
+            self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], pages: Dict[str, str], latency_ms: float):
+        super().__init__(address, SiteHandler)
+        self.pages = pages
+        self.latency = latency_ms / 1000.0
+
+
+def start_site(num_pages: int = 200, port: int = 0, latency_ms: float = 0,
+               words_per_page: int = 600) -> Tuple[SiteServer, str]:
+    """Serve a synthetic site in a background thread; returns (server, base_url)"""
+    server = SiteServer(("127.0.0.1", port), generate_site(num_pages, words_per_page), latency_ms)
+    threading.Thread(target=server.serve_forever, name="fake-site", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic website for crawl benchmarks')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--words-per-page', type=int, default=600)
+    parser.add_argument('--port', type=int, default=8200)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    server, base_url = start_site(args.pages, args.port, args.latency_ms, args.words_per_page)
+    print(f"Synthetic site with {args.pages} pages at {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Generation capacity benchmark: answers/s, time to first token and total
+latency for streamed completions at increasing client concurrency
+Runs against the local stand-in (a model server with a fixed number of
+slots) unless --base-url points at a real OpenAI-compatible server, so the
+provider's concurrency limit can be sized offline.
+
+Examples:
+  python benchmarks/generation_benchmark.py
+  python benchmarks/generation_benchmark.py --server-slots 4 --limit 4 --concurrency 1 4 16
+  python benchmarks/generation_benchmark.py --base-url http://127.0.0.1:8080/v1 --model llama --limit 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openai import start_server
+from run_benchmarks import percentile
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful customer support assistant."},
+    {"role": "user", "content": "Context:\nOrders ship within two days.\n\nQuestion: How fast do orders ship?"}
+]
+
+
+def bench_concurrency(provider, concurrency: int, requests: int, max_tokens: int) -> Dict:
+    """Stream `requests` completions from `concurrency` clients at once"""
+    from generation import GenerationBusy
+
+    def one(_) -> Dict:
+        start = time.perf_counter()
+        try:
+            first = None
+            for _text in provider.stream(MESSAGES, max_tokens=max_tokens):
+                if first is None:
+                    first = time.perf_counter() - start
+            return {'ttft': first, 'total': time.perf_counter() - start}
+        except GenerationBusy:
+            return {'busy': True}
+        except Exception as e:
+            return {'error': str(e)}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    done = [o for o in outcomes if 'total' in o]
+    ttfts = sorted(o['ttft'] for o in done if o['ttft'] is not None)
+    totals = sorted(o['total'] for o in done)
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'completed': len(done),
+        'busy': sum(1 for o in outcomes if o.get('busy')),
+        'errors': sum(1 for o in outcomes if 'error' in o),
+        'answers_per_second': len(done) / elapsed if elapsed else 0.0,
+        'ttft_p50_ms': percentile(ttfts, 50) * 1000,
+        'ttft_p95_ms': percentile(ttfts, 95) * 1000,
+        'total_p50_ms': percentile(totals, 50) * 1000,
+        'total_p95_ms': percentile(totals, 95) * 1000
+    }
+
+
+def print_table(rows: List[Dict]):
+    print(f"\n{'clients':>7s} {'done':>6s} {'busy':>5s} {'errors':>6s} {'ans/s':>8s} "
+          f"{'ttft p50':>9s} {'ttft p95':>9s} {'total p50':>10s} {'total p95':>10s}")
+    for row in rows:
+        print(f"{row['concurrency']:7d} {row['completed']:6d} {row['busy']:5d} {row['errors']:6d} "
+              f"{row['answers_per_second']:8.1f} {row['ttft_p50_ms']:9.0f} {row['ttft_p95_ms']:9.0f} "
+              f"{row['total_p50_ms']:10.0f} {row['total_p95_ms']:10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streamed generation capacity')
+    parser.add_argument('--base-url', type=str, default=None,
+                        help='OpenAI-compatible server to measure (default: start the local stand-in)')
+    parser.add_argument('--model', type=str, default='local-model', help='Model name sent to the server')
+    parser.add_argument('--server-slots', type=int, default=4, help="Stand-in's concurrent completions")
+    parser.add_argument('--first-token-ms', type=float, default=200, help="Stand-in's time to first token")
+    parser.add_argument('--token-latency-ms', type=float, default=20, help="Stand-in's delay per word")
+    parser.add_argument('--limit', type=int, default=0, help='GENERATION_MAX_CONCURRENCY for the provider')
+    parser.add_argument('--queue-timeout', type=float, default=30, help='GENERATION_QUEUE_TIMEOUT for the provider')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16], help='Client concurrency levels')
+    parser.add_argument('--requests', type=int, default=32, help='Completions per level')
+    parser.add_argument('--max-tokens', type=int, default=500)
+    parser.add_argument('--output', '-o', type=str, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    from generation import LocalGenerationProvider
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_server(chat_latency_ms=args.first_token_ms, token_latency_ms=args.token_latency_ms,
+                                        max_concurrency=args.server_slots)
+        print(f"Stand-in model server: {args.server_slots} slots, {args.first_token_ms:g} ms to first token, "
+              f"{args.token_latency_ms:g} ms per word")
+
+    provider = LocalGenerationProvider(base_url, args.model, max_concurrency=args.limit,
+                                       queue_timeout=args.queue_timeout)
+    print(f"Provider limit: {args.limit or 'unlimited'} in flight, {args.queue_timeout:g}s queue timeout")
+    try:
+        results = [bench_concurrency(provider, c, args.requests, args.max_tokens) for c in args.concurrency]
+    finally:
+        # Close pooled connections first so the stand-in sees clean disconnects
+        provider.client.close()
+        if server is not None:
+            server.shutdown()
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'params': vars(args), 'results': results}, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Import-time benchmark: how long `import main` takes in a fresh interpreter
+Uses `python -X importtime` and reports the total plus the slowest modules
+
+Examples:
+  python benchmarks/import_time.py
+  python benchmarks/import_time.py --module main --max-ms 800 --output import_time.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module: str) -> List[Dict]:
+    """Import a module in a fresh interpreter and parse the -X importtime report"""
+    env = dict(os.environ)
+    # Import must not depend on real credentials
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    env["WARMUP_ON_STARTUP"] = "false"
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # Format: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            'module': name.strip(),
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us)
+        })
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time of the API module')
+    parser.add_argument('--module', type=str, default='main', help='Module to import (default: main)')
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh-interpreter runs')
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest modules to list')
+    parser.add_argument('--max-ms', type=float, default=None, help='Exit non-zero if the median exceeds this')
+    parser.add_argument('--output', '-o', type=str, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    totals = []
+    slowest = {}
+    for _ in range(args.runs):
+        entries = measure_import(args.module)
+        top_level = [e for e in entries if e['module'] == args.module]
+        totals.append(top_level[-1]['cumulative_us'] / 1000.0 if top_level else 0.0)
+        for entry in entries:
+            name = entry['module']
+            slowest[name] = min(slowest.get(name, entry['cumulative_us']), entry['cumulative_us'])
+
+    totals.sort()
+    median_ms = totals[len(totals) // 2]
+    top_modules = sorted(slowest.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} runs "
+          f"(min {totals[0]:.1f} ms, max {totals[-1]:.1f} ms)")
+    print("\nSlowest modules (cumulative, best run):")
+    for name, cumulative_us in top_modules:
+        print(f"  {cumulative_us / 1000.0:8.1f} ms  {name}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'module': args.module,
+                'runs': args.runs,
+                'median_ms': median_ms,
+                'samples_ms': totals,
+                'slowest_modules': [
+                    {'module': name, 'cumulative_ms': us / 1000.0} for name, us in top_modules
+                ]
+            }, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"\nImport time regression: {median_ms:.1f} ms > {args.max_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Projection benchmark: shared index search latency, first-pass memory and
+recall@k with reduced vectors (PCA or random projection) vs. exact search
+
+By default the corpus is synthetic: vectors whose variance decays like 1/i
+across dimensions, roughly the spectrum of text embeddings. Pass --vectors
+with a snapshot's vectors.npy (or any saved N x D array) to measure on real
+embeddings; queries are then held-out rows of that array.
+
+Examples:
+  python benchmarks/projection_benchmark.py
+  python benchmarks/projection_benchmark.py --vectors shared_index/<version>/vectors.npy --dimensions 128 256
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import numpy as np
+from run_benchmarks import percentile
+
+
+def synthetic_vectors(count: int, dimensions: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors with a 1/i variance spectrum in a random orientation"""
+    rng = np.random.default_rng(seed)
+    scales = 1.0 / np.sqrt(np.arange(1, dimensions + 1))
+    basis, _ = np.linalg.qr(rng.standard_normal((dimensions, dimensions)))
+    vectors = (rng.standard_normal((count, dimensions)) * scales) @ basis.T
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def bench_variant(vectors: np.ndarray, queries: np.ndarray, truth: List[set], k: int, method: str,
+                  dimensions: int, candidates: int) -> Dict:
+    """Latency per single query and recall@k against exact search"""
+    import config
+    from shared_index import _Snapshot, write_snapshot
+
+    config.PROJECTION_CANDIDATES = candidates
+    with tempfile.TemporaryDirectory() as directory:
+        ids = [str(i) for i in range(len(vectors))]
+        start = time.perf_counter()
+        version = write_snapshot(ids, [""] * len(ids), [{}] * len(ids), vectors, directory,
+                                 projection_method=method, projection_dimensions=dimensions)
+        build_seconds = time.perf_counter() - start
+        snapshot = _Snapshot(os.path.join(directory, version), version)
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            result = snapshot.query([query], n_results=k)
+            latencies.append(time.perf_counter() - start)
+            hits += len(expected & set(result['ids'][0]))
+
+        reduced = snapshot.projection is not None
+        scanned = snapshot.reduced.nbytes if reduced else snapshot.vectors.nbytes
+        return {
+            'method': method if reduced else 'exact',
+            'dimensions': snapshot.reduced.shape[1] if reduced else vectors.shape[1],
+            'candidates': k * candidates if reduced else len(vectors),
+            'build_seconds': build_seconds,
+            'explained_variance': snapshot.projection.explained_variance if reduced else None,
+            'scanned_mb': scanned / 1e6,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'recall': hits / (len(queries) * k)
+        }
+
+
+def print_table(rows: List[Dict]):
+    print(f"\n{'method':7s} {'dims':>5s} {'rescored':>9s} {'variance':>9s} {'scan MB':>8s} "
+          f"{'p50 ms':>7s} {'p95 ms':>7s} {'recall':>7s}")
+    for row in rows:
+        variance = f"{row['explained_variance']:.0%}" if row['explained_variance'] else "-"
+        print(f"{row['method']:7s} {row['dimensions']:5d} {row['candidates']:9d} {variance:>9s} "
+              f"{row['scanned_mb']:8.1f} {row['p50_ms']:7.2f} {row['p95_ms']:7.2f} {row['recall']:7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reduced-vector search against exact search')
+    parser.add_argument('--vectors', type=str, default=None, help='N x D .npy array to index (default: synthetic)')
+    parser.add_argument('--count', type=int, default=50000, help='Synthetic vectors to index')
+    parser.add_argument('--full-dimensions', type=int, default=1536, help='Synthetic vector size')
+    parser.add_argument('--queries', type=int, default=200, help='Held-out query vectors')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--dimensions', type=int, nargs='+', default=[64, 128, 256], help='Reduced sizes')
+    parser.add_argument('--candidates', type=int, nargs='+', default=[10], help='PROJECTION_CANDIDATES values')
+    parser.add_argument('--random', action='store_true', help='Also measure random projections')
+    parser.add_argument('--output', '-o', type=str, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    if args.vectors:
+        data = np.load(args.vectors).astype(np.float32)
+    else:
+        data = synthetic_vectors(args.count + args.queries, args.full_dimensions)
+    vectors, queries = data[:-args.queries], data[-args.queries:]
+    print(f"Index: {len(vectors)} x {vectors.shape[1]} vectors ({vectors.nbytes / 1e6:.0f} MB), "
+          f"{len(queries)} queries, top {args.top_k}")
+
+    # Exact neighbours for recall
+    distances = (queries ** 2).sum(1)[:, None] + (vectors ** 2).sum(1)[None, :] - 2 * queries @ vectors.T
+    truth = [set(str(i) for i in np.argsort(row)[:args.top_k]) for row in distances]
+
+    results = [bench_variant(vectors, queries, truth, args.top_k, "none", vectors.shape[1], 1)]
+    methods = ["pca", "random"] if args.random else ["pca"]
+    for method in methods:
+        for dimensions in args.dimensions:
+            for candidates in args.candidates:
+                results.append(bench_variant(vectors, queries, truth, args.top_k, method, dimensions, candidates))
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'params': vars(args), 'results': results}, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
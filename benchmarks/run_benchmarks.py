@@ -0,0 +1,237 @@
+"""
+Offline benchmark suite: crawl, chunking, indexing and /ask throughput
+Runs entirely against local stand-ins (fake OpenAI API and synthetic site)
+and writes results as JSON so runs can be compared across commits
+
+The tiktoken encoding must be available locally (it is cached after the
+first online run; set TIKTOKEN_CACHE_DIR to reuse a cache).
+
+Examples:
+  python benchmarks/run_benchmarks.py --output bench.json
+  python benchmarks/run_benchmarks.py --pages 500 --concurrency 1,8,32 --compare bench.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openai import start_server
+from fake_site import start_site
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def configure_environment(openai_base_url: str, work_dir: str):
+    """Point the bot at the stand-ins; must run before repo modules are imported"""
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["OPENAI_BASE_URL"] = openai_base_url
+    os.environ["INDEX_POINTER_FILE"] = os.path.join(work_dir, "index_pointer.json")
+    os.environ["SHARED_INDEX_DIR"] = os.path.join(work_dir, "shared_index")
+    os.environ["WARMUP_ON_STARTUP"] = "false"
+
+
+def bench_crawl(base_url: str, max_pages: int) -> Dict:
+    import config
+    from crawler import WebCrawler
+
+    # No politeness delay against the local site
+    config.REQUEST_DELAY = 0
+    crawler = WebCrawler(base_url, max_pages)
+    start = time.perf_counter()
+    pages = crawler.crawl()
+    elapsed = time.perf_counter() - start
+    return {
+        'pages': len(pages),
+        'seconds': elapsed,
+        'pages_per_second': len(pages) / elapsed if elapsed else 0.0
+    }, pages
+
+
+def bench_chunking(pages: List[Dict]) -> Dict:
+    import config
+    from text_processor import TextProcessor
+
+    processor = TextProcessor(chunk_size=config.CHUNK_SIZE, chunk_overlap=config.CHUNK_OVERLAP)
+    megabytes = sum(len(page['content'].encode('utf-8')) for page in pages) / 1e6
+    start = time.perf_counter()
+    chunks = processor.process_documents(pages)
+    elapsed = time.perf_counter() - start
+    return {
+        'chunks': len(chunks),
+        'megabytes': megabytes,
+        'seconds': elapsed,
+        'megabytes_per_second': megabytes / elapsed if elapsed else 0.0
+    }, chunks
+
+
+def bench_indexing(base_url: str, chunks: List[Dict]) -> Dict:
+    from indexer import Indexer
+
+    indexer = Indexer(target_url=base_url)
+    start = time.perf_counter()
+    total = indexer.store_chunks(chunks, new_version=True)
+    elapsed = time.perf_counter() - start
+    return {
+        'chunks': len(chunks),
+        'indexed': total,
+        'seconds': elapsed,
+        'chunks_per_second': len(chunks) / elapsed if elapsed else 0.0
+    }
+
+
+def start_api() -> tuple:
+    import socket
+    import uvicorn
+    import main
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="api", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def bench_ask(api_url: str, questions: List[str], concurrency_levels: List[int], requests_per_level: int) -> List[Dict]:
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(concurrency_levels))
+    session.mount("http://", adapter)
+    # Warm up: builds the RAG engine
+    session.get(f"{api_url}/ready").raise_for_status()
+
+    def ask(i: int) -> float:
+        start = time.perf_counter()
+        response = session.post(f"{api_url}/ask", json={"question": questions[i % len(questions)]})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    results = []
+    for concurrency in concurrency_levels:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(ask, range(requests_per_level)))
+        elapsed = time.perf_counter() - start
+        results.append({
+            'concurrency': concurrency,
+            'requests': requests_per_level,
+            'qps': requests_per_level / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000
+        })
+        print(f"  concurrency {concurrency:3d}: {results[-1]['qps']:7.1f} QPS, "
+              f"p50 {results[-1]['p50_ms']:.0f} ms, p99 {results[-1]['p99_ms']:.0f} ms")
+    return results
+
+
+def compare(current: Dict, baseline_file: str):
+    """Print headline deltas against a previous results file"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    def delta(name: str, new: float, old: float):
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"  {name:32s} {old:10.2f} -> {new:10.2f} ({change:+.1f}%)")
+
+    print(f"\nComparison with {baseline_file} (commit {baseline.get('commit')}):")
+    for stage, key in (('crawl', 'pages_per_second'), ('chunking', 'megabytes_per_second'),
+                       ('indexing', 'chunks_per_second')):
+        if stage in baseline['results'] and stage in current['results']:
+            delta(f"{stage} {key}", current['results'][stage][key], baseline['results'][stage][key])
+    old_levels = {r['concurrency']: r for r in baseline['results'].get('ask', [])}
+    for level in current['results'].get('ask', []):
+        old = old_levels.get(level['concurrency'])
+        if old:
+            delta(f"ask c={level['concurrency']} qps", level['qps'], old['qps'])
+            delta(f"ask c={level['concurrency']} p95_ms", level['p95_ms'], old['p95_ms'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run offline performance benchmarks')
+    parser.add_argument('--pages', type=int, default=200, help='Synthetic site size')
+    parser.add_argument('--concurrency', type=str, default='1,4,16', help='Comma-separated /ask concurrency levels')
+    parser.add_argument('--requests', type=int, default=100, help='/ask requests per concurrency level')
+    parser.add_argument('--embed-latency-ms', type=float, default=20, help='Fake embeddings API latency')
+    parser.add_argument('--chat-latency-ms', type=float, default=300, help='Fake chat API latency')
+    parser.add_argument('--site-latency-ms', type=float, default=0, help='Synthetic site response latency')
+    parser.add_argument('--skip-ask', action='store_true', help='Only run the crawl/chunk/index stages')
+    parser.add_argument('--output', '-o', type=str, default=None, help='Write results as JSON')
+    parser.add_argument('--compare', type=str, default=None, help='Previous results JSON to compare against')
+    args = parser.parse_args()
+
+    concurrency_levels = [int(level) for level in args.concurrency.split(',') if level]
+    fake_openai, openai_url = start_server(
+        embed_latency_ms=args.embed_latency_ms, chat_latency_ms=args.chat_latency_ms
+    )
+    site, site_url = start_site(args.pages, latency_ms=args.site_latency_ms)
+    work_dir = tempfile.mkdtemp(prefix="rag-bench-")
+    configure_environment(openai_url, work_dir)
+
+    results = {}
+    print("Crawling synthetic site...")
+    results['crawl'], pages = bench_crawl(site_url, args.pages)
+    print("Chunking...")
+    results['chunking'], chunks = bench_chunking(pages)
+    print("Indexing...")
+    results['indexing'] = bench_indexing(site_url, chunks)
+
+    if not args.skip_ask:
+        print("Benchmarking /ask...")
+        api, api_url = start_api()
+        questions = [f"What does the {topic} guide say about {topic}?" for topic in
+                     ("pricing", "support", "account", "features", "install", "privacy")]
+        results['ask'] = bench_ask(api_url, questions, concurrency_levels, args.requests)
+        api.should_exit = True
+
+    results['openai_requests'] = dict(fake_openai.request_counts)
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'params': vars(args),
+        'results': results
+    }
+
+    print("\n" + json.dumps(results, indent=2))
+    if args.compare:
+        compare(report, args.compare)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Cross-page boilerplate removal
+Finds text repeated across a large share of crawled pages (sidebars, cookie
+banners, calls to action) and strips it before chunking
+"""
+from collections import Counter
+from typing import Dict, List, Set
+import config
+
+
+def _shingles(words: List[str], size: int) -> List[int]:
+    return [hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)]
+
+
+def find_boilerplate(pages: List[Dict], min_share: float = None, min_pages: int = None,
+                     shingle_words: int = None) -> Set[int]:
+    """
+    Hashes of the word n-grams (shingles) that count as boilerplate:
+    those on at least `min_share` of the pages and at least `min_pages` pages
+    """
+    min_share = config.BOILERPLATE_MIN_SHARE if min_share is None else min_share
+    min_pages = config.BOILERPLATE_MIN_PAGES if min_pages is None else min_pages
+    size = shingle_words or config.BOILERPLATE_SHINGLE_WORDS
+
+    if len(pages) < min_pages:
+        return set()
+
+    # Document frequency: pages containing each shingle
+    frequency = Counter()
+    for page in pages:
+        frequency.update(set(_shingles(page.get('content', '').split(), size)))
+    threshold = max(min_pages, min_share * len(pages))
+    return {shingle for shingle, count in frequency.items() if count >= threshold}
+
+
+def strip_boilerplate(pages: List[Dict], boilerplate: Set[int], shingle_words: int = None) -> List[Dict]:
+    """
+    Return copies of the pages without boilerplate; pages left empty are dropped
+
+    Every word covered by a boilerplate shingle is removed, so whole
+    repeated blocks go while text that merely shares a few words survives.
+    """
+    size = shingle_words or config.BOILERPLATE_SHINGLE_WORDS
+    if not boilerplate:
+        return pages
+
+    cleaned = []
+    words_before = words_after = 0
+    for page in pages:
+        words = page.get('content', '').split()
+        covered = [False] * len(words)
+        for start, shingle in enumerate(_shingles(words, size)):
+            if shingle in boilerplate:
+                covered[start:start + size] = [True] * size
+        kept = [word for word, is_boilerplate in zip(words, covered) if not is_boilerplate]
+
+        words_before += len(words)
+        words_after += len(kept)
+        if kept:
+            cleaned.append({**page, 'content': ' '.join(kept)})
+
+    removed = words_before - words_after
+    if words_before:
+        print(f"Removed {removed} boilerplate words "
+              f"({removed / words_before:.1%} of the text, {len(boilerplate)} repeated phrases)")
+    return cleaned
+
+
+def remove_boilerplate(pages: List[Dict], min_share: float = None, min_pages: int = None,
+                       shingle_words: int = None) -> List[Dict]:
+    """Find the boilerplate in a corpus and strip it from every page"""
+    boilerplate = find_boilerplate(pages, min_share, min_pages, shingle_words)
+    return strip_boilerplate(pages, boilerplate, shingle_words)
@@ -0,0 +1,148 @@
+"""
+Process-wide client registry
+One OpenAI client, one Chroma client and one HTTP session per process,
+each with tuned connection pools and keep-alive, shared by every component
+"""
+import threading
+from typing import Dict
+import config
+
+
+_lock = threading.Lock()
+_openai_client = None
+_openai_http_client = None
+_local_llm_clients = {}
+_chroma_client = None
+_http_session = None
+_lookups = {'openai': 0, 'local_llm': 0, 'chroma': 0, 'http': 0}
+
+
+def get_openai_client():
+    """Shared OpenAI client backed by a pooled keep-alive httpx client"""
+    global _openai_client, _openai_http_client
+    _lookups['openai'] += 1
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                import httpx
+                from openai import OpenAI
+
+                _openai_http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=config.OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=config.OPENAI_MAX_CONNECTIONS,
+                        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+                    ),
+                    timeout=config.OPENAI_TIMEOUT
+                )
+                _openai_client = OpenAI(
+                    api_key=config.OPENAI_API_KEY,
+                    base_url=config.OPENAI_BASE_URL,
+                    http_client=_openai_http_client
+                )
+    return _openai_client
+
+
+def get_local_llm_client(base_url: str = None):
+    """
+    Shared client for an OpenAI-compatible server (llama.cpp, vLLM, Ollama, ...)
+    One pooled client per base URL
+    """
+    base_url = base_url or config.LOCAL_LLM_BASE_URL
+    _lookups['local_llm'] += 1
+    if base_url not in _local_llm_clients:
+        with _lock:
+            if base_url not in _local_llm_clients:
+                import httpx
+                from openai import OpenAI
+
+                _local_llm_clients[base_url] = OpenAI(
+                    api_key=config.LOCAL_LLM_API_KEY,
+                    base_url=base_url,
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=config.OPENAI_MAX_CONNECTIONS,
+                            max_keepalive_connections=config.OPENAI_MAX_CONNECTIONS,
+                            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+                        ),
+                        timeout=config.GENERATION_TIMEOUT
+                    ),
+                    # Retrying an overloaded local server only deepens its queue
+                    max_retries=0
+                )
+    return _local_llm_clients[base_url]
+
+
+def get_chroma_client():
+    """Shared Chroma client"""
+    global _chroma_client
+    _lookups['chroma'] += 1
+    if _chroma_client is None:
+        with _lock:
+            if _chroma_client is None:
+                import chromadb
+                from chromadb.config import Settings
+
+                # On disk, so collections named by the index pointer survive restarts
+                # and are shared with the indexer CLI and distributed workers
+                _chroma_client = chromadb.PersistentClient(
+                    path=config.CHROMA_PERSIST_DIRECTORY,
+                    settings=Settings(anonymized_telemetry=False)
+                )
+    return _chroma_client
+
+
+def get_http_session():
+    """Shared requests session for crawling, with a keep-alive connection pool"""
+    global _http_session
+    _lookups['http'] += 1
+    if _http_session is None:
+        with _lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=config.HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=config.HTTP_POOL_MAXSIZE
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({'User-Agent': config.CRAWLER_USER_AGENT})
+                _http_session = session
+    return _http_session
+
+
+def pool_stats() -> Dict:
+    """Connection pool usage for the shared clients (only those created so far)"""
+    stats = {'client_lookups': dict(_lookups)}
+
+    if _openai_http_client is not None:
+        pool = getattr(_openai_http_client._transport, '_pool', None)
+        connections = list(getattr(pool, 'connections', []))
+        stats['openai'] = {
+            'max_connections': config.OPENAI_MAX_CONNECTIONS,
+            'open_connections': len(connections),
+            'idle_connections': sum(1 for c in connections if c.is_idle())
+        }
+
+    if _http_session is not None:
+        hosts = {}
+        for adapter in set(_http_session.adapters.values()):
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                hosts[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                    'requests': pool.num_requests,
+                    'connections_opened': pool.num_connections,
+                    'idle_connections': sum(1 for c in list(pool.pool.queue) if c is not None) if pool.pool else 0
+                }
+        stats['http'] = {
+            'pool_maxsize': config.HTTP_POOL_MAXSIZE,
+            'hosts': hosts
+        }
+
+    stats['chroma'] = {'initialized': _chroma_client is not None}
+    return stats
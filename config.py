@@ -8,27 +8,159 @@ load_dotenv()
 
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # Point at a compatible server (e.g. the benchmark stand-in); None uses the default
 EMBEDDING_MODEL = "text-embedding-ada-002"
 CHAT_MODEL = "gpt-3.5-turbo"
+EMBEDDING_BATCH_LIMIT = 2048  # Max inputs per embeddings API call
+CHAT_REQUESTS_PER_MINUTE = int(os.getenv("CHAT_REQUESTS_PER_MINUTE", "3500"))  # Client-side limit for bulk jobs (0 = unlimited)
+
+# Embedding Provider Configuration (embeddings.py)
+# "openai" calls EMBEDDING_MODEL; "local" runs an ONNX sentence-transformer on CPU. Collections are tagged with the provider
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+LOCAL_EMBEDDING_MODEL_DIR = os.getenv("LOCAL_EMBEDDING_MODEL_DIR", "./models/all-MiniLM-L6-v2")  # Holds model.onnx and tokenizer.json
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))  # Texts per inference call
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", str(min(4, os.cpu_count() or 1))))  # Batches run in parallel
+LOCAL_EMBEDDING_QUANTIZE = os.getenv("LOCAL_EMBEDDING_QUANTIZE", "true").lower() == "true"  # Run int8 weights (made once, needs onnx)
+LOCAL_EMBEDDING_MAX_TOKENS = int(os.getenv("LOCAL_EMBEDDING_MAX_TOKENS", "256"))  # Longer texts are truncated (MiniLM was trained on 256)
+
+# Generation Provider Configuration (generation.py)
+# "openai" calls CHAT_MODEL; "local" calls any OpenAI-compatible server (llama.cpp, vLLM, Ollama, benchmarks/fake_openai.py)
+GENERATION_PROVIDER = os.getenv("GENERATION_PROVIDER", "openai")
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "http://127.0.0.1:8080/v1")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "local-model")  # Sent as the model name; single-model servers ignore it
+LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY", "not-needed")
+GENERATION_MAX_CONCURRENCY = int(os.getenv("GENERATION_MAX_CONCURRENCY", "0"))  # Completions in flight per process (0 = unlimited)
+GENERATION_QUEUE_TIMEOUT = float(os.getenv("GENERATION_QUEUE_TIMEOUT", "30"))  # Seconds to wait for a slot before answering 503
+GENERATION_TIMEOUT = float(os.getenv("GENERATION_TIMEOUT", "60"))  # Seconds without a response (or between streamed chunks)
 
 # Crawling Configuration
 TARGET_WEBSITE = os.getenv("TARGET_WEBSITE", "https://example.com")
 MAX_PAGES = int(os.getenv("MAX_PAGES", "50"))
 REQUEST_TIMEOUT = 10
 REQUEST_DELAY = 0.5  # Delay between requests in seconds
+# Processes parsing HTML while pages are fetched; one core stays with the fetch loop (0 = parse inline)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(max(0, min(4, (os.cpu_count() or 1) - 1)))))
+FAST_EXTRACT = os.getenv("FAST_EXTRACT", "true").lower() == "true"  # Extract with lxml's tree directly instead of BeautifulSoup
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"  # Skip near-duplicate pages before chunking
+NEAR_DUPLICATE_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DISTANCE", "3"))  # Max differing SimHash bits (of 64, below 4)
+
+# Crawl Frontier Configuration
+RESPECT_ROBOTS_TXT = os.getenv("RESPECT_ROBOTS_TXT", "true").lower() == "true"  # Obey robots.txt rules and Crawl-delay
+CRAWLER_USER_AGENT = "RAGSupportBot/1.0"  # Sent with every request; its name (before "/") is matched against robots.txt groups
+SITEMAP_ENABLED = os.getenv("SITEMAP_ENABLED", "true").lower() == "true"  # Seed the crawl from sitemap.xml
+SITEMAP_MAX_URLS = int(os.getenv("SITEMAP_MAX_URLS", "50000"))  # Cap on URLs read from sitemaps
+FRONTIER_PRIORITY_WEIGHT = 2.0  # Depth levels a sitemap priority of 1.0 (vs. the default 0.5) is worth
+SEEN_URLS_DISK_THRESHOLD = int(os.getenv("SEEN_URLS_DISK_THRESHOLD", "10000"))  # Crawls of this many pages track visited URLs in a Bloom filter + on-disk set
+
+# Connection Pool Configuration (shared clients in clients.py)
+HTTP_POOL_CONNECTIONS = 10  # Hosts kept in the crawler session's pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))  # Connections kept per host
+HTTP_KEEPALIVE_EXPIRY = 30.0  # Seconds an idle connection stays open
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "64"))
+OPENAI_TIMEOUT = 60.0  # Seconds per OpenAI API request
 
 # Chunking Configuration
 CHUNK_SIZE = 500  # Number of tokens per chunk
 CHUNK_OVERLAP = 50  # Overlap between chunks
 
+# Boilerplate Removal Configuration
+# Text repeated across many pages (sidebars, cookie banners, CTAs) is stripped before chunking
+BOILERPLATE_REMOVAL = os.getenv("BOILERPLATE_REMOVAL", "true").lower() == "true"
+BOILERPLATE_MIN_SHARE = float(os.getenv("BOILERPLATE_MIN_SHARE", "0.3"))  # Share of pages a phrase must appear on
+BOILERPLATE_MIN_PAGES = 3  # ...and at least this many pages
+BOILERPLATE_SHINGLE_WORDS = 8  # Phrase length, in words, used to detect repeated blocks
+BOILERPLATE_SAMPLE_PAGES = 500  # Pages a streaming crawl learns the boilerplate from
+
+# Streaming Indexing Configuration
+INDEX_STREAM_BATCH_PAGES = int(os.getenv("INDEX_STREAM_BATCH_PAGES", "100"))  # Pages chunked and embedded per batch during a crawl
+
+# Distributed Crawl Configuration (distributed.py)
+# Workers lease URLs and chunk batches from a SQLite queue shared with the coordinator
+DISTRIBUTED_DB = os.getenv("DISTRIBUTED_DB", "./crawl_queue.db")
+DISTRIBUTED_WORKERS = int(os.getenv("DISTRIBUTED_WORKERS", "4"))  # Local workers started by the coordinator
+DISTRIBUTED_LEASE_SECONDS = float(os.getenv("DISTRIBUTED_LEASE_SECONDS", "60"))  # Unfinished tasks are retried after this
+DISTRIBUTED_MAX_ATTEMPTS = int(os.getenv("DISTRIBUTED_MAX_ATTEMPTS", "3"))  # Attempts before a task is marked failed
+DISTRIBUTED_CHUNK_BATCH = 100  # Chunks per embeddings request
+DISTRIBUTED_POLL_INTERVAL = 0.2  # Seconds an idle worker or coordinator waits before checking again
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "3000"))  # Shared by all workers; 0 = unlimited
+
 # Vector Database Configuration
-CHROMA_PERSIST_DIRECTORY = "./chroma_db"
+CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
 COLLECTION_NAME = "website_content"
+INDEX_POINTER_FILE = os.getenv("INDEX_POINTER_FILE", "./index_pointer.json")  # Names the live collection
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))  # Previous versions kept for rollback
+COLLECTION_STATS_REFRESH_SECONDS = float(os.getenv("COLLECTION_STATS_REFRESH_SECONDS", "10"))  # Cached counts are checked against Chroma this often (catches writes from other processes)
 
 # Retrieval Configuration
 TOP_K_RESULTS = 5  # Number of similar chunks to retrieve
+FILTER_PATH_LEVELS = 4  # URL path segments indexed per chunk for url_prefix filters
+INDEX_TAG_RULES = os.getenv("INDEX_TAG_RULES", "")  # Tags by path prefix, e.g. "docs=/docs/,french=/fr/"
+
+# Retrieval Cache Configuration (retrieval_cache.py)
+# Search results of repeated query embeddings, invalidated when the collection changes
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+RETRIEVAL_CACHE_MAX_MB = float(os.getenv("RETRIEVAL_CACHE_MAX_MB", "64"))  # Estimated memory held by cached results
+
+# Bulk Answering Configuration
+FAQ_CONCURRENCY = int(os.getenv("FAQ_CONCURRENCY", "8"))  # Questions answered in parallel by generate_faq.py
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))  # Answers generated in parallel per /ask/batch request
+BATCH_MAX_QUESTIONS = 1000  # Largest batch accepted by /ask/batch
+BATCH_JOB_THRESHOLD = 200  # Larger batches run as background jobs instead of streaming
+BATCH_JOB_RETENTION = 100  # Finished jobs kept for polling
+
+# Extractive Answer Configuration
+# When the best chunk is this close to the question, answer with its best sentences instead of calling the chat model
+EXTRACTIVE_ANSWERS_ENABLED = os.getenv("EXTRACTIVE_ANSWERS_ENABLED", "false").lower() == "true"
+EXTRACTIVE_MAX_DISTANCE = float(os.getenv("EXTRACTIVE_MAX_DISTANCE", "0.25"))  # Squared L2 of the top chunk (unit vectors: 2 - 2 * cosine)
+EXTRACTIVE_MAX_SENTENCES = 3  # Sentences quoted from the chunk
+
+# FAQ Answer Store Configuration
+# generate_faq.py also stores its answers; /ask serves them for closely matching questions
+FAQ_STORE_ENABLED = os.getenv("FAQ_STORE_ENABLED", "true").lower() == "true"
+FAQ_STORE_FILE = os.getenv("FAQ_STORE_FILE", "./faq_store.json")
+FAQ_MATCH_DISTANCE = float(os.getenv("FAQ_MATCH_DISTANCE", "0.1"))  # Squared L2 between question embeddings (unit vectors: 2 - 2 * cosine)
+FAQ_STORE_CHECK_INTERVAL = 2.0  # Seconds between checks of the store file and the index it was built from
+FAQ_REBUILD_RETRY_SECONDS = 60  # Wait before retrying a failed or locked rebuild
+FAQ_REBUILD_LOCK_SECONDS = 3600  # A rebuild lock older than this is considered abandoned
+
+# Conversation Session Configuration
+# /ask with a session_id keeps history server-side (per API worker process)
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))  # Idle sessions expire after this
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))  # Least recently used sessions are dropped beyond this
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "1000"))  # Older turns are summarized beyond this prompt budget
+SESSION_SUMMARY_TOKENS = 200  # Max length of the running summary of older turns
+SESSION_MAX_CHUNKS = 50  # Retrieved chunks remembered per session for reuse
+SESSION_QUERY_REWRITE = os.getenv("SESSION_QUERY_REWRITE", "true").lower() == "true"  # Rewrite follow-ups with the chat model (else prepend the previous query)
+
+# Query Batching Configuration
+# Concurrent queries arriving within the window share one embeddings call
+QUERY_BATCH_ENABLED = os.getenv("QUERY_BATCH_ENABLED", "true").lower() == "true"
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))  # Max wait for more queries
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "16"))  # Flush once this many are waiting
+QUERY_BATCH_TIMEOUT = float(os.getenv("QUERY_BATCH_TIMEOUT", "30"))  # Seconds a query waits for its batch before failing
+
+# Shared Index Configuration (multi-worker serving)
+# Workers serve queries from a memory-mapped snapshot exported after each index build
+SHARED_INDEX_ENABLED = os.getenv("SHARED_INDEX_ENABLED", "false").lower() == "true"
+SHARED_INDEX_DIR = os.getenv("SHARED_INDEX_DIR", "./shared_index")
+SHARED_INDEX_CHECK_INTERVAL = 2.0  # Seconds between checks for a newer snapshot
+SHARED_INDEX_KEEP = 2  # Snapshots kept on disk
+SHARED_INDEX_FILTER_CACHE = 64  # Filters whose matching rows are kept per snapshot
+
+# Vector Projection Configuration (projection.py)
+# Snapshots can also store reduced vectors: queries scan those, then re-score the best candidates with full vectors
+PROJECTION_METHOD = os.getenv("PROJECTION_METHOD", "none")  # "pca", "random" or "none"
+PROJECTION_DIMENSIONS = int(os.getenv("PROJECTION_DIMENSIONS", "256"))
+PROJECTION_CANDIDATES = int(os.getenv("PROJECTION_CANDIDATES", "10"))  # First-pass candidates re-scored per requested result
+PROJECTION_SAMPLE = int(os.getenv("PROJECTION_SAMPLE", "20000"))  # Vectors PCA is fitted on
+
+# Metrics Configuration
+# Per-stage latency and token histograms, exposed on /metrics in Prometheus format
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
 
 # API Configuration
 API_HOST = "0.0.0.0"
 API_PORT = 8000
+API_WORKERS = int(os.getenv("API_WORKERS", "4"))
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"  # Build the RAG engine in the background at startup
 
@@ -1,146 +1,275 @@
 """
 Web crawler to scrape website content
 """
-import requests
-from bs4 import BeautifulSoup
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
 from urllib.parse import urljoin, urlparse
+import multiprocessing
 import time
-from typing import List, Set, Dict
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+import clients
 import config
+import dedup
+import html_extract
+import metrics
+from seen_urls import SeenUrls
+from frontier import CrawlFrontier, RobotsPolicy, fetch_sitemap_entries, DEFAULT_PRIORITY
 
 
 class WebCrawler:
     """Crawls a website and extracts text content from pages"""
     
-    def __init__(self, base_url: str, max_pages: int = 50):
+    def __init__(self, base_url: str, max_pages: int = 50, extract_workers: int = None,
+                 fast_extract: bool = None, modified_since: Optional[datetime] = None):
         self.base_url = base_url
         self.max_pages = max_pages
-        self.visited_urls: Set[str] = set()
+        # Incremental recrawl: skip sitemap URLs whose lastmod is not newer than this
+        if modified_since is not None and modified_since.tzinfo is None:
+            modified_since = modified_since.replace(tzinfo=timezone.utc)
+        self.modified_since = modified_since
+        self.unchanged_urls: Set[str] = set()
+        self.robots: Optional[RobotsPolicy] = None
+        self.request_delay = config.REQUEST_DELAY
+        self.extract_workers = config.EXTRACT_WORKERS if extract_workers is None else extract_workers
+        self.fast_extract = config.FAST_EXTRACT if fast_extract is None else fast_extract
+        # Large crawls track visited URLs in a Bloom filter backed by an on-disk set
+        if max_pages >= config.SEEN_URLS_DISK_THRESHOLD:
+            self.visited_urls = SeenUrls(max_pages)
+        else:
+            self.visited_urls: Set[str] = set()
         self.pages_content: List[Dict[str, str]] = []
-        self.domain = urlparse(base_url).netloc
+        self.pages_crawled = 0
+        # Fetch attempts count against max_pages; canonical aliases in visited_urls do not
+        self.pages_fetched = 0
+        self.domain = urlparse(dedup.canonicalize_url(base_url)).netloc
+        # Content fingerprints of stored pages, to skip near-duplicates
+        self.duplicates = dedup.NearDuplicateIndex() if config.DEDUP_ENABLED else None
+        self.skipped_duplicates = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Keep-alive session shared across crawls
+        self.session = clients.get_http_session()
         
     def is_valid_url(self, url: str) -> bool:
         """Check if URL belongs to the same domain"""
         parsed = urlparse(url)
         return parsed.netloc == self.domain
     
-    def clean_text(self, soup: BeautifulSoup) -> str:
-        """Extract and clean text from HTML"""
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
+    def crawl(self, on_page: Callable[[Dict[str, str]], None] = None) -> List[Dict[str, str]]:
+        """
+        Start crawling from the base URL
+        With on_page, each page goes to the callback as soon as it is
+        extracted instead of being kept in memory (the result is then empty)
+        """
+        with metrics.span("crawl"):
+            for page in self.iter_pages():
+                if on_page is not None:
+                    on_page(page)
+                else:
+                    self.pages_content.append(page)
+        return self.pages_content
+    
+    def iter_pages(self) -> Iterator[Dict[str, str]]:
+        """Crawl from the base URL, yielding pages as they are extracted"""
+        print(f"Starting crawl of {self.base_url}")
+        print(f"Max pages: {self.max_pages}")
         
-        # Get text
-        text = soup.get_text()
+        frontier = self.build_frontier()
+        # Pages fetched but not yet extracted, oldest first
+        pending = deque()
+        self._start_extraction_pool()
+        # Keep every extraction worker busy without buffering the whole site
+        max_in_flight = max(1, self.extract_workers * 2)
         
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        try:
+            while pending or (frontier and self.pages_fetched < self.max_pages):
+                can_fetch = frontier and self.pages_fetched < self.max_pages
+                if can_fetch and len(pending) < max_in_flight:
+                    url, depth = frontier.pop()
+                    
+                    if url in self.visited_urls:
+                        continue
+                    
+                    self.visited_urls.add(url)
+                    self.pages_fetched += 1
+                    html = self.fetch_page(url)
+                    if html is not None:
+                        pending.append((url, depth, html, self._submit_extraction(html, url)))
+                    continue
+                
+                # Frontier drained or enough work in flight: collect the oldest extraction
+                url, depth, html, future = pending.popleft()
+                page, links = self._collect_extraction(url, html, future)
+                for link in links:
+                    self._enqueue(frontier, link, depth + 1)
+                if page is not None:
+                    self.pages_crawled += 1
+                    yield page
+        finally:
+            self._shutdown_pool()
         
-        return text
+        print(f"\nCrawling completed!")
+        print(f"Total pages crawled: {self.pages_crawled}")
+        if self.skipped_duplicates:
+            print(f"Duplicate pages skipped: {self.skipped_duplicates}")
+        if self.unchanged_urls:
+            print(f"Unchanged pages skipped: {len(self.unchanged_urls)}")
     
-    def get_links(self, soup: BeautifulSoup, current_url: str) -> List[str]:
-        """Extract all valid links from the page"""
-        links = []
-        for link in soup.find_all('a', href=True):
-            url = urljoin(current_url, link['href'])
-            # Remove fragments
-            url = url.split('#')[0]
-            if self.is_valid_url(url) and url not in self.visited_urls:
-                links.append(url)
-        return links
+    def build_frontier(self) -> CrawlFrontier:
+        """Frontier seeded with the start page and, when available, the sitemap"""
+        frontier = CrawlFrontier()
+        start_url = dedup.canonicalize_url(self.base_url)
+        
+        if config.RESPECT_ROBOTS_TXT:
+            self.robots = RobotsPolicy(self.session, start_url)
+            if self.robots.crawl_delay and self.robots.crawl_delay > self.request_delay:
+                self.request_delay = self.robots.crawl_delay
+                print(f"Using robots.txt crawl delay: {self.request_delay}s")
+        
+        # Queued first at top priority, the start page wins every tie
+        if not self._enqueue(frontier, start_url, 0, priority=1.0):
+            print(f"Start URL {start_url} is disallowed by robots.txt")
+        
+        if config.SITEMAP_ENABLED:
+            self._seed_from_sitemaps(frontier, start_url)
+        return frontier
     
-    def crawl_page(self, url: str) -> bool:
-        """Crawl a single page and extract content"""
+    def _seed_from_sitemaps(self, frontier: CrawlFrontier, start_url: str):
+        """Queue sitemap URLs one level below the start page, ranked by their priority"""
+        sitemap_urls = self.robots.sitemaps if self.robots else []
+        if not sitemap_urls:
+            sitemap_urls = [urljoin(start_url, "/sitemap.xml")]
+        
+        seeded = 0
+        for sitemap_url in sitemap_urls:
+            for entry in fetch_sitemap_entries(self.session, sitemap_url):
+                url = dedup.canonicalize_url(entry['url'])
+                if not self.is_valid_url(url):
+                    continue
+                if self.modified_since and entry['lastmod'] and entry['lastmod'] <= self.modified_since:
+                    self.unchanged_urls.add(url)
+                    continue
+                if self._enqueue(frontier, url, 1, priority=entry['priority']):
+                    seeded += 1
+        if seeded:
+            print(f"Seeded {seeded} URLs from sitemap")
+    
+    def _enqueue(self, frontier: CrawlFrontier, url: str, depth: int, priority: float = DEFAULT_PRIORITY) -> bool:
+        """Queue a URL unless it was crawled, is unchanged or robots.txt disallows it"""
+        if url in self.visited_urls or url in self.unchanged_urls:
+            return False
+        if self.robots is not None and not self.robots.allowed(url):
+            return False
+        frontier.push(url, depth, priority)
+        return True
+    
+    def fetch_page(self, url: str) -> Optional[bytes]:
+        """Fetch one page; returns None on failure"""
         try:
-            print(f"Crawling: {url}")
-            response = requests.get(
-                url,
-                timeout=config.REQUEST_TIMEOUT,
-                headers={'User-Agent': 'Mozilla/5.0 (RAG Support Bot)'}
-            )
+            print(f"Crawling ({self.pages_fetched}/{self.max_pages}): {url}")
+            with metrics.span("fetch_page"):
+                response = self.session.get(url, timeout=config.REQUEST_TIMEOUT)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'lxml')
-            
-            # Extract text content
-            text = self.clean_text(soup)
-            
-            if text.strip():
-                self.pages_content.append({
-                    'url': url,
-                    'content': text,
-                    'title': soup.title.string if soup.title else url
-                })
-            
-            # Get links for further crawling
-            links = self.get_links(soup, url)
-            
-            # Add new links to queue
-            for link in links:
-                if len(self.visited_urls) < self.max_pages:
-                    if link not in self.visited_urls:
-                        self.crawl_page(link)
-            
-            return True
+            # Be polite - add delay between requests (at least the robots.txt crawl delay)
+            time.sleep(self.request_delay)
+            return response.content
             
         except Exception as e:
             print(f"Error crawling {url}: {str(e)}")
-            return False
+            return None
     
-    def crawl(self) -> List[Dict[str, str]]:
-        """Start crawling from the base URL"""
-        print(f"Starting crawl of {self.base_url}")
-        print(f"Max pages: {self.max_pages}")
+    def _start_extraction_pool(self):
+        self._pool = None
+        if self.extract_workers > 0:
+            # forkserver: crawls also run inside the threaded API server, where fork is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.extract_workers,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+    
+    def _pool_failed(self):
+        """Workers died (e.g. the main module cannot be re-imported): parse inline from now on"""
+        if self._pool is not None:
+            print("Extraction pool failed; extracting inline")
+            self._shutdown_pool()
+    
+    def _shutdown_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+    
+    def _submit_extraction(self, html: bytes, url: str) -> Future:
+        """Parse in the pool while the next page is fetched, or inline without a pool"""
+        if self._pool is not None:
+            try:
+                return self._pool.submit(html_extract.extract_page, html, url, self.fast_extract)
+            except BrokenProcessPool:
+                self._pool_failed()
         
-        urls_to_visit = [self.base_url]
+        future = Future()
+        try:
+            future.set_result(html_extract.extract_page(html, url, self.fast_extract))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def _collect_extraction(self, url: str, html: bytes, future: Future) -> Tuple[Optional[Dict[str, str]], List[str]]:
+        """Wait for a page's extraction; returns the page to keep (or None) and its unvisited same-domain links"""
+        try:
+            extracted = future.result()
+        except BrokenProcessPool:
+            self._pool_failed()
+            return self._collect_extraction(url, html, self._submit_extraction(html, url))
+        except Exception as e:
+            print(f"Error extracting {url}: {str(e)}")
+            return None, []
         
-        while urls_to_visit and len(self.visited_urls) < self.max_pages:
-            url = urls_to_visit.pop(0)
-            
-            if url in self.visited_urls:
-                continue
-            
-            self.visited_urls.add(url)
-            
-            try:
-                print(f"Crawling ({len(self.visited_urls)}/{self.max_pages}): {url}")
-                response = requests.get(
-                    url,
-                    timeout=config.REQUEST_TIMEOUT,
-                    headers={'User-Agent': 'Mozilla/5.0 (RAG Support Bot)'}
-                )
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'lxml')
-                
-                # Extract text content
-                text = self.clean_text(soup)
-                
-                if text.strip():
-                    self.pages_content.append({
-                        'url': url,
-                        'content': text,
-                        'title': soup.title.string if soup.title else url
-                    })
-                
-                # Get links for further crawling
-                links = self.get_links(soup, url)
-                urls_to_visit.extend(links)
-                
-                # Be polite - add delay between requests
-                time.sleep(config.REQUEST_DELAY)
-                
-            except Exception as e:
-                print(f"Error crawling {url}: {str(e)}")
-                continue
+        metrics.observe_stage("extract_page", extracted['seconds'])
+        # The frontier drops links that are already queued
+        links = [
+            link for link in map(dedup.canonicalize_url, extracted['links'])
+            if self.is_valid_url(link) and link not in self.visited_urls
+        ]
         
-        print(f"\nCrawling completed!")
-        print(f"Total pages crawled: {len(self.pages_content)}")
+        if self._is_duplicate(url, extracted):
+            self.skipped_duplicates += 1
+            return None, links
         
-        return self.pages_content
-
+        if not extracted['text'].strip():
+            return None, links
+        
+        page = {
+            'url': extracted['canonical_url'],
+            'content': extracted['text'],
+            'title': extracted['title'] or url
+        }
+        return page, links
+    
+    def _is_duplicate(self, url: str, page: Dict) -> bool:
+        """
+        Resolve the page's rel=canonical URL and check it against pages already seen
+        Sets page['canonical_url'] to the URL the page should be stored under
+        """
+        page['canonical_url'] = url
+        canonical = page.get('canonical')
+        if canonical:
+            canonical = dedup.canonicalize_url(canonical)
+            if self.is_valid_url(canonical) and canonical != url:
+                if canonical in self.visited_urls:
+                    print(f"Skipping {url}: canonical page {canonical} already crawled")
+                    return True
+                # Store under the canonical URL and never fetch it separately
+                self.visited_urls.add(canonical)
+                page['canonical_url'] = canonical
+        
+        if self.duplicates is not None and page['text'].strip():
+            duplicate_of = self.duplicates.check(page['text'], page['canonical_url'])
+            if duplicate_of is not None:
+                print(f"Skipping {url}: near-duplicate of {duplicate_of}")
+                return True
+        return False
 
 if __name__ == "__main__":
     # Test the crawler
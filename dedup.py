@@ -0,0 +1,117 @@
+"""
+Duplicate page detection: URL canonicalization and SimHash near-duplicates
+Keeps the same content served under many URLs from being embedded many times
+"""
+import hashlib
+import re
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+import numpy as np
+import config
+
+
+# Query parameters that identify a campaign or visitor, not content
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "ref", "ref_src", "igshid", "spm"
+}
+TRACKING_PREFIXES = ("utm_",)
+
+_WORD_RE = re.compile(r"\w+")
+FINGERPRINT_BITS = 64
+# Pigeonhole: fingerprints within BANDS - 1 bits share at least one exact band
+BANDS = 4
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so equivalent forms compare equal:
+    lowercase scheme and host, no default port or fragment,
+    tracking parameters dropped and the remaining query sorted
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        # Malformed port: leave the URL alone apart from the fragment
+        return url.strip().split('#')[0]
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    if parsed.username:
+        host = f"{parsed.username}@{host}"
+
+    params = [
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query = urlencode(sorted(params))
+    return urlunparse((scheme, host, parsed.path or "/", parsed.params, query, ""))
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over lowercase word shingles"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) > shingle_size:
+        shingles = (" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+    else:
+        shingles = iter([" ".join(words)])
+
+    digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(-1, FINGERPRINT_BITS)
+    # Each bit of the fingerprint is the majority vote of that bit across shingles
+    majority = bits.sum(axis=0) * 2 > bits.shape[0]
+    return int.from_bytes(np.packbits(majority).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    """SimHash fingerprints of seen pages, banded for sub-linear lookup"""
+
+    def __init__(self, max_distance: int = None):
+        self.max_distance = config.NEAR_DUPLICATE_DISTANCE if max_distance is None else max_distance
+        if self.max_distance >= BANDS:
+            raise ValueError(f"max_distance must be below {BANDS} for banded lookup")
+        self._band_bits = FINGERPRINT_BITS // BANDS
+        self._bands: List[Dict[int, List[tuple]]] = [{} for _ in range(BANDS)]
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        mask = (1 << self._band_bits) - 1
+        return [(fingerprint >> (band * self._band_bits)) & mask for band in range(BANDS)]
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        """URL of an indexed page within max_distance bits, if any"""
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            for other, url in self._bands[band].get(key, ()):
+                if hamming_distance(fingerprint, other) <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, fingerprint: int, url: str):
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            self._bands[band].setdefault(key, []).append((fingerprint, url))
+
+    def check(self, text: str, url: str) -> Optional[str]:
+        """Return the URL this text duplicates, or record it and return None"""
+        fingerprint = simhash(text)
+        duplicate_of = self.find(fingerprint)
+        if duplicate_of is None:
+            self.add(fingerprint, url)
+        return duplicate_of
+
+
+def drop_near_duplicates(pages: List[Dict]) -> List[Dict]:
+    """Keep the first of each group of near-duplicate pages (by content)"""
+    index = NearDuplicateIndex()
+    unique = []
+    for page in pages:
+        duplicate_of = index.check(page.get('content', ''), page.get('url', ''))
+        if duplicate_of is None:
+            unique.append(page)
+    if len(unique) < len(pages):
+        print(f"Skipped {len(pages) - len(unique)} near-duplicate pages")
+    return unique
@@ -0,0 +1,584 @@
+"""
+Distributed crawl and embed: a coordinator and lease-based workers
+The coordinator owns the crawl frontier and the chunk queue in a SQLite
+database. Worker processes claim URLs or chunk batches under a lease,
+fetch or embed them and report results back; expired leases are retried.
+Pages are de-duplicated, cleaned and chunked, and vectors are written,
+by the coordinator only, so the index sees one writer.
+
+Examples:
+  # Coordinator with 4 local workers
+  python distributed.py coordinator --url https://example.com --max-pages 5000 --workers 4
+
+  # Extra workers on the same machine (the queue is a local SQLite file)
+  python distributed.py worker --db crawl_queue.db
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import numpy as np
+import config
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    score REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS urls_claim ON urls (status, score);
+CREATE TABLE IF NOT EXISTS pages (id INTEGER PRIMARY KEY, page TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS chunk_batches (
+    id INTEGER PRIMARY KEY,
+    chunks TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    embeddings BLOB,
+    dimensions INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS batches_claim ON chunk_batches (status, id);
+CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, last_seen REAL, urls_done INTEGER DEFAULT 0,
+                                    batches_done INTEGER DEFAULT 0);
+"""
+
+
+class TaskQueue:
+    """SQLite-backed frontier, page inbox and chunk-batch queue shared by coordinator and workers"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction; IMMEDIATE so concurrent claims never grab the same row"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
+
+    # Shared settings
+
+    def set_meta(self, key: str, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_meta(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def reserve_slot(self, name: str, interval: float) -> float:
+        """
+        Cross-process rate limiting: reserve the next request slot for `name`
+        and return how long the caller must wait before using it
+        """
+        if interval <= 0:
+            return 0.0
+        with self.transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (f"slot:{name}",)).fetchone()
+            now = time.time()
+            slot = max(now, json.loads(row[0]) if row else 0.0)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         (f"slot:{name}", json.dumps(slot + interval)))
+        return slot - now
+
+    # Crawl frontier
+
+    def add_urls(self, entries: List[Tuple[str, int, float]]):
+        """Queue (url, depth, score) entries; URLs already known are ignored"""
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO urls (url, depth, score) VALUES (?, ?, ?)", entries)
+
+    def claim_urls(self, worker_id: str, limit: int, lease_seconds: float) -> List[Tuple[str, int]]:
+        """Lease the best pending URLs, within the crawl's page budget"""
+        with self.transaction() as conn:
+            max_pages = self.get_meta("max_pages", 0)
+            started = conn.execute(
+                "SELECT COUNT(*) FROM urls WHERE status NOT IN ('pending', 'alias')"
+            ).fetchone()[0]
+            limit = min(limit, max(0, max_pages - started))
+            if not limit:
+                return []
+            rows = conn.execute(
+                "SELECT url, depth FROM urls WHERE status = 'pending' ORDER BY score, rowid LIMIT ?", (limit,)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE urls SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE url = ?",
+                [(worker_id, time.time() + lease_seconds, url) for url, _ in rows]
+            )
+        return rows
+
+    def complete_url(self, url: str, worker_id: str, page: Optional[Dict],
+                     links: List[Tuple[str, int, float]], aliases: List[str] = ()) -> bool:
+        """
+        Report a crawled URL: its page (if any) goes to the coordinator's inbox,
+        its links join the frontier and `aliases` (e.g. its canonical URL) are
+        marked 'alias' so they are not fetched again; aliases were never
+        fetched, so they do not count against max_pages. Ignored if the lease was lost.
+        """
+        with self.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE urls SET status = 'done', lease_owner = NULL WHERE url = ? AND status = 'leased' "
+                "AND lease_owner = ?", (url, worker_id)
+            ).rowcount
+            if not updated:
+                return False
+            if page is not None:
+                conn.execute("INSERT INTO pages (page) VALUES (?)", (json.dumps(page, ensure_ascii=False),))
+            conn.executemany("INSERT OR IGNORE INTO urls (url, depth, score) VALUES (?, ?, ?)", links)
+            for alias in aliases:
+                conn.execute("INSERT OR IGNORE INTO urls (url, depth, score, status) VALUES (?, 0, 0, 'alias')",
+                             (alias,))
+                conn.execute("UPDATE urls SET status = 'alias' WHERE url = ? AND status = 'pending'", (alias,))
+            conn.execute("UPDATE workers SET urls_done = urls_done + 1 WHERE worker_id = ?", (worker_id,))
+        return True
+
+    def extend_url_lease(self, url: str, worker_id: str, lease_seconds: float):
+        """Push back a held URL's lease, e.g. while the worker waits for its fetch slot"""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE urls SET lease_expires = ? WHERE url = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + lease_seconds, url, worker_id)
+            )
+
+    def fail_url(self, url: str, worker_id: str, error: str, permanent: bool = False):
+        """Release a URL for retry, or give up after the last attempt (or a permanent error)"""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE urls SET status = CASE WHEN ? OR attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_owner = NULL, error = ? WHERE url = ? AND status = 'leased' AND lease_owner = ?",
+                (permanent, config.DISTRIBUTED_MAX_ATTEMPTS, error, url, worker_id)
+            )
+
+    # Page inbox (coordinator side)
+
+    def take_pages(self, limit: int) -> List[Tuple[int, Dict]]:
+        rows = self.conn.execute("SELECT id, page FROM pages ORDER BY id LIMIT ?", (limit,)).fetchall()
+        return [(row_id, json.loads(page)) for row_id, page in rows]
+
+    def delete_pages(self, ids: List[int]):
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM pages WHERE id = ?", [(row_id,) for row_id in ids])
+
+    # Chunk batches
+
+    def add_chunk_batch(self, chunks: List[Dict]):
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO chunk_batches (chunks) VALUES (?)", (json.dumps(chunks, ensure_ascii=False),))
+
+    def claim_chunk_batch(self, worker_id: str, lease_seconds: float) -> Optional[Tuple[int, List[Dict]]]:
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT id, chunks FROM chunk_batches WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE chunk_batches SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker_id, time.time() + lease_seconds, row[0])
+            )
+        return row[0], json.loads(row[1])
+
+    def complete_chunk_batch(self, batch_id: int, worker_id: str, embeddings: np.ndarray) -> bool:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE chunk_batches SET status = 'embedded', lease_owner = NULL, embeddings = ?, dimensions = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (embeddings.tobytes(), embeddings.shape[1], batch_id, worker_id)
+            ).rowcount
+            if updated:
+                conn.execute("UPDATE workers SET batches_done = batches_done + 1 WHERE worker_id = ?", (worker_id,))
+        return bool(updated)
+
+    def fail_chunk_batch(self, batch_id: int, worker_id: str, error: str):
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE chunk_batches SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_owner = NULL, error = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (config.DISTRIBUTED_MAX_ATTEMPTS, error, batch_id, worker_id)
+            )
+
+    def take_embedded_batches(self, limit: int) -> List[Tuple[int, List[Dict], np.ndarray]]:
+        rows = self.conn.execute(
+            "SELECT id, chunks, embeddings, dimensions FROM chunk_batches WHERE status = 'embedded' "
+            "ORDER BY id LIMIT ?", (limit,)
+        ).fetchall()
+        return [
+            (row_id, json.loads(chunks), np.frombuffer(blob, dtype=np.float32).reshape(-1, dimensions))
+            for row_id, chunks, blob, dimensions in rows
+        ]
+
+    def delete_chunk_batches(self, ids: List[int]):
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM chunk_batches WHERE id = ?", [(row_id,) for row_id in ids])
+
+    # Leases and progress
+
+    def requeue_expired(self) -> int:
+        """Return expired leases to the queue, failing tasks that used up their attempts"""
+        now = time.time()
+        requeued = 0
+        with self.transaction() as conn:
+            for table in ("urls", "chunk_batches"):
+                requeued += conn.execute(
+                    f"UPDATE {table} SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                    f"lease_owner = NULL, error = 'lease expired' WHERE status = 'leased' AND lease_expires < ?",
+                    (config.DISTRIBUTED_MAX_ATTEMPTS, now)
+                ).rowcount
+        return requeued
+
+    def heartbeat(self, worker_id: str):
+        self.conn.execute(
+            "INSERT INTO workers (worker_id, last_seen) VALUES (?, ?) "
+            "ON CONFLICT (worker_id) DO UPDATE SET last_seen = excluded.last_seen",
+            (worker_id, time.time())
+        )
+
+    def counts(self) -> Dict:
+        url_counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status").fetchall())
+        batch_counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM chunk_batches GROUP BY status").fetchall())
+        return {
+            'urls': url_counts,
+            'pages_waiting': self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0],
+            'batches': batch_counts,
+            'active_workers': self.conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE last_seen > ?", (time.time() - config.DISTRIBUTED_LEASE_SECONDS,)
+            ).fetchone()[0]
+        }
+
+
+class Coordinator:
+    """Seeds the frontier, turns crawled pages into chunk batches and writes embedded batches to the index"""
+
+    def __init__(self, db_path: str = None, target_url: str = None, max_pages: int = None,
+                 vector_store=None, new_version: bool = True):
+        from text_processor import TextProcessor
+
+        self.db_path = db_path or config.DISTRIBUTED_DB
+        self.target_url = target_url or config.TARGET_WEBSITE
+        self.max_pages = max_pages or config.MAX_PAGES
+        self.new_version = new_version
+        self._vector_store = vector_store
+        self.processor = TextProcessor(chunk_size=config.CHUNK_SIZE, chunk_overlap=config.CHUNK_OVERLAP)
+        self.queue = None
+        self.workers: List[subprocess.Popen] = []
+
+    @property
+    def vector_store(self):
+        if self._vector_store is None:
+            from vector_store import VectorStore
+            self._vector_store = VectorStore()
+        return self._vector_store
+
+    def seed(self):
+        """Start a fresh queue: crawl settings, robots.txt crawl delay, start page and sitemap URLs"""
+        from crawler import WebCrawler
+
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+        self.queue = TaskQueue(self.db_path)
+
+        crawler = WebCrawler(self.target_url, self.max_pages, extract_workers=0)
+        frontier = crawler.build_frontier()
+        entries = []
+        while frontier:
+            url, depth, score = frontier.pop_entry()
+            entries.append((url, depth, score))
+
+        self.queue.set_meta("target_url", self.target_url)
+        self.queue.set_meta("max_pages", self.max_pages)
+        self.queue.set_meta("request_delay", crawler.request_delay)
+        self.queue.set_meta("finished", False)
+        self.queue.add_urls(entries)
+        print(f"Seeded {len(entries)} URLs into {self.db_path}")
+
+    def spawn_workers(self, count: int):
+        """Start local worker processes on the same queue"""
+        for i in range(count):
+            self.workers.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "worker", "--db", self.db_path,
+                 "--id", f"{socket.gethostname()}-{i}"]
+            ))
+
+    def run(self, workers: int = 0) -> Dict:
+        """Crawl and index until the frontier and chunk queue are drained; returns totals"""
+        import boilerplate
+        import dedup
+
+        self.seed()
+        collection = self.vector_store.create_build_collection() if self.new_version else None
+        self.spawn_workers(workers)
+
+        duplicates = dedup.NearDuplicateIndex() if config.DEDUP_ENABLED else None
+        stored_urls = set()
+        buffer: List[Dict] = []
+        phrases = None
+        totals = {'pages': 0, 'duplicates': 0, 'chunks': 0, 'indexed': 0}
+        start = time.perf_counter()
+        last_report = 0.0
+
+        def flush_pages():
+            pages = buffer[:]
+            buffer.clear()
+            if config.BOILERPLATE_REMOVAL:
+                pages = boilerplate.strip_boilerplate(pages, phrases)
+            chunks = self.processor.process_documents(pages)
+            for i in range(0, len(chunks), config.DISTRIBUTED_CHUNK_BATCH):
+                self.queue.add_chunk_batch(chunks[i:i + config.DISTRIBUTED_CHUNK_BATCH])
+            totals['chunks'] += len(chunks)
+
+        try:
+            while True:
+                self.queue.requeue_expired()
+
+                # New pages: de-duplicate, learn boilerplate, chunk into batches
+                inbox = self.queue.take_pages(config.INDEX_STREAM_BATCH_PAGES)
+                for _, page in inbox:
+                    if page['url'] in stored_urls or (
+                            duplicates is not None and duplicates.check(page['content'], page['url'])):
+                        totals['duplicates'] += 1
+                        continue
+                    stored_urls.add(page['url'])
+                    buffer.append(page)
+                    totals['pages'] += 1
+                if inbox:
+                    self.queue.delete_pages([row_id for row_id, _ in inbox])
+
+                counts = self.queue.counts()
+                crawl_done = self._crawl_done(counts) and not inbox
+                if phrases is None and (len(buffer) >= config.BOILERPLATE_SAMPLE_PAGES or crawl_done):
+                    phrases = boilerplate.find_boilerplate(buffer) if config.BOILERPLATE_REMOVAL else set()
+                if phrases is not None and buffer and (len(buffer) >= config.INDEX_STREAM_BATCH_PAGES or crawl_done):
+                    flush_pages()
+
+                # Embedded batches: the coordinator is the index's only writer
+                embedded = self.queue.take_embedded_batches(10)
+                for _, chunks, embeddings in embedded:
+                    self.vector_store.add_documents(chunks, collection=collection, embeddings=embeddings.tolist())
+                    totals['indexed'] += len(chunks)
+                if embedded:
+                    self.queue.delete_chunk_batches([row_id for row_id, _, _ in embedded])
+
+                counts = self.queue.counts()
+                batches_open = sum(n for status, n in counts['batches'].items() if status != 'failed')
+                if crawl_done and not buffer and not batches_open and not self.queue.take_pages(1):
+                    break
+
+                # Work is still open: without a live worker it would never finish
+                if self.workers and all(process.poll() is not None for process in self.workers):
+                    codes = [process.returncode for process in self.workers]
+                    raise RuntimeError(f"All {len(self.workers)} workers exited (codes {codes}) "
+                                       f"with work left: urls {counts['urls']} batches {counts['batches']}")
+
+                if time.perf_counter() - last_report > 5:
+                    last_report = time.perf_counter()
+                    print(f"[coordinator] urls {counts['urls']} batches {counts['batches']} "
+                          f"workers {counts['active_workers']} indexed {totals['indexed']}")
+                if not inbox and not embedded:
+                    time.sleep(config.DISTRIBUTED_POLL_INTERVAL)
+        except BaseException:
+            self.queue.set_meta("finished", True)
+            if collection is not None:
+                self.vector_store.discard_collection(collection)
+            raise
+        finally:
+            self.queue.set_meta("finished", True)
+            for process in self.workers:
+                process.wait()
+
+        counts = self.queue.counts()
+        totals['failed_urls'] = counts['urls'].get('failed', 0)
+        totals['failed_batches'] = counts['batches'].get('failed', 0)
+        totals['seconds'] = time.perf_counter() - start
+
+        if collection is not None:
+            if totals['indexed']:
+                self.vector_store.activate_collection(collection.name)
+            else:
+                self.vector_store.discard_collection(collection)
+        if config.SHARED_INDEX_ENABLED and totals['indexed']:
+            self.vector_store.export_shared_snapshot()
+
+        totals['total_count'] = self.vector_store.get_collection_count()
+        return totals
+
+    def _crawl_done(self, counts: Dict) -> bool:
+        """No URL is leased and no pending URL can still be claimed within the budget"""
+        urls = counts['urls']
+        started = sum(n for status, n in urls.items() if status not in ('pending', 'alias'))
+        claimable = urls.get('pending', 0) if started < self.max_pages else 0
+        return not urls.get('leased', 0) and not claimable
+
+
+class Worker:
+    """Claims URLs and chunk batches from the queue until the coordinator finishes"""
+
+    def __init__(self, db_path: str = None, worker_id: str = None):
+        self.db_path = db_path or config.DISTRIBUTED_DB
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.queue = TaskQueue(self.db_path)
+        self.robots = None
+        self.domain = None
+        self.request_delay = config.REQUEST_DELAY
+        self._embedder = None
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            import embeddings
+            self._embedder = embeddings.get_embedding_provider()
+        return self._embedder
+
+    def run(self):
+        import clients
+        from frontier import RobotsPolicy
+
+        import dedup
+
+        target_url = dedup.canonicalize_url(self.queue.get_meta("target_url"))
+        self.domain = urlparse(target_url).netloc
+        self.request_delay = self.queue.get_meta("request_delay", config.REQUEST_DELAY)
+        self.session = clients.get_http_session()
+        if config.RESPECT_ROBOTS_TXT:
+            self.robots = RobotsPolicy(self.session, target_url)
+
+        print(f"[{self.worker_id}] started")
+        while not self.queue.get_meta("finished", False):
+            self.queue.heartbeat(self.worker_id)
+
+            # Embedding first keeps the chunk queue (and the coordinator's memory) short
+            batch = self.queue.claim_chunk_batch(self.worker_id, config.DISTRIBUTED_LEASE_SECONDS)
+            if batch is not None:
+                self.embed_batch(*batch)
+                continue
+
+            claimed = self.queue.claim_urls(self.worker_id, 1, config.DISTRIBUTED_LEASE_SECONDS)
+            for url, depth in claimed:
+                self.crawl_url(url, depth)
+            if not claimed:
+                time.sleep(config.DISTRIBUTED_POLL_INTERVAL)
+        print(f"[{self.worker_id}] finished")
+
+    def embed_batch(self, batch_id: int, chunks: List[Dict]):
+        # The embeddings API budget is shared by every worker through the queue
+        if self.embedder.name == "openai":
+            wait = self.queue.reserve_slot("embeddings", 60.0 / config.EMBEDDING_REQUESTS_PER_MINUTE
+                                           if config.EMBEDDING_REQUESTS_PER_MINUTE > 0 else 0.0)
+            if wait > 0:
+                time.sleep(wait)
+        try:
+            embeddings = self.embedder.embed([chunk['text'] for chunk in chunks])
+        except Exception as e:
+            print(f"[{self.worker_id}] Error embedding batch {batch_id}: {str(e)}")
+            self.queue.fail_chunk_batch(batch_id, self.worker_id, str(e))
+            return
+        self.queue.complete_chunk_batch(batch_id, self.worker_id, np.asarray(embeddings))
+
+    def crawl_url(self, url: str, depth: int):
+        import dedup
+        import html_extract
+        from frontier import frontier_score
+
+        # The crawl delay applies to the site, so every worker takes its turn through the queue
+        wait = self.queue.reserve_slot("fetch", self.request_delay)
+        if wait > 0:
+            self.queue.extend_url_lease(url, self.worker_id, wait + config.DISTRIBUTED_LEASE_SECONDS)
+            time.sleep(wait)
+        try:
+            response = self.session.get(url, timeout=config.REQUEST_TIMEOUT)
+            if 400 <= response.status_code < 500 and response.status_code != 429:
+                self.queue.fail_url(url, self.worker_id, f"HTTP {response.status_code}", permanent=True)
+                return
+            response.raise_for_status()
+            extracted = html_extract.extract_page(response.content, url, config.FAST_EXTRACT)
+        except Exception as e:
+            print(f"[{self.worker_id}] Error crawling {url}: {str(e)}")
+            self.queue.fail_url(url, self.worker_id, str(e))
+            return
+
+        links = []
+        for link in map(dedup.canonicalize_url, extracted['links']):
+            if urlparse(link).netloc == self.domain and (self.robots is None or self.robots.allowed(link)):
+                links.append((link, depth + 1, frontier_score(depth + 1)))
+
+        page_url, aliases = url, []
+        if extracted['canonical']:
+            canonical = dedup.canonicalize_url(extracted['canonical'])
+            if urlparse(canonical).netloc == self.domain and canonical != url:
+                page_url, aliases = canonical, [canonical]
+
+        page = None
+        if extracted['text'].strip():
+            page = {'url': page_url, 'content': extracted['text'], 'title': extracted['title'] or url}
+        self.queue.complete_url(url, self.worker_id, page, links, aliases)
+
+
+def main():
+    """Command-line entry point for the coordinator and workers"""
+    parser = argparse.ArgumentParser(
+        description='Distributed crawl and embed with a SQLite-backed coordinator',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Examples:")[1]
+    )
+    subparsers = parser.add_subparsers(dest='role', required=True)
+
+    coordinator_parser = subparsers.add_parser('coordinator', help='Seed the crawl, chunk pages and write the index')
+    coordinator_parser.add_argument('--url', type=str, default=None, help='Target website URL (overrides .env)')
+    coordinator_parser.add_argument('--max-pages', type=int, default=None, help='Maximum pages to crawl')
+    coordinator_parser.add_argument('--workers', type=int, default=config.DISTRIBUTED_WORKERS,
+                                    help='Local worker processes to start')
+    coordinator_parser.add_argument('--db', type=str, default=None, help='Queue database path')
+    coordinator_parser.add_argument('--add', action='store_true',
+                                    help='Add to the live index instead of building a new version')
+
+    worker_parser = subparsers.add_parser('worker', help='Claim and process crawl and embedding tasks')
+    worker_parser.add_argument('--db', type=str, default=None, help='Queue database path')
+    worker_parser.add_argument('--id', type=str, default=None, help='Worker name (default: host and random suffix)')
+
+    args = parser.parse_args()
+
+    if args.role == 'worker':
+        Worker(args.db, args.id).run()
+        return
+
+    coordinator = Coordinator(args.db, args.url, args.max_pages, new_version=not args.add)
+    totals = coordinator.run(workers=args.workers)
+    print("\n" + "=" * 60)
+    print("Distributed indexing complete!")
+    print("=" * 60)
+    for key, value in totals.items():
+        print(f"{key}: {value:.1f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Embedding providers
+The vector store embeds chunks and queries through a provider chosen by
+EMBEDDING_PROVIDER: the OpenAI API, or a local sentence-transformer model
+exported to ONNX and run on CPU with onnxruntime
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+import clients
+import config
+import metrics
+
+
+# Output sizes of known OpenAI models; others are measured on first use
+OPENAI_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+
+
+class EmbeddingProvider:
+    """Turns texts into vectors; collections record the provider that filled them"""
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+        self._dimensions: Optional[int] = None
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    @property
+    def dimensions(self) -> int:
+        if self._dimensions is None:
+            self._dimensions = len(self.embed(["dimension probe"])[0])
+        return self._dimensions
+
+    @property
+    def model_id(self) -> str:
+        """Identifies vectors that are comparable: same provider and model"""
+        return f"{self.name}:{self.model}"
+
+    def tag(self) -> Dict:
+        """Collection metadata naming this provider, so vectors are never mixed"""
+        return {
+            'embedding_provider': self.name,
+            'embedding_model': self.model,
+            'embedding_dimensions': self.dimensions
+        }
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from the OpenAI API (or a compatible server at OPENAI_BASE_URL)"""
+
+    name = "openai"
+
+    def __init__(self, model: str = None):
+        super().__init__(model or config.EMBEDDING_MODEL)
+        self._dimensions = OPENAI_DIMENSIONS.get(self.model)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """One API call per EMBEDDING_BATCH_LIMIT texts"""
+        embeddings = []
+        client = clients.get_openai_client()
+        for i in range(0, len(texts), config.EMBEDDING_BATCH_LIMIT):
+            with metrics.span("embedding"):
+                response = client.embeddings.create(
+                    input=texts[i:i + config.EMBEDDING_BATCH_LIMIT],
+                    model=self.model
+                )
+            # Responses carry an index; sort to be safe about ordering
+            embeddings.extend(d.embedding for d in sorted(response.data, key=lambda d: d.index))
+        return embeddings
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    Sentence-transformer model on CPU: mean-pooled, L2-normalized
+    token embeddings from an ONNX export
+
+    The model directory holds model.onnx and tokenizer.json (e.g. an ONNX
+    export of sentence-transformers/all-MiniLM-L6-v2). With quantize, the
+    weights are converted to int8 once (model.int8.onnx) and that file is
+    used. Texts are sorted by length so batches carry little padding, and
+    batches run in parallel on a thread pool.
+    """
+
+    name = "local"
+
+    def __init__(self, model_dir: str = None, batch_size: int = None, threads: int = None,
+                 quantize: bool = None, max_tokens: int = None):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir or config.LOCAL_EMBEDDING_MODEL_DIR
+        super().__init__(os.path.basename(os.path.normpath(self.model_dir)))
+        self.batch_size = batch_size or config.LOCAL_EMBEDDING_BATCH_SIZE
+        self.threads = threads or config.LOCAL_EMBEDDING_THREADS
+        quantize = config.LOCAL_EMBEDDING_QUANTIZE if quantize is None else quantize
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_tokens or config.LOCAL_EMBEDDING_MAX_TOKENS)
+        self.tokenizer.no_padding()
+
+        model_path = os.path.join(self.model_dir, "model.onnx")
+        if quantize:
+            model_path = self._quantized(model_path)
+        if model_path.endswith(".int8.onnx"):
+            # int8 vectors differ slightly from float32 ones; keep collections apart
+            self.model += "-int8"
+
+        # Batches run concurrently; split the cores between them
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // self.threads)
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="embed")
+
+    @staticmethod
+    def _quantized(model_path: str) -> str:
+        """Path of an int8 copy of the model, created on first use"""
+        quantized_path = model_path.replace(".onnx", ".int8.onnx")
+        if not os.path.exists(quantized_path):
+            try:
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+            except ImportError:
+                print("onnx is not installed; using the float32 model (pip install onnx to quantize)")
+                return model_path
+            print(f"Quantizing {model_path} to int8...")
+            tmp_path = quantized_path + ".tmp"
+            quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, quantized_path)
+        return quantized_path
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        length = max(len(e.ids) for e in encodings)
+        input_ids = np.zeros((len(texts), length), dtype=np.int64)
+        attention_mask = np.zeros((len(texts), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask,
+                 'token_type_ids': np.zeros_like(input_ids)}
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+
+        # Mean over real tokens, then unit length (as sentence-transformers does)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        with metrics.span("embedding"):
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+            results = self._pool.map(lambda batch: self._embed_batch([texts[i] for i in batch]), batches)
+
+            vectors = np.empty((len(texts), 0), dtype=np.float32)
+            for batch, batch_vectors in zip(batches, results):
+                if vectors.shape[1] == 0:
+                    vectors = np.empty((len(texts), batch_vectors.shape[1]), dtype=np.float32)
+                vectors[batch] = batch_vectors
+        return vectors.tolist()
+
+
+_provider: Optional[EmbeddingProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """The process-wide provider selected by EMBEDDING_PROVIDER"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                if config.EMBEDDING_PROVIDER == "local":
+                    _provider = LocalEmbeddingProvider()
+                elif config.EMBEDDING_PROVIDER == "openai":
+                    _provider = OpenAIEmbeddingProvider()
+                else:
+                    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {config.EMBEDDING_PROVIDER}")
+    return _provider
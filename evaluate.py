@@ -0,0 +1,243 @@
+"""
+Retrieval evaluation: quality vs. cost for different retrieval configurations
+Runs RAGEngine.retrieve_context for a labelled question set and reports
+recall@k, MRR, prompt tokens and retrieval latency side by side
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+import config
+from rag_engine import RAGEngine
+
+
+def normalize_url(url: str) -> str:
+    return url.strip().rstrip('/')
+
+
+def url_matches(retrieved: str, expected: str) -> bool:
+    """Exact match after normalization; an expected URL ending in * matches by prefix"""
+    retrieved = normalize_url(retrieved)
+    if expected.endswith('*'):
+        return retrieved.startswith(expected[:-1].strip())
+    return retrieved == normalize_url(expected)
+
+
+def load_labelled_questions(filepath: str) -> List[Dict]:
+    """
+    Load questions with their expected source URLs
+
+    Supports:
+    - Text file: "question | url1, url2" per line (# comments ignored)
+    - JSON file: [{"question": "...", "expected_urls": ["..."]}]
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    try:
+        items = json.loads(content)
+        if isinstance(items, list):
+            return [
+                {'question': item['question'], 'expected_urls': list(item.get('expected_urls', []))}
+                for item in items
+            ]
+    except json.JSONDecodeError:
+        pass
+
+    questions = []
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line or line.startswith('#') or '|' not in line:
+            continue
+        question, urls = line.split('|', 1)
+        expected = [url.strip() for url in urls.split(',') if url.strip()]
+        if expected:
+            questions.append({'question': question.strip(), 'expected_urls': expected})
+    return questions
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))]
+
+
+class RetrievalEvaluator:
+    """Scores retrieval configurations against labelled questions"""
+
+    def __init__(self, engine: RAGEngine = None):
+        self.engine = engine or RAGEngine()
+        self._encoding = None
+
+    def count_prompt_tokens(self, question: str, contexts: List[Dict]) -> int:
+        """Tokens in the chat prompt that these contexts would produce"""
+        if self._encoding is None:
+            import tiktoken
+            self._encoding = tiktoken.encoding_for_model(config.CHAT_MODEL)
+        messages = self.engine.build_prompt(question, contexts)
+        return sum(len(self._encoding.encode(m['content'])) for m in messages)
+
+    def evaluate(self, questions: List[Dict], top_k: int) -> Dict:
+        """Run every question at one configuration and aggregate the scores"""
+        recalls, reciprocal_ranks, prompt_tokens, latencies = [], [], [], []
+        misses = []
+
+        for item in questions:
+            start = time.perf_counter()
+            contexts = self.engine.retrieve_context(item['question'], top_k=top_k)
+            latencies.append(time.perf_counter() - start)
+
+            urls = [ctx['metadata'].get('url', '') for ctx in contexts]
+            expected = item['expected_urls']
+            found = [e for e in expected if any(url_matches(url, e) for url in urls)]
+            recalls.append(len(found) / len(expected))
+
+            first_rank = next(
+                (rank for rank, url in enumerate(urls, 1) if any(url_matches(url, e) for e in expected)),
+                None
+            )
+            reciprocal_ranks.append(1.0 / first_rank if first_rank else 0.0)
+            if not first_rank:
+                misses.append(item['question'])
+
+            prompt_tokens.append(self.count_prompt_tokens(item['question'], contexts))
+
+        count = len(questions)
+        return {
+            'top_k': top_k,
+            'questions': count,
+            'recall_at_k': sum(recalls) / count if count else 0.0,
+            'mrr': sum(reciprocal_ranks) / count if count else 0.0,
+            'avg_prompt_tokens': sum(prompt_tokens) / count if count else 0.0,
+            'latency_p50_ms': percentile(latencies, 50) * 1000,
+            'latency_p95_ms': percentile(latencies, 95) * 1000,
+            'misses': misses
+        }
+
+    def build_variant(self, pages: List[Dict], chunk_size: int, chunk_overlap: int):
+        """Index pages with different chunking into a build collection (not activated)"""
+        from text_processor import TextProcessor
+
+        processor = TextProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        chunks = processor.process_documents(pages)
+        collection = self.engine.vector_store.create_build_collection()
+        self.engine.vector_store.add_documents(chunks, collection=collection)
+        return collection
+
+    def run(self, questions: List[Dict], configurations: List[Dict], pages: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        Evaluate each configuration
+        Configurations with chunk_size/chunk_overlap need `pages` to build a variant index
+        """
+        results = []
+        store = self.engine.vector_store
+
+        for configuration in configurations:
+            name = configuration.get('name') or f"top_k={configuration.get('top_k', config.TOP_K_RESULTS)}"
+            variant = None
+            if 'chunk_size' in configuration or 'chunk_overlap' in configuration:
+                if pages is None:
+                    raise ValueError(f"Configuration '{name}' changes chunking; pass --pages-file to rebuild")
+                variant = self.build_variant(
+                    pages,
+                    configuration.get('chunk_size', config.CHUNK_SIZE),
+                    configuration.get('chunk_overlap', config.CHUNK_OVERLAP)
+                )
+                store.pin_collection(variant.name)
+
+            print(f"Evaluating {name}...")
+            try:
+                result = self.evaluate(questions, configuration.get('top_k', config.TOP_K_RESULTS))
+            finally:
+                if variant is not None:
+                    store.unpin_collection()
+                    store.discard_collection(variant)
+
+            result['name'] = name
+            result['configuration'] = configuration
+            results.append(result)
+
+        return results
+
+
+def print_report(results: List[Dict], min_recall: Optional[float] = None):
+    """Print configurations side by side and suggest the cheapest one meeting the bar"""
+    header = f"{'configuration':28s} {'recall@k':>9s} {'MRR':>6s} {'tokens':>8s} {'p50 ms':>8s} {'p95 ms':>8s}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['name'][:28]:28s} {r['recall_at_k']:9.3f} {r['mrr']:6.3f} "
+              f"{r['avg_prompt_tokens']:8.0f} {r['latency_p50_ms']:8.1f} {r['latency_p95_ms']:8.1f}")
+
+    if min_recall is not None:
+        passing = [r for r in results if r['recall_at_k'] >= min_recall]
+        if passing:
+            best = min(passing, key=lambda r: (r['avg_prompt_tokens'], r['latency_p50_ms']))
+            print(f"\nCheapest configuration with recall@k >= {min_recall}: {best['name']}")
+        else:
+            print(f"\nNo configuration reaches recall@k >= {min_recall}")
+
+
+def main():
+    """Main entry point for the retrieval evaluation"""
+    parser = argparse.ArgumentParser(
+        description='Evaluate retrieval quality and latency across configurations',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Compare top_k values against the live index
+  python evaluate.py --questions example_eval_questions.txt --top-k 3,5,10
+
+  # Compare chunking variants rebuilt from cached crawl data
+  python evaluate.py --questions labelled.json --configs configs.json --pages-file crawled_data.json
+
+Configurations file (JSON):
+  [{"name": "small chunks", "chunk_size": 250, "chunk_overlap": 25, "top_k": 8},
+   {"name": "default", "top_k": 5}]
+        """
+    )
+    parser.add_argument('--questions', '-q', type=str, required=True, help='Labelled questions (txt or json)')
+    parser.add_argument('--top-k', type=str, default=None, help='Comma-separated top_k values to compare')
+    parser.add_argument('--configs', type=str, default=None, help='JSON file with a list of configurations')
+    parser.add_argument('--pages-file', type=str, default=None,
+                        help='Cached crawl data (crawled_data.json) for chunking variants')
+    parser.add_argument('--min-recall', type=float, default=None, help='Quality bar for the recommendation')
+    parser.add_argument('--output', '-o', type=str, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    questions = load_labelled_questions(args.questions)
+    if not questions:
+        print("ERROR: No labelled questions found!")
+        return
+
+    if args.configs:
+        with open(args.configs, 'r', encoding='utf-8') as f:
+            configurations = json.load(f)
+    elif args.top_k:
+        configurations = [{'top_k': int(k)} for k in args.top_k.split(',') if k]
+    else:
+        configurations = [{'top_k': config.TOP_K_RESULTS}]
+
+    pages = None
+    if args.pages_file:
+        with open(args.pages_file, 'r', encoding='utf-8') as f:
+            pages = json.load(f)['pages']
+
+    evaluator = RetrievalEvaluator()
+    if evaluator.engine.vector_store.get_collection_count() == 0 and pages is None:
+        print("ERROR: Vector store is empty. Please run the indexer first!")
+        return
+
+    print(f"Evaluating {len(configurations)} configurations on {len(questions)} questions")
+    results = evaluator.run(questions, configurations, pages=pages)
+    print_report(results, args.min_recall)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Extractive answers: the sentences of a chunk that best match a question
+Used by the RAG engine's fast path, when one chunk is close enough to the
+question that quoting it beats a chat completion
+"""
+import re
+from typing import List, Optional
+
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from had has have how i if in is it its me my no not of on or our
+so than that the their them then there these they this to was we were what when where which who why will with
+would you your
+""".split())
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def content_words(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if word not in STOPWORDS and len(word) > 1}
+
+
+def extract_answer(question: str, text: str, max_sentences: int = 3) -> Optional[str]:
+    """
+    The up to `max_sentences` sentences sharing the most content words with
+    the question, in their original order; None if no sentence shares any
+    """
+    question_words = content_words(question)
+    sentences = split_sentences(text)
+    if not question_words or not sentences:
+        return None
+
+    scores = [len(question_words & content_words(sentence)) for sentence in sentences]
+    ranked = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+    best = sorted(i for i in ranked[:max_sentences] if scores[i] > 0)
+    if not best:
+        return None
+    return " ".join(sentences[i] for i in best)
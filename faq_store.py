@@ -0,0 +1,203 @@
+"""
+Precomputed FAQ answers for /ask
+generate_faq.py writes each question with its answer and question embedding;
+/ask returns the stored answer when a question is a close match. The store
+records the index version it was built from and is rebuilt in the
+background when the collection changes.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import config
+import embeddings
+import metrics
+
+
+def index_state(vector_store) -> Dict:
+    """What the answers depend on: the active index version and its size"""
+    return {
+        'index_version': vector_store.index_version,
+        'collection_count': vector_store.get_collection_count()
+    }
+
+
+def embedding_model_id() -> str:
+    """Provider and model of the question embeddings; stored vectors from another are not comparable"""
+    return embeddings.get_embedding_provider().model_id
+
+
+def write_store(entries: List[Dict], state: Dict, path: str = None):
+    """
+    Atomically write the store
+    Each entry: {'question', 'answer', 'sources', 'context_used', 'embedding'}
+    """
+    path = path or config.FAQ_STORE_FILE
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            **state,
+            'embedding_model': embedding_model_id(),
+            'built_at': datetime.now().isoformat(),
+            'entries': entries
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"Wrote {len(entries)} FAQ answers to {path}")
+
+
+def build_entries(engine, questions: List[str], results: Dict[int, Dict],
+                  embeddings: Dict[int, List[float]] = None) -> List[Dict]:
+    """Store entries for answered questions; embeds the questions unless embeddings are given"""
+    answered = [i for i in range(len(questions)) if results.get(i) is not None]
+    if embeddings is None:
+        embeddings = engine.vector_store.generate_embeddings([questions[i] for i in answered]) if answered else []
+        embeddings = dict(zip(answered, embeddings))
+    return [
+        {
+            'question': questions[i],
+            'answer': results[i]['answer'],
+            'sources': results[i]['sources'],
+            'context_used': results[i]['context_used'],
+            'embedding': list(embeddings[i])
+        }
+        for i in answered
+    ]
+
+
+class FAQStore:
+    """
+    In-memory view of the FAQ store file
+    Follows changes to the file (e.g. written by another worker) and
+    rebuilds it when the index it was answered from has changed
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or config.FAQ_STORE_FILE
+        # Entries and their question vectors, swapped together on reload
+        self._loaded: Tuple[List[Dict], Optional[np.ndarray]] = ([], None)
+        self._state: Dict = {}
+        self._mtime = None
+        self._checked_at = None
+        self._active = False
+        self._rebuilding = False
+        self._next_rebuild = 0.0
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        """Load the file if it changed since it was last read"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        if mtime is None:
+            self._loaded, self._state = ([], None), {}
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading FAQ store {self.path}: {str(e)}")
+            return
+        entries = data.get('entries', [])
+        self._loaded = (entries, np.asarray([entry['embedding'] for entry in entries], dtype=np.float32))
+        self._state = {key: data.get(key) for key in ('index_version', 'collection_count', 'embedding_model')}
+        print(f"Loaded {len(entries)} FAQ answers (index version {self._state['index_version']})")
+
+    def __len__(self) -> int:
+        return len(self._loaded[0])
+
+    def is_current(self, vector_store) -> bool:
+        return (self._state.get('embedding_model') == embedding_model_id()
+                and {key: self._state.get(key) for key in ('index_version', 'collection_count')}
+                == index_state(vector_store))
+
+    def active(self, engine) -> bool:
+        """
+        Whether lookups can be served; a stale store starts a background
+        rebuild and is skipped until it finishes
+        The file and index are checked at most every FAQ_STORE_CHECK_INTERVAL seconds
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= config.FAQ_STORE_CHECK_INTERVAL:
+                self._checked_at = now
+                self._active = self._check(engine)
+            return self._active
+
+    def _check(self, engine) -> bool:
+        self._reload()
+        if not self._loaded[0]:
+            return False
+        if self.is_current(engine.vector_store):
+            return True
+        if not self._rebuilding and time.monotonic() >= self._next_rebuild:
+            # Retry later if another process holds the rebuild lock or the rebuild fails
+            self._next_rebuild = time.monotonic() + config.FAQ_REBUILD_RETRY_SECONDS
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild, args=(engine,), name="faq-rebuild", daemon=True).start()
+        return False
+
+    def lookup(self, embedding: List[float]) -> Optional[Dict]:
+        """Stored answer for the closest question within FAQ_MATCH_DISTANCE, or None"""
+        entries, vectors = self._loaded
+        if not entries:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        distances = np.einsum('ij,ij->i', vectors - query, vectors - query)
+        best = int(np.argmin(distances))
+        hit = distances[best] <= config.FAQ_MATCH_DISTANCE
+        metrics.record_cache("faq", hit)
+        if not hit:
+            return None
+        entry = entries[best]
+        return {
+            'answer': entry['answer'],
+            'sources': entry['sources'],
+            'context_used': entry['context_used'],
+            'faq_question': entry['question'],
+            'faq_distance': float(distances[best])
+        }
+
+    def _rebuild(self, engine):
+        """Re-answer every stored question against the current index"""
+        lock_path = self.path + ".lock"
+        try:
+            # One rebuild across processes: the lock file is created exclusively
+            if os.path.exists(lock_path) and time.time() - os.path.getmtime(lock_path) > config.FAQ_REBUILD_LOCK_SECONDS:
+                os.remove(lock_path)
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                return
+
+            try:
+                state = index_state(engine.vector_store)
+                entries = self._loaded[0]
+                questions = [entry['question'] for entry in entries]
+                print(f"Index changed; rebuilding {len(questions)} FAQ answers")
+                # Question embeddings only depend on the embedding model; they serve retrieval and the new store
+                if self._state.get('embedding_model') == embedding_model_id():
+                    question_embeddings = [entry['embedding'] for entry in entries]
+                else:
+                    question_embeddings = engine.vector_store.generate_embeddings(questions)
+                results = {
+                    index: result
+                    for index, result, error in engine.answer_questions(
+                        questions, top_k=config.TOP_K_RESULTS, query_embeddings=question_embeddings
+                    )
+                    if error is None
+                }
+                write_store(build_entries(engine, questions, results, dict(enumerate(question_embeddings))),
+                            state, self.path)
+            finally:
+                os.remove(lock_path)
+        except Exception as e:
+            print(f"Error rebuilding FAQ store: {str(e)}")
+        finally:
+            self._rebuilding = False
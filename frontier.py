@@ -0,0 +1,176 @@
+"""
+Crawl frontier: prioritized URL queue, robots.txt rules and sitemap seeding
+Lets a bounded crawl budget go to the pages that matter most
+"""
+import gzip
+import heapq
+import itertools
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from urllib.robotparser import RobotFileParser
+import config
+
+
+DEFAULT_PRIORITY = 0.5  # Sitemap protocol default for URLs without a priority
+
+
+def frontier_score(depth: int, priority: float = DEFAULT_PRIORITY, priority_weight: float = None) -> float:
+    """Lower is crawled sooner: link depth, adjusted by sitemap priority"""
+    weight = config.FRONTIER_PRIORITY_WEIGHT if priority_weight is None else priority_weight
+    return depth - weight * (priority - DEFAULT_PRIORITY)
+
+
+class CrawlFrontier:
+    """
+    URLs waiting to be crawled, best first
+
+    Score = depth - weight * (priority - 0.5): shallow pages first, with
+    sitemap priority able to pull a page forward (or push it back) by
+    up to weight / 2 levels. Ties keep discovery order.
+    """
+
+    def __init__(self, priority_weight: float = None):
+        self.priority_weight = config.FRONTIER_PRIORITY_WEIGHT if priority_weight is None else priority_weight
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._best: Dict[str, float] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._best)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._best
+
+    def score(self, depth: int, priority: float) -> float:
+        return frontier_score(depth, priority, self.priority_weight)
+
+    def push(self, url: str, depth: int, priority: float = DEFAULT_PRIORITY):
+        """Queue a URL; a URL already queued only moves if the new score is better"""
+        score = self.score(depth, priority)
+        if url in self._best and self._best[url] <= score:
+            return
+        self._best[url] = score
+        heapq.heappush(self._heap, (score, next(self._counter), url, depth))
+
+    def pop_entry(self) -> Tuple[str, int, float]:
+        """Best queued URL with its depth and score"""
+        while self._heap:
+            score, _, url, depth = heapq.heappop(self._heap)
+            # Skip entries superseded by a better push
+            if self._best.get(url) == score:
+                del self._best[url]
+                return url, depth, score
+        raise IndexError("pop from an empty frontier")
+
+    def pop(self) -> Tuple[str, int]:
+        """Best queued URL and its depth"""
+        url, depth, _ = self.pop_entry()
+        return url, depth
+
+
+class RobotsPolicy:
+    """robots.txt rules for one site, fetched with the crawler's session"""
+
+    def __init__(self, session, base_url: str, user_agent: str = None):
+        self.user_agent = user_agent or config.CRAWLER_USER_AGENT
+        self.parser = RobotFileParser()
+        self.robots_url = urljoin(base_url, "/robots.txt")
+        self._load(session)
+
+    def _load(self, session):
+        try:
+            response = session.get(self.robots_url, timeout=config.REQUEST_TIMEOUT)
+        except Exception as e:
+            print(f"Could not fetch {self.robots_url}: {str(e)}; crawling without robots rules")
+            self.parser.allow_all = True
+            return
+
+        # Same semantics as RobotFileParser.read: auth errors forbid everything,
+        # other client errors (usually 404) allow everything
+        if response.status_code in (401, 403):
+            self.parser.disallow_all = True
+        elif response.status_code >= 400:
+            self.parser.allow_all = True
+        else:
+            self.parser.parse(response.text.splitlines())
+
+    def allowed(self, url: str) -> bool:
+        return self.parser.can_fetch(self.user_agent, url)
+
+    @property
+    def crawl_delay(self) -> Optional[float]:
+        delay = self.parser.crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+    @property
+    def sitemaps(self) -> List[str]:
+        return list(self.parser.site_maps() or [])
+
+
+def parse_w3c_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse a sitemap lastmod (W3C datetime or date) as an aware UTC datetime"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def fetch_sitemap_entries(session, sitemap_url: str, max_urls: int = None) -> List[Dict]:
+    """
+    URLs listed in a sitemap (following sitemap indexes), with lastmod and priority
+    Each entry: {'url', 'lastmod' (datetime or None), 'priority' (float)}
+    """
+    from lxml import etree
+
+    max_urls = max_urls or config.SITEMAP_MAX_URLS
+    entries = []
+    to_fetch = [sitemap_url]
+    fetched = set()
+
+    while to_fetch and len(entries) < max_urls:
+        url = to_fetch.pop(0)
+        if url in fetched:
+            continue
+        fetched.add(url)
+
+        try:
+            response = session.get(url, timeout=config.REQUEST_TIMEOUT)
+            response.raise_for_status()
+            content = response.content
+            if content[:2] == b"\x1f\x8b":
+                content = gzip.decompress(content)
+            root = etree.fromstring(content, parser=etree.XMLParser(resolve_entities=False, recover=True))
+        except Exception as e:
+            print(f"Could not read sitemap {url}: {str(e)}")
+            continue
+        if root is None:
+            continue
+
+        # Sitemap index: queue the child sitemaps
+        for loc in root.iterfind("{*}sitemap/{*}loc"):
+            if loc.text:
+                to_fetch.append(loc.text.strip())
+
+        for item in root.iterfind("{*}url"):
+            loc = item.findtext("{*}loc")
+            if not loc:
+                continue
+            try:
+                priority = float(item.findtext("{*}priority") or DEFAULT_PRIORITY)
+            except ValueError:
+                priority = DEFAULT_PRIORITY
+            entries.append({
+                'url': loc.strip(),
+                'lastmod': parse_w3c_datetime(item.findtext("{*}lastmod")),
+                'priority': min(1.0, max(0.0, priority))
+            })
+            if len(entries) >= max_urls:
+                break
+
+    return entries
@@ -3,10 +3,12 @@ FAQ Generator: Creates FAQ document from common questions
 This script generates a Markdown FAQ document by asking questions to the RAG system
 """
 from rag_engine import RAGEngine
-from typing import List
+from typing import List, Dict
 import json
 import argparse
 from datetime import datetime
+import config
+import faq_store
 
 
 class FAQGenerator:
@@ -19,19 +21,33 @@ class FAQGenerator:
         self, 
         questions: List[str], 
         output_file: str = "FAQ.md",
-        title: str = "Frequently Asked Questions"
+        title: str = "Frequently Asked Questions",
+        concurrency: int = None,
+        store_file: str = None
     ) -> str:
         """
         Generate FAQ document from list of questions
         
+        All questions are embedded in one batch and retrieved with one
+        multi-query lookup; answers are then generated concurrently
+        under the engine's chat rate limit.
+        Sections are written in question order and flushed as soon as
+        they are ready, so a crash keeps every finished answer.
+        The answers are also saved, with their question embeddings, to the
+        FAQ store that /ask checks first (unless store_file is "").
+        
         Args:
             questions: List of questions to answer
             output_file: Output file path (default: FAQ.md)
             title: Document title
+            concurrency: Answers generated in parallel (default: config.FAQ_CONCURRENCY)
+            store_file: FAQ store path (default: config.FAQ_STORE_FILE; "" to skip)
             
         Returns:
             Path to generated FAQ file
         """
+        concurrency = concurrency or config.FAQ_CONCURRENCY
+        
         # Check if vector store has data
         count = self.rag_engine.vector_store.get_collection_count()
         if count == 0:
@@ -39,52 +55,66 @@ class FAQGenerator:
             print("Run: python indexer.py --reset")
             return None
         
-        print(f"Generating FAQ for {len(questions)} questions...")
+        print(f"Generating FAQ for {len(questions)} questions ({concurrency} in flight)...")
         print(f"Vector store has {count} chunks")
         print("=" * 60)
         
-        # Build FAQ content
-        faq_content = f"# {title}\n\n"
-        faq_content += f"*Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n"
-        faq_content += f"*Based on {count} indexed content chunks*\n\n"
-        faq_content += "---\n\n"
+        # The store is tied to the index the answers came from
+        state = faq_store.index_state(self.rag_engine.vector_store)
+        answers = {}
         
-        # Process each question
-        for i, question in enumerate(questions, 1):
-            print(f"\n[{i}/{len(questions)}] Processing: {question}")
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(
+                f"# {title}\n\n"
+                f"*Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n"
+                f"*Based on {count} indexed content chunks*\n\n"
+                "---\n\n"
+            )
+            f.flush()
+            
+            finished = {}
+            next_to_write = 0
             
+            # Embedded once, for batched retrieval and for the FAQ store
             try:
-                # Get answer from RAG engine
-                result = self.rag_engine.answer_question(question)
-                
-                # Add to FAQ
-                faq_content += f"## {i}. {question}\n\n"
-                faq_content += f"{result['answer']}\n\n"
-                
-                # Add sources if available
-                if result['sources']:
-                    faq_content += "**Sources:**\n\n"
-                    for source in result['sources']:
-                        faq_content += f"- [{source['title']}]({source['url']})\n"
-                    faq_content += "\n"
-                
-                faq_content += "---\n\n"
-                
-                print(f"✓ Answer generated ({len(result['sources'])} sources)")
-                
+                query_embeddings = self.rag_engine.vector_store.generate_embeddings(questions)
             except Exception as e:
-                print(f"✗ Error: {str(e)}")
-                faq_content += f"## {i}. {question}\n\n"
-                faq_content += f"*Error generating answer: {str(e)}*\n\n"
-                faq_content += "---\n\n"
-        
-        # Add footer
-        faq_content += "\n---\n\n"
-        faq_content += "*This FAQ was automatically generated using the RAG Support Bot.*\n"
+                print(f"Embedding questions failed ({str(e)}), retrieving per question")
+                query_embeddings = None
+            
+            results = self.rag_engine.answer_questions(
+                questions, top_k=config.TOP_K_RESULTS, concurrency=concurrency, query_embeddings=query_embeddings
+            )
+            for i, result, error in results:
+                question = questions[i]
+                if error is None:
+                    answers[i] = result
+                    finished[i] = self.format_section(i + 1, question, result)
+                    print(f"✓ [{i + 1}/{len(questions)}] {question} ({len(result['sources'])} sources)")
+                else:
+                    print(f"✗ [{i + 1}/{len(questions)}] {question}: {str(error)}")
+                    finished[i] = (
+                        f"## {i + 1}. {question}\n\n"
+                        f"*Error generating answer: {str(error)}*\n\n"
+                        "---\n\n"
+                    )
+                
+                # Write every section that is now contiguous with what's on disk
+                while next_to_write in finished:
+                    f.write(finished.pop(next_to_write))
+                    next_to_write += 1
+                f.flush()
+            
+            # Add footer
+            f.write("\n---\n\n")
+            f.write("*This FAQ was automatically generated using the RAG Support Bot.*\n")
         
-        # Save to file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(faq_content)
+        if store_file != "":
+            entries = faq_store.build_entries(
+                self.rag_engine, questions, answers,
+                dict(enumerate(query_embeddings)) if query_embeddings is not None else None
+            )
+            faq_store.write_store(entries, state, store_file)
         
         print("\n" + "=" * 60)
         print(f"✓ FAQ generated successfully: {output_file}")
@@ -92,6 +122,20 @@ class FAQGenerator:
         
         return output_file
     
+    def format_section(self, number: int, question: str, result: Dict) -> str:
+        """Markdown for one answered question"""
+        parts = [f"## {number}. {question}\n\n", f"{result['answer']}\n\n"]
+        
+        # Add sources if available
+        if result['sources']:
+            parts.append("**Sources:**\n\n")
+            for source in result['sources']:
+                parts.append(f"- [{source['title']}]({source['url']})\n")
+            parts.append("\n")
+        
+        parts.append("---\n\n")
+        return "".join(parts)
+    
     def load_questions_from_file(self, filepath: str) -> List[str]:
         """
         Load questions from a file
@@ -134,6 +178,9 @@ Examples:
   # Specify custom title
   python generate_faq.py --title "Product FAQ" --output product_faq.md
   
+  # Answer 16 questions at a time
+  python generate_faq.py --input questions.txt --concurrency 16
+  
 Questions file format (text):
   What is this product?
   How do I get started?
@@ -162,6 +209,23 @@ Questions file format (JSON):
         help='FAQ document title',
         default='Frequently Asked Questions'
     )
+    parser.add_argument(
+        '--concurrency', '-c',
+        type=int,
+        help='Number of questions answered in parallel (default: config.FAQ_CONCURRENCY)',
+        default=None
+    )
+    parser.add_argument(
+        '--store',
+        type=str,
+        help='FAQ answer store served by /ask (default: config.FAQ_STORE_FILE)',
+        default=None
+    )
+    parser.add_argument(
+        '--no-store',
+        action='store_true',
+        help='Only write the Markdown FAQ'
+    )
     
     args = parser.parse_args()
     
@@ -198,7 +262,9 @@ Questions file format (JSON):
     output_file = generator.generate_faq(
         questions=questions,
         output_file=args.output,
-        title=args.title
+        title=args.title,
+        concurrency=args.concurrency,
+        store_file="" if args.no_store else args.store
     )
     
     if output_file:
@@ -0,0 +1,191 @@
+"""
+Generation providers
+The RAG engine calls the chat model through a provider chosen by
+GENERATION_PROVIDER: the OpenAI API, or any OpenAI-compatible HTTP server
+(llama.cpp's server, vLLM, Ollama, benchmarks/fake_openai.py). Providers
+bound in-flight completions and time out stalled requests.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import clients
+import config
+import metrics
+
+
+class GenerationBusy(RuntimeError):
+    """No completion slot freed up within GENERATION_QUEUE_TIMEOUT"""
+
+
+class GenerationProvider:
+    """
+    Chat completions over the OpenAI protocol
+    At most `max_concurrency` completions (including open streams) run at
+    once; callers wait up to `queue_timeout` seconds for a slot
+    """
+
+    name = "base"
+
+    def __init__(self, client, model: str, max_concurrency: int = None, queue_timeout: float = None,
+                 timeout: float = None):
+        self.client = client
+        self.model = model
+        self.max_concurrency = config.GENERATION_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        self.queue_timeout = config.GENERATION_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self.timeout = timeout or config.GENERATION_TIMEOUT
+        self._slots = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency > 0 else None
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    def _acquire(self):
+        """Take one of the provider's completion slots, waiting up to queue_timeout"""
+        if self._slots is not None:
+            with metrics.span("generation_queue"):
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            if not acquired:
+                raise GenerationBusy(
+                    f"All {self.max_concurrency} generation slots stayed busy for {self.queue_timeout:g}s"
+                )
+        with self._in_flight_lock:
+            self._in_flight += 1
+
+    def _release(self):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    @contextmanager
+    def _slot(self):
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def complete(self, messages: List[Dict], temperature: float = 0.3, max_tokens: int = 500) -> Dict:
+        """The completion text with its token usage (None when the server does not report it)"""
+        with self._slot():
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=self.timeout
+            )
+        usage = response.usage
+        return {
+            'text': response.choices[0].message.content or "",
+            'prompt_tokens': usage.prompt_tokens if usage is not None else None,
+            'completion_tokens': usage.completion_tokens if usage is not None else None
+        }
+
+    def stream(self, messages: List[Dict], temperature: float = 0.3, max_tokens: int = 500) -> "CompletionStream":
+        """
+        Start a streamed completion; iterate the result for pieces of text
+        Waiting for a slot and sending the request happen here, so
+        GenerationBusy and connection errors surface before any text. The
+        slot is held until the stream is exhausted or closed.
+        """
+        self._acquire()
+        start = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=self.timeout,
+                stream=True
+            )
+        except BaseException:
+            self._release()
+            raise
+        return CompletionStream(response, self._release, start)
+
+    def stats(self) -> Dict:
+        return {
+            'provider': self.name,
+            'model': self.model,
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self._in_flight
+        }
+
+
+class CompletionStream:
+    """Text pieces of a streamed completion; closing it (or reaching the end) frees the provider slot"""
+
+    def __init__(self, response, release, start: float):
+        self._response = response
+        self._chunks = iter(response)
+        self._release = release
+        self._closed = False
+        self._start = start
+        self._first = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self._closed:
+            raise StopIteration
+        try:
+            for chunk in self._chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if self._first:
+                        metrics.observe_stage("time_to_first_token", time.perf_counter() - self._start)
+                        self._first = False
+                    return chunk.choices[0].delta.content
+        except BaseException:
+            self.close()
+            raise
+        self.close()
+        raise StopIteration
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._response.close()
+            self._release()
+
+    def __del__(self):
+        # A stream dropped unread must not keep its slot
+        self.close()
+
+
+class OpenAIGenerationProvider(GenerationProvider):
+    """CHAT_MODEL on the OpenAI API, through the shared client"""
+
+    name = "openai"
+
+    def __init__(self, **limits):
+        super().__init__(clients.get_openai_client(), config.CHAT_MODEL, **limits)
+
+
+class LocalGenerationProvider(GenerationProvider):
+    """A model served by an OpenAI-compatible server at LOCAL_LLM_BASE_URL"""
+
+    name = "local"
+
+    def __init__(self, base_url: str = None, model: str = None, **limits):
+        super().__init__(clients.get_local_llm_client(base_url), model or config.LOCAL_LLM_MODEL, **limits)
+
+
+_provider: Optional[GenerationProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_generation_provider() -> GenerationProvider:
+    """The process-wide provider selected by GENERATION_PROVIDER"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                if config.GENERATION_PROVIDER == "local":
+                    _provider = LocalGenerationProvider()
+                elif config.GENERATION_PROVIDER == "openai":
+                    _provider = OpenAIGenerationProvider()
+                else:
+                    raise ValueError(f"Unknown GENERATION_PROVIDER: {config.GENERATION_PROVIDER}")
+    return _provider
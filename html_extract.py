@@ -0,0 +1,85 @@
+"""
+HTML extraction: page text, title and links
+Module-level functions so they can run in a process pool alongside fetching.
+The fast path uses lxml's tree directly instead of building a BeautifulSoup.
+"""
+import time
+from typing import Dict
+from urllib.parse import urljoin
+
+
+# Elements whose content is never page text
+STRIP_TAGS = ["script", "style", "nav", "footer", "header"]
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse text into single-spaced phrases, as the crawler always has"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+def clean_soup_text(soup) -> str:
+    """Extract and clean text from a BeautifulSoup document (modifies the soup)"""
+    # Remove script and style elements
+    for element in soup(STRIP_TAGS):
+        element.decompose()
+
+    return normalize_whitespace(soup.get_text())
+
+
+def extract_with_soup(html: bytes, url: str) -> Dict:
+    """Reference extraction via BeautifulSoup"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'lxml')
+    title = str(soup.title.string) if soup.title and soup.title.string else None
+    # Links are collected before stripping, as nav/footer links still lead to pages
+    links = [urljoin(url, a['href']).split('#')[0] for a in soup.find_all('a', href=True)]
+    canonical_link = soup.find('link', rel='canonical', href=True)
+    canonical = urljoin(url, canonical_link['href'].strip()) if canonical_link else None
+    text = clean_soup_text(soup)
+    return {'text': text, 'title': title, 'links': links, 'canonical': canonical}
+
+
+def extract_fast(html: bytes, url: str) -> Dict:
+    """Extraction on lxml's native tree: no soup, one pass per concern"""
+    import lxml.html
+    from lxml import etree
+
+    if not html.strip():
+        return {'text': '', 'title': None, 'links': [], 'canonical': None}
+
+    root = lxml.html.document_fromstring(html)
+
+    title_element = root.find('.//title')
+    title = title_element.text if title_element is not None and len(title_element) == 0 else None
+    links = [urljoin(url, href).split('#')[0] for href in root.xpath('//a/@href')]
+    canonical_hrefs = root.xpath(
+        '//link[contains(concat(" ", normalize-space(@rel), " "), " canonical ")]/@href'
+    )
+    canonical = urljoin(url, canonical_hrefs[0].strip()) if canonical_hrefs else None
+
+    # Drop non-content elements (keeping the text that follows them) and comments
+    for element in list(root.iter(*STRIP_TAGS)):
+        if element.getparent() is not None:
+            element.drop_tree()
+    for comment in list(root.iter(etree.Comment, etree.ProcessingInstruction)):
+        if comment.getparent() is not None:
+            comment.drop_tree()
+
+    text = normalize_whitespace("".join(root.itertext()))
+    return {'text': text, 'title': title, 'links': links, 'canonical': canonical}
+
+
+def extract_page(html: bytes, url: str, fast: bool = True) -> Dict:
+    """
+    Extract text, title, absolute links (fragments removed) and the
+    rel=canonical URL from a page
+    The result includes the time spent, so the parent process can record it
+    """
+    start = time.perf_counter()
+    result = extract_fast(html, url) if fast else extract_with_soup(html, url)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
@@ -0,0 +1,69 @@
+"""
+Index versioning: blue/green collections behind an atomic pointer
+Builds write into a fresh versioned collection while the active one keeps
+serving; activation swaps the pointer and keeps a few old versions for rollback
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+import config
+
+
+# Pointer writes made by this process, so its other VectorStores resync at once
+_local_writes = 0
+
+
+def new_collection_name() -> str:
+    """Name for a new versioned collection, e.g. website_content_v20250101120000"""
+    return f"{config.COLLECTION_NAME}_v{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+
+
+def version_of(collection_name: str) -> str:
+    """Version label of a collection ('initial' for the unversioned legacy collection)"""
+    prefix = f"{config.COLLECTION_NAME}_v"
+    if collection_name.startswith(prefix):
+        return collection_name[len(prefix):]
+    return "initial"
+
+
+def read_pointer(path: str = None) -> Dict:
+    """Read the pointer file: {'active': name, 'history': [previous names, newest first]}"""
+    path = path or config.INDEX_POINTER_FILE
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'active': config.COLLECTION_NAME, 'history': []}
+
+
+def write_pointer(active: str, history: List[str], path: str = None):
+    """Atomically replace the pointer file"""
+    path = path or config.INDEX_POINTER_FILE
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'active': active,
+            'history': history,
+            'activated_at': datetime.now().isoformat()
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+
+    global _local_writes
+    _local_writes += 1
+
+
+def local_writes() -> int:
+    """Number of pointer writes made by this process"""
+    return _local_writes
+
+
+def pointer_mtime(path: str = None) -> Optional[int]:
+    """Modification time of the pointer file, or None if it does not exist yet"""
+    try:
+        return os.stat(path or config.INDEX_POINTER_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
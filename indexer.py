@@ -1,7 +1,9 @@
 """
 Indexer: Crawls website, processes content, and stores in vector database
 """
+import boilerplate
 import config
+import dedup
 from crawler import WebCrawler
 from text_processor import TextProcessor
 from vector_store import VectorStore
@@ -10,20 +12,42 @@ import os
 from datetime import datetime
 
 
+class CrawlDataWriter:
+    """Writes crawl data in the save_crawled_data format one page at a time"""
+    
+    def __init__(self, filename: str, target_url: str):
+        self.file = open(filename, 'w', encoding='utf-8')
+        self.count = 0
+        header = json.dumps({'timestamp': datetime.now().isoformat(), 'target_url': target_url}, ensure_ascii=False)
+        self.file.write(header[:-1] + ', "pages": [\n')
+    
+    def write(self, page: dict):
+        if self.count:
+            self.file.write(',\n')
+        self.file.write(json.dumps(page, ensure_ascii=False))
+        self.count += 1
+    
+    def close(self):
+        self.file.write(f'\n], "total_pages": {self.count}}}\n')
+        self.file.close()
+
+
 class Indexer:
     """Main indexer class that orchestrates the crawling and indexing process"""
     
-    def __init__(self, target_url: str = None, max_pages: int = None):
+    def __init__(self, target_url: str = None, max_pages: int = None, vector_store: VectorStore = None,
+                 modified_since: datetime = None):
         self.target_url = target_url or config.TARGET_WEBSITE
         self.max_pages = max_pages or config.MAX_PAGES
         
         # Initialize components
-        self.crawler = WebCrawler(self.target_url, self.max_pages)
+        self.crawler = WebCrawler(self.target_url, self.max_pages, modified_since=modified_since)
         self.processor = TextProcessor(
             chunk_size=config.CHUNK_SIZE,
             chunk_overlap=config.CHUNK_OVERLAP
         )
-        self.vector_store = VectorStore()
+        # Reuse the caller's store (e.g. the API's) when given
+        self.vector_store = vector_store or VectorStore()
     
     def save_crawled_data(self, pages: list, filename: str = "crawled_data.json"):
         """Save crawled data to a JSON file for backup"""
@@ -50,64 +74,166 @@ class Indexer:
         print(f"Loaded {data['total_pages']} pages from {filename}")
         return data['pages']
     
+    def chunk_pages(self, pages: list) -> list:
+        """
+        Chunk crawled pages for embedding
+        Near-duplicate pages (e.g. in older cached data) are dropped first,
+        then text repeated across many pages is stripped
+        """
+        if config.DEDUP_ENABLED:
+            pages = dedup.drop_near_duplicates(pages)
+        if config.BOILERPLATE_REMOVAL:
+            pages = boilerplate.remove_boilerplate(pages)
+        return self.processor.process_documents(pages)
+    
+    def store_chunks(self, chunks: list, new_version: bool = False) -> int:
+        """
+        Embed and store chunks, returning the live collection count
+        
+        With new_version, chunks go into a fresh collection that is swapped
+        in atomically once complete, so queries never see a partial index
+        """
+        if new_version:
+            build = self.vector_store.create_build_collection()
+            try:
+                self.vector_store.add_documents(chunks, collection=build)
+            except Exception:
+                self.vector_store.discard_collection(build)
+                raise
+            self.vector_store.activate_collection(build.name)
+        else:
+            self.vector_store.add_documents(chunks)
+        
+        # Publish a snapshot so multi-worker API servers hot-swap to it
+        if config.SHARED_INDEX_ENABLED:
+            self.vector_store.export_shared_snapshot()
+        
+        return self.vector_store.get_collection_count()
+    
+    def crawl_and_index(self, new_version: bool = False, filename: str = "crawled_data.json") -> dict:
+        """
+        Crawl and index in one pass, holding at most a batch of pages in memory
+        
+        Pages stream from the crawler to the crawl cache file and, in
+        batches, through chunking and embedding. Boilerplate is learned
+        from the first BOILERPLATE_SAMPLE_PAGES pages (the whole crawl
+        when it is smaller). Returns page, chunk and collection counts.
+        """
+        collection = self.vector_store.create_build_collection() if new_version else None
+        writer = CrawlDataWriter(filename, self.target_url)
+        buffer = []
+        phrases = None
+        totals = {'pages': 0, 'chunks': 0}
+        
+        def flush():
+            pages = buffer
+            if config.BOILERPLATE_REMOVAL:
+                pages = boilerplate.strip_boilerplate(pages, phrases)
+            chunks = self.processor.process_documents(pages)
+            if chunks:
+                self.vector_store.add_documents(chunks, collection=collection)
+            totals['chunks'] += len(chunks)
+            buffer.clear()
+        
+        try:
+            for page in self.crawler.iter_pages():
+                writer.write(page)
+                buffer.append(page)
+                totals['pages'] += 1
+                if phrases is None and len(buffer) >= config.BOILERPLATE_SAMPLE_PAGES:
+                    phrases = boilerplate.find_boilerplate(buffer) if config.BOILERPLATE_REMOVAL else set()
+                if phrases is not None and len(buffer) >= config.INDEX_STREAM_BATCH_PAGES:
+                    flush()
+            
+            if buffer:
+                if phrases is None:
+                    phrases = boilerplate.find_boilerplate(buffer) if config.BOILERPLATE_REMOVAL else set()
+                flush()
+        except Exception:
+            if collection is not None:
+                self.vector_store.discard_collection(collection)
+            raise
+        finally:
+            writer.close()
+            print(f"Saved crawled data to {filename}")
+        
+        if collection is not None:
+            if totals['chunks']:
+                self.vector_store.activate_collection(collection.name)
+            else:
+                self.vector_store.discard_collection(collection)
+        
+        # Publish a snapshot so multi-worker API servers hot-swap to it
+        if config.SHARED_INDEX_ENABLED and totals['chunks']:
+            self.vector_store.export_shared_snapshot()
+        
+        totals['total_count'] = self.vector_store.get_collection_count()
+        return totals
+    
     def run(self, use_cached: bool = False, reset: bool = False):
         """
         Run the complete indexing pipeline
         
         Args:
             use_cached: Use cached crawled data if available
-            reset: Reset the vector store before indexing
+            reset: Build a new index version instead of adding to the live one
         """
         print("=" * 60)
         print("RAG Support Bot - Indexing Pipeline")
         print("=" * 60)
         
-        # Step 1: Reset vector store if requested
+        # Step 1: Decide whether to build a new index version
         if reset:
-            print("\n[1/4] Resetting vector store...")
-            self.vector_store.reset_collection()
+            print("\n[1/4] Building a new index version (live index keeps serving)")
         else:
-            print("\n[1/4] Skipping reset (use reset=True to reset)")
-        
-        # Step 2: Crawl or load cached data
-        print("\n[2/4] Crawling website...")
+            print("\n[1/4] Adding to the live index (use reset=True to rebuild)")
         
+        # Step 2: Load cached data, or crawl and index in one streaming pass
+        pages = None
         if use_cached:
             pages = self.load_crawled_data()
             if pages is None:
                 print("No cached data found, starting fresh crawl...")
-                pages = self.crawler.crawl()
-                self.save_crawled_data(pages)
-        else:
-            pages = self.crawler.crawl()
-            self.save_crawled_data(pages)
-        
-        if not pages:
-            print("ERROR: No pages crawled. Exiting.")
-            return
-        
-        # Step 3: Process and chunk documents
-        print("\n[3/4] Processing and chunking documents...")
-        chunks = self.processor.process_documents(pages)
-        
-        if not chunks:
-            print("ERROR: No chunks created. Exiting.")
-            return
-        
-        print(f"Created {len(chunks)} chunks from {len(pages)} pages")
         
-        # Step 4: Generate embeddings and store in vector database
-        print("\n[4/4] Generating embeddings and storing in vector database...")
-        self.vector_store.add_documents(chunks)
+        if pages is None:
+            print("\n[2/4] Crawling website (pages are chunked and embedded as they arrive)...")
+            totals = self.crawl_and_index(new_version=reset)
+            if not totals['pages']:
+                print("ERROR: No pages crawled. Exiting.")
+                return
+            if not totals['chunks']:
+                print("ERROR: No chunks created. Exiting.")
+                return
+            page_count, chunk_count, total_count = totals['pages'], totals['chunks'], totals['total_count']
+        else:
+            if not pages:
+                print("ERROR: No pages crawled. Exiting.")
+                return
+            
+            # Step 3: Process and chunk documents
+            print("\n[3/4] Processing and chunking documents...")
+            chunks = self.chunk_pages(pages)
+            
+            if not chunks:
+                print("ERROR: No chunks created. Exiting.")
+                return
+            
+            print(f"Created {len(chunks)} chunks from {len(pages)} pages")
+            
+            # Step 4: Generate embeddings and store in vector database
+            print("\n[4/4] Generating embeddings and storing in vector database...")
+            total_count = self.store_chunks(chunks, new_version=reset)
+            page_count, chunk_count = len(pages), len(chunks)
         
         # Summary
         print("\n" + "=" * 60)
         print("Indexing Complete!")
         print("=" * 60)
         print(f"Target URL: {self.target_url}")
-        print(f"Pages crawled: {len(pages)}")
-        print(f"Chunks created: {len(chunks)}")
-        print(f"Vector store count: {self.vector_store.get_collection_count()}")
+        print(f"Pages crawled: {page_count}")
+        print(f"Chunks created: {chunk_count}")
+        print(f"Vector store count: {total_count}")
+        print(f"Index version: {self.vector_store.index_version}")
         print("\nYou can now start the API server with: python main.py")
         print("=" * 60)
 
@@ -137,15 +263,40 @@ def main():
     parser.add_argument(
         '--reset',
         action='store_true',
-        help='Reset vector store before indexing'
+        help='Rebuild into a new index version and swap it in when done'
+    )
+    parser.add_argument(
+        '--modified-since',
+        type=str,
+        help='Incremental recrawl: skip sitemap pages whose lastmod is not after this date (e.g. 2024-05-01)',
+        default=None
+    )
+    parser.add_argument(
+        '--rollback',
+        action='store_true',
+        help='Reactivate the previous index version and exit'
     )
     
     args = parser.parse_args()
     
+    if args.rollback:
+        from vector_store import VectorStore
+        restored = VectorStore().rollback()
+        print(f"Active collection: {restored}" if restored else "No previous index version to roll back to")
+        return
+    
+    modified_since = None
+    if args.modified_since:
+        from frontier import parse_w3c_datetime
+        modified_since = parse_w3c_datetime(args.modified_since)
+        if modified_since is None:
+            parser.error(f"Invalid --modified-since date: {args.modified_since}")
+    
     # Create indexer
     indexer = Indexer(
         target_url=args.url,
-        max_pages=args.max_pages
+        max_pages=args.max_pages,
+        modified_since=modified_since
     )
     
     # Run indexing
@@ -1,23 +1,89 @@
 """
 Main FastAPI application for the RAG Support Bot
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
-import uvicorn
+from typing import Optional, List
+import threading
+import clients
 import config
-from rag_engine import RAGEngine
+import generation
+import search_filters
+
+# The RAG engine pulls in the OpenAI and Chroma clients, so it is built on
+# first use (or by the startup warm-up) rather than at import time
+rag_engine = None
+_rag_engine_lock = threading.Lock()
+
+
+def get_rag_engine():
+    """Return the shared RAG engine, building and warming it on first use"""
+    global rag_engine
+    if rag_engine is None:
+        with _rag_engine_lock:
+            if rag_engine is None:
+                from rag_engine import RAGEngine
+                engine = RAGEngine()
+                engine.warm_up()
+                rag_engine = engine
+    return rag_engine
+
+
+_batch_jobs = None
+
+
+def get_batch_jobs():
+    """Return the process-wide store of background /ask/batch jobs"""
+    global _batch_jobs
+    if _batch_jobs is None:
+        from batch_jobs import BatchJobStore
+        _batch_jobs = BatchJobStore()
+    return _batch_jobs
+
+
+_session_store = None
+
+
+def get_session_store():
+    """Return the process-wide store of conversation sessions"""
+    global _session_store
+    if _session_store is None:
+        from sessions import ConversationStore
+        _session_store = ConversationStore()
+    return _session_store
+
+
+def is_ready() -> bool:
+    """Whether the RAG engine has finished initializing"""
+    return rag_engine is not None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Optionally warm up the RAG engine in the background after startup"""
+    if config.WARMUP_ON_STARTUP:
+        threading.Thread(target=_warm_up, name="rag-warmup", daemon=True).start()
+    yield
+
+
+def _warm_up():
+    try:
+        get_rag_engine()
+        print("RAG engine warmed up")
+    except Exception as e:
+        print(f"Error warming up RAG engine: {str(e)}")
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="RAG Support Bot API",
     description="A Q&A support bot using Retrieval Augmented Generation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Initialize RAG engine
-rag_engine = RAGEngine()
-
 
 # Request/Response Models
 class CrawlRequest(BaseModel):
@@ -35,6 +101,16 @@ class CrawlRequest(BaseModel):
     )
 
 
+class SearchFilters(BaseModel):
+    """Restricts retrieval to part of the site"""
+    url_prefix: Optional[str] = Field(
+        default=None,
+        description="Only pages under this path, matched by whole segments (e.g. /docs/ or https://example.com/fr/)"
+    )
+    title: Optional[str] = Field(default=None, description="Only pages with exactly this title")
+    tags: Optional[List[str]] = Field(default=None, description="Only pages carrying all of these tags")
+
+
 class QuestionRequest(BaseModel):
     """Request model for asking questions"""
     question: str = Field(..., description="The question to ask", min_length=1)
@@ -44,6 +120,37 @@ class QuestionRequest(BaseModel):
         ge=1,
         le=10
     )
+    filters: Optional[SearchFilters] = Field(
+        default=None,
+        description="Only retrieve context from matching pages"
+    )
+    session_id: Optional[str] = Field(
+        default=None,
+        description="Conversation to continue (created on first use); follow-ups are resolved against its history",
+        min_length=1,
+        max_length=128
+    )
+
+
+class BatchQuestionRequest(BaseModel):
+    """Request model for answering many questions at once"""
+    questions: List[str] = Field(
+        ...,
+        description="Questions to answer",
+        min_length=1,
+        max_length=config.BATCH_MAX_QUESTIONS
+    )
+    top_k: Optional[int] = Field(
+        default=None,
+        description="Number of context chunks to retrieve per question (default: 5)",
+        ge=1,
+        le=10
+    )
+    background: Optional[bool] = Field(
+        default=None,
+        description="Run as a background job and return a job handle "
+                    "(default: only for batches larger than BATCH_JOB_THRESHOLD)"
+    )
 
 
 class Source(BaseModel):
@@ -58,6 +165,9 @@ class QuestionResponse(BaseModel):
     answer: str
     sources: List[Source]
     context_used: int
+    answer_path: Optional[str] = None
+    session_id: Optional[str] = None
+    standalone_question: Optional[str] = None
 
 
 class CrawlResponse(BaseModel):
@@ -67,12 +177,15 @@ class CrawlResponse(BaseModel):
     pages_crawled: int
     chunks_created: int
     total_chunks_indexed: int
+    index_version: str
 
 
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
-    collection_count: int
+    ready: bool
+    collection_count: Optional[int] = None
+    index_version: Optional[str] = None
 
 
 # API Endpoints
@@ -84,10 +197,15 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "crawl": "/crawl (POST)",
             "ask": "/ask (POST)",
+            "ask_batch": "/ask/batch (POST)",
+            "end_session": "/sessions/{session_id} (DELETE)",
             "regenerate": "/regenerate (POST)",
+            "rollback": "/rollback (POST)",
             "stats": "/stats",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -96,61 +214,235 @@ async def root():
 @app.get("/health", response_model=HealthResponse, tags=["General"])
 async def health_check():
     """
-    Health check endpoint
-    Returns the status of the service and number of documents in the vector store
+    Liveness check endpoint
+    Answers immediately, even while the RAG engine is still starting up.
+    Once ready, also returns the number of documents and the active index version
     """
+    if not is_ready():
+        return {
+            "status": "starting",
+            "ready": False
+        }
+    
     try:
         count = rag_engine.vector_store.get_collection_count()
         return {
             "status": "healthy",
-            "collection_count": count
+            "ready": True,
+            "collection_count": count,
+            "index_version": rag_engine.vector_store.index_version
         }
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Service unhealthy: {str(e)}")
 
 
-@app.post("/ask", response_model=QuestionResponse, tags=["Q&A"])
-async def ask_question(request: QuestionRequest):
+@app.get("/ready", response_model=HealthResponse, tags=["General"])
+def readiness_check():
+    """
+    Readiness check endpoint
+    Initializes the RAG engine if needed; returns 503 if that fails
+    """
+    try:
+        engine = get_rag_engine()
+        return {
+            "status": "ready",
+            "ready": True,
+            "collection_count": engine.vector_store.get_collection_count(),
+            "index_version": engine.vector_store.index_version
+        }
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Service not ready: {str(e)}")
+
+
+@app.post("/ask", response_model=QuestionResponse, response_model_exclude_none=True, tags=["Q&A"])
+def ask_question(request: QuestionRequest):
     """
     Ask a question and get an answer based on crawled website content
     
+    Runs in the worker threadpool so concurrent requests can share
+    batched query embeddings instead of blocking the event loop.
+    
     The bot will:
     1. Retrieve relevant context from the vector database
     2. Generate an answer using the LLM based only on the retrieved context
     3. Return the answer with sources
     """
     try:
+        engine = get_rag_engine()
+        
         # Check if vector store has data
-        if rag_engine.vector_store.get_collection_count() == 0:
+        if engine.vector_store.get_collection_count() == 0:
             raise HTTPException(
                 status_code=400,
                 detail="Vector store is empty. Please run the indexing process first."
             )
         
+        filters = request.filters.model_dump(exclude_none=True) if request.filters else None
+        try:
+            search_filters.build_where(filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
         # Get answer from RAG engine
-        result = rag_engine.answer_question(
-            query=request.question,
-            top_k=request.top_k
-        )
+        if request.session_id:
+            result = engine.answer_in_session(
+                get_session_store().get_or_create(request.session_id),
+                query=request.question,
+                top_k=request.top_k,
+                filters=filters
+            )
+        else:
+            result = engine.answer_question(
+                query=request.question,
+                top_k=request.top_k,
+                filters=filters
+            )
         
         # Format response
         response = {
             "question": request.question,
             "answer": result['answer'],
             "sources": result['sources'],
-            "context_used": result['context_used']
+            "context_used": result['context_used'],
+            "answer_path": result.get('answer_path')
         }
+        if request.session_id:
+            response["session_id"] = request.session_id
+            response["standalone_question"] = result.get('standalone_question')
         
         return response
         
     except HTTPException:
         raise
+    except generation.GenerationBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
+
+
+@app.post("/ask/stream", tags=["Q&A"])
+def ask_question_stream(request: QuestionRequest):
+    """
+    Ask a question and stream the answer as it is generated
+    
+    The response is NDJSON: a `sources` event (sources, context_used,
+    answer_path), `delta` events with pieces of the answer text, then
+    `done` (or `error` if generation fails midway). Sessions are not
+    supported; use POST /ask for follow-up questions.
+    """
+    import json
+    
+    if request.session_id:
+        raise HTTPException(status_code=400, detail="Sessions are not supported for streamed answers; use POST /ask.")
+    
+    try:
+        engine = get_rag_engine()
+        if engine.vector_store.get_collection_count() == 0:
+            raise HTTPException(
+                status_code=400,
+                detail="Vector store is empty. Please run the indexing process first."
+            )
+        
+        filters = request.filters.model_dump(exclude_none=True) if request.filters else None
+        try:
+            search_filters.build_where(filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        events = engine.stream_answer(request.question, top_k=request.top_k, filters=filters)
+    except HTTPException:
+        raise
+    except generation.GenerationBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
+    
+    def stream():
+        try:
+            for event in events:
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({'event': 'error', 'message': f"Error generating answer: {str(e)}"}) + "\n"
+        finally:
+            events.close()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/ask/batch", tags=["Q&A"])
+def ask_batch(request: BatchQuestionRequest):
+    """
+    Answer many questions in one request
+    
+    All questions are embedded together and retrieved with one vectorized
+    query, then answered concurrently. Results are streamed as NDJSON
+    (one JSON object per line, in completion order, each with its `index`).
+    
+    Large batches (or `background: true`) run as a job instead: the response
+    is a job handle to poll at GET /ask/batch/{job_id}.
+    """
+    import json
+    from batch_jobs import format_batch_result
+    
+    questions = [q.strip() for q in request.questions]
+    if any(not q for q in questions):
+        raise HTTPException(status_code=422, detail="Questions must not be empty.")
+    
+    engine = get_rag_engine()
+    if engine.vector_store.get_collection_count() == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="Vector store is empty. Please run the indexing process first."
+        )
+    
+    background = request.background
+    if background is None:
+        background = len(questions) > config.BATCH_JOB_THRESHOLD
+    
+    if background:
+        job = get_batch_jobs().submit(engine, questions, request.top_k)
+        return {
+            "job_id": job.job_id,
+            "status": job.status,
+            "total": len(questions),
+            "poll": f"/ask/batch/{job.job_id}"
+        }
+    
+    def stream():
+        results = engine.answer_questions(questions, top_k=request.top_k)
+        try:
+            for index, result, error in results:
+                yield json.dumps(format_batch_result(questions, index, result, error)) + "\n"
+        finally:
+            # Runs when the client disconnects too, cancelling questions not yet answered
+            results.close()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/ask/batch/{job_id}", tags=["Q&A"])
+async def get_batch_job(job_id: str, offset: int = 0):
+    """
+    Poll a background batch job
+    Returns its status and the results completed so far; pass `offset`
+    to only fetch results added since the last poll
+    """
+    job = get_batch_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch job {job_id} not found.")
+    return job.to_dict(offset=max(0, offset))
+
+
+@app.delete("/sessions/{session_id}", tags=["Q&A"])
+async def end_session(session_id: str):
+    """End a conversation session and discard its history"""
+    if not get_session_store().delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found.")
+    return {"status": "deleted", "session_id": session_id}
 
 
 @app.post("/crawl", response_model=CrawlResponse, tags=["Indexing"])
-async def crawl_website(request: CrawlRequest):
+def crawl_website(request: CrawlRequest):
     """
     Crawl a website and index its content into the vector database
     
@@ -172,46 +464,33 @@ async def crawl_website(request: CrawlRequest):
         # Create indexer with specified parameters
         indexer = Indexer(
             target_url=request.base_url,
-            max_pages=request.max_pages
+            max_pages=request.max_pages,
+            vector_store=get_rag_engine().vector_store
         )
         
-        # Reset if requested
-        if request.reset:
-            indexer.vector_store.reset_collection()
+        # Crawl, chunk and embed in one streaming pass; a reset builds a
+        # new index version that replaces the live one only once complete
+        totals = indexer.crawl_and_index(new_version=request.reset)
         
-        # Crawl the website
-        pages = indexer.crawler.crawl()
-        
-        if not pages:
+        if not totals['pages']:
             raise HTTPException(
                 status_code=400,
                 detail="No pages were successfully crawled. Please check the URL."
             )
         
-        # Save crawled data
-        indexer.save_crawled_data(pages)
-        
-        # Process and chunk documents
-        chunks = indexer.processor.process_documents(pages)
-        
-        if not chunks:
+        if not totals['chunks']:
             raise HTTPException(
                 status_code=400,
                 detail="No chunks were created from the crawled content."
             )
         
-        # Generate embeddings and store
-        indexer.vector_store.add_documents(chunks)
-        
-        # Get final count
-        total_count = indexer.vector_store.get_collection_count()
-        
         return {
             "status": "success",
             "message": f"Successfully crawled and indexed {request.base_url}",
-            "pages_crawled": len(pages),
-            "chunks_created": len(chunks),
-            "total_chunks_indexed": total_count
+            "pages_crawled": totals['pages'],
+            "chunks_created": totals['chunks'],
+            "total_chunks_indexed": totals['total_count'],
+            "index_version": indexer.vector_store.index_version
         }
         
     except HTTPException:
@@ -221,7 +500,7 @@ async def crawl_website(request: CrawlRequest):
 
 
 @app.post("/regenerate", tags=["Indexing"])
-async def regenerate_embeddings():
+def regenerate_embeddings():
     """
     Regenerate embeddings from cached crawled data
     
@@ -238,7 +517,7 @@ async def regenerate_embeddings():
         import os
         
         # Create indexer
-        indexer = Indexer()
+        indexer = Indexer(vector_store=get_rag_engine().vector_store)
         
         # Load cached crawl data
         if not os.path.exists("crawled_data.json"):
@@ -255,22 +534,18 @@ async def regenerate_embeddings():
                 detail="Failed to load cached data."
             )
         
-        # Reset vector store
-        indexer.vector_store.reset_collection()
-        
-        # Re-process and re-index
-        chunks = indexer.processor.process_documents(pages)
-        indexer.vector_store.add_documents(chunks)
-        
-        # Get final count
-        total_count = indexer.vector_store.get_collection_count()
+        # Re-process and re-index into a new version; the current
+        # index keeps serving until the swap
+        chunks = indexer.chunk_pages(pages)
+        total_count = indexer.store_chunks(chunks, new_version=True)
         
         return {
             "status": "success",
             "message": "Embeddings regenerated successfully from cached data",
             "pages_processed": len(pages),
             "chunks_created": len(chunks),
-            "total_chunks_indexed": total_count
+            "total_chunks_indexed": total_count,
+            "index_version": indexer.vector_store.index_version
         }
         
     except HTTPException:
@@ -279,28 +554,124 @@ async def regenerate_embeddings():
         raise HTTPException(status_code=500, detail=f"Regeneration failed: {str(e)}")
 
 
+@app.post("/rollback", tags=["Indexing"])
+def rollback_index():
+    """
+    Reactivate the previous index version
+    
+    Rebuilds keep the last few versions (INDEX_KEEP_VERSIONS), so a bad
+    rebuild can be undone instantly without re-crawling or re-embedding.
+    """
+    engine = get_rag_engine()
+    restored = engine.vector_store.rollback()
+    if restored is None:
+        raise HTTPException(
+            status_code=400,
+            detail="No previous index version available to roll back to."
+        )
+    
+    if config.SHARED_INDEX_ENABLED:
+        engine.vector_store.export_shared_snapshot()
+    
+    return {
+        "status": "success",
+        "message": f"Rolled back to collection {restored}",
+        "index_version": engine.vector_store.index_version,
+        "total_chunks_indexed": engine.vector_store.get_collection_count()
+    }
+
+
 @app.get("/stats", tags=["General"])
-async def get_stats():
+def get_stats():
     """Get statistics about the indexed content"""
     try:
-        count = rag_engine.vector_store.get_collection_count()
+        engine = get_rag_engine()
+        stats = engine.vector_store.get_collection_stats()
         return {
-            "total_chunks": count,
-            "embedding_model": config.EMBEDDING_MODEL,
-            "chat_model": config.CHAT_MODEL,
+            "total_chunks": stats['total_chunks'],
+            "pages_indexed": stats['pages_indexed'],
+            "chunks_per_url": stats['chunks_per_url'],
+            "last_indexed_at": stats['last_indexed_at'],
+            "index_version": engine.vector_store.index_version,
+            "collection_name": engine.vector_store.collection_name,
+            "embedding_provider": engine.vector_store.embedder.name,
+            "embedding_model": engine.vector_store.embedder.model,
+            "embedding_dimensions": engine.vector_store.embedder.dimensions,
+            "chat_model": engine.generator.model,
+            "generation": engine.generator.stats(),
+            "retrieval_cache": engine.vector_store.retrieval_cache.stats() if engine.vector_store.retrieval_cache else None,
             "chunk_size": config.CHUNK_SIZE,
-            "chunk_overlap": config.CHUNK_OVERLAP
+            "chunk_overlap": config.CHUNK_OVERLAP,
+            "connection_pools": clients.pool_stats()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching stats: {str(e)}")
 
 
-if __name__ == "__main__":
-    # Run the API server
+@app.get("/metrics", response_class=PlainTextResponse, tags=["General"])
+async def get_metrics():
+    """
+    Prometheus metrics: per-stage latency, chat tokens in/out,
+    chunks retrieved and cache hits
+    """
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=false)")
+    
+    import metrics
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def run_server():
+    """Run the API server in development or multi-worker production mode"""
+    import argparse
+    import os
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description='Run the RAG Support Bot API')
+    parser.add_argument(
+        '--production',
+        action='store_true',
+        help='Run several worker processes serving a shared read-only index'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Number of worker processes in production mode',
+        default=config.API_WORKERS
+    )
+    args = parser.parse_args()
+    
+    if not args.production:
+        uvicorn.run(
+            "main:app",
+            host=config.API_HOST,
+            port=config.API_PORT,
+            reload=True
+        )
+        return
+    
+    # Workers inherit the environment, so they all map the same snapshot
+    os.environ["SHARED_INDEX_ENABLED"] = "true"
+    # Export unless the current snapshot already holds the active collection,
+    # whether or not SHARED_INDEX_ENABLED was set before
+    vector_store = get_rag_engine().vector_store
+    if vector_store.collection.count() > 0 and not vector_store.shared_snapshot_is_current():
+        vector_store.export_shared_snapshot()
+    # Workers only serve the snapshot: refuse to start them on an empty or stale index
+    if not vector_store.shared_snapshot_is_current():
+        parser.error(
+            f"No shared index snapshot of collection {vector_store.collection_name} to serve; "
+            "index the site first (python indexer.py)"
+        )
+    
     uvicorn.run(
         "main:app",
         host=config.API_HOST,
         port=config.API_PORT,
-        reload=True
+        workers=args.workers
     )
 
+
+if __name__ == "__main__":
+    run_server()
+
@@ -0,0 +1,179 @@
+"""
+Lightweight metrics: latency spans, histograms and counters
+Rendered in the Prometheus text exposition format for the /metrics endpoint
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+import config
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _format_labels(self.label_names, label_values, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+# Metric families
+STAGE_LATENCY = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each pipeline stage",
+    ("stage",)
+)
+TOKENS = Histogram(
+    "rag_chat_tokens",
+    "Tokens per chat completion",
+    ("direction",),
+    buckets=TOKEN_BUCKETS
+)
+CHUNKS_RETRIEVED = Histogram(
+    "rag_chunks_retrieved",
+    "Context chunks retrieved per question",
+    buckets=COUNT_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    "rag_cache_requests_total",
+    "Cache lookups by cache and result",
+    ("cache", "result")
+)
+
+ANSWER_PATHS = Counter(
+    "rag_answers_total",
+    "Answers by the path that produced them (generated, extractive, faq, no_context), and failed generations (error)",
+    ("path",)
+)
+
+REGISTRY = [STAGE_LATENCY, TOKENS, CHUNKS_RETRIEVED, CACHE_REQUESTS, ANSWER_PATHS]
+
+
+class _NullSpan:
+    """No-op context manager used when metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@contextmanager
+def _timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage)
+
+
+def span(stage: str):
+    """Time a block of code as a pipeline stage: `with metrics.span("chat_completion"): ...`"""
+    if not config.METRICS_ENABLED:
+        return _NULL_SPAN
+    return _timed(stage)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage duration measured elsewhere (e.g. in a worker process)"""
+    if config.METRICS_ENABLED:
+        STAGE_LATENCY.observe(seconds, stage)
+
+
+def observe_tokens(prompt_tokens: int, completion_tokens: int):
+    if config.METRICS_ENABLED:
+        TOKENS.observe(prompt_tokens, "in")
+        TOKENS.observe(completion_tokens, "out")
+
+
+def observe_chunks_retrieved(count: int):
+    if config.METRICS_ENABLED:
+        CHUNKS_RETRIEVED.observe(count)
+
+
+def record_cache(cache: str, hit: bool):
+    if config.METRICS_ENABLED:
+        CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def record_answer_path(path: str):
+    if config.METRICS_ENABLED:
+        ANSWER_PATHS.inc(path)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,75 @@
+"""
+Linear projections of embeddings to fewer dimensions
+Shared index snapshots store projected vectors for a cheap first-pass
+search; the full vectors only re-score the best candidates
+"""
+import os
+from typing import Optional
+import numpy as np
+import config
+
+
+class Projection:
+    """
+    Orthonormal projection: x -> (x - mean) @ components
+    PCA keeps the directions of greatest variance in the indexed vectors; a
+    random projection needs no fitting and roughly preserves distances
+    """
+
+    def __init__(self, components: np.ndarray, mean: np.ndarray, method: str, explained_variance: float = None):
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.method = method
+        self.explained_variance = explained_variance
+
+    @property
+    def dimensions(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dimensions: int, method: str = "pca", sample: int = None,
+            seed: int = 0) -> "Projection":
+        """Fit on (a random sample of) the indexed vectors"""
+        rng = np.random.default_rng(seed)
+        full_dimensions = vectors.shape[1]
+        if method == "random":
+            # QR of a Gaussian matrix gives orthonormal random directions
+            components, _ = np.linalg.qr(rng.standard_normal((full_dimensions, dimensions)))
+            return cls(components, np.zeros(full_dimensions), "random")
+        if method != "pca":
+            raise ValueError(f"Unknown projection method: {method}")
+
+        sample = sample or config.PROJECTION_SAMPLE
+        rows = vectors if len(vectors) <= sample else vectors[np.sort(rng.choice(len(vectors), sample, replace=False))]
+        rows = np.asarray(rows, dtype=np.float64)
+        mean = rows.mean(axis=0)
+        centered = rows - mean
+        # Eigenvectors of the covariance, largest eigenvalues first
+        eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered)
+        order = np.argsort(eigenvalues)[::-1][:dimensions]
+        explained = float(eigenvalues[order].sum() / max(eigenvalues.sum(), 1e-12))
+        return cls(eigenvectors[:, order], mean, "pca", explained)
+
+    def transform(self, vectors: np.ndarray, batch_size: int = 10000) -> np.ndarray:
+        """Project row vectors, in batches so memory-mapped inputs are read once"""
+        if np.ndim(vectors) == 1:
+            return (np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components
+        out = np.empty((len(vectors), self.dimensions), dtype=np.float32)
+        for start in range(0, len(vectors), batch_size):
+            batch = np.asarray(vectors[start:start + batch_size], dtype=np.float32)
+            out[start:start + batch_size] = (batch - self.mean) @ self.components
+        return out
+
+    def save(self, path: str):
+        np.savez(path, components=self.components, mean=self.mean, method=self.method,
+                 explained_variance=np.nan if self.explained_variance is None else self.explained_variance)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Projection"]:
+        """The projection saved at `path`, or None if there is none"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            explained = float(data['explained_variance'])
+            return cls(data['components'], data['mean'], str(data['method']),
+                       None if np.isnan(explained) else explained)
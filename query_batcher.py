@@ -0,0 +1,117 @@
+"""
+Query micro-batcher: coalesces concurrent vector store queries
+Collects query texts arriving within a short window and serves them
+with a single embeddings call and a single multi-query collection lookup
+"""
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+import config
+
+
+# Per-query result keys returned by collection.query
+PER_QUERY_KEYS = ('ids', 'documents', 'metadatas', 'distances', 'embeddings', 'uris', 'data')
+
+
+class QueryBatcher:
+    """Batches concurrent queries against a VectorStore"""
+
+    def __init__(self, vector_store, max_wait_ms: float = None, max_batch_size: int = None):
+        self.vector_store = vector_store
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else config.QUERY_BATCH_WINDOW_MS) / 1000.0
+        self.max_batch_size = max_batch_size or config.QUERY_BATCH_MAX_SIZE
+        self._queue: "queue.Queue[Tuple[str, int, Optional[Dict], Future]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, query_text: str, n_results: int = 5, where: Optional[Dict] = None) -> Dict:
+        """
+        Queue a query and block until its batch has been served
+        Returns results in the same shape as a single-query collection.query;
+        raises TimeoutError after QUERY_BATCH_TIMEOUT seconds
+        """
+        future: Future = Future()
+        self._queue.put((query_text, n_results, where, future))
+        return future.result(timeout=config.QUERY_BATCH_TIMEOUT)
+
+    def embed(self, query_text: str) -> List[float]:
+        """Queue a query for embedding only; it shares the batch's embeddings call"""
+        future: Future = Future()
+        self._queue.put((query_text, 0, None, future))
+        return future.result(timeout=config.QUERY_BATCH_TIMEOUT)
+
+    def _collect_batch(self) -> List[Tuple[str, int, Optional[Dict], Future]]:
+        """Wait for the first query, then gather more until the window closes or the batch is full"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        """Worker loop: serve one batch at a time"""
+        while True:
+            batch = self._collect_batch()
+            try:
+                self._serve(batch)
+            except Exception as e:
+                # Fail this batch's remaining queries but keep serving later ones
+                print(f"Error serving query batch: {str(e)}")
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _serve(self, batch: List[Tuple[str, int, Optional[Dict], Future]]):
+        texts = [item[0] for item in batch]
+
+        try:
+            embeddings = self.vector_store.generate_embeddings(texts)
+        except Exception as e:
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+
+        # One embeddings call for the batch, one lookup per distinct filter
+        groups: Dict[str, List[int]] = {}
+        for i, (_, n_results, where, future) in enumerate(batch):
+            if n_results == 0:
+                future.set_result(embeddings[i])
+                continue
+            groups.setdefault(json.dumps(where, sort_keys=True), []).append(i)
+
+        for indices in groups.values():
+            where = batch[indices[0]][2]
+            max_results = max(batch[i][1] for i in indices)
+            try:
+                results = self.vector_store.query_by_embeddings(
+                    [embeddings[i] for i in indices], max_results, where
+                )
+            except Exception as e:
+                for i in indices:
+                    batch[i][3].set_exception(e)
+                continue
+
+            for position, i in enumerate(indices):
+                batch[i][3].set_result(split_results(results, position, batch[i][1]))
+
+
+def split_results(results: Dict, index: int, n_results: int) -> Dict:
+    """Extract one query's results from a multi-query collection.query response"""
+    single = {}
+    for key, value in results.items():
+        if key in PER_QUERY_KEYS and isinstance(value, list):
+            single[key] = [value[index][:n_results]] if value[index] is not None else [None]
+        else:
+            single[key] = value
+    return single
@@ -1,9 +1,14 @@
 """
 RAG Engine: Combines retrieval and generation
 """
-from openai import OpenAI
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Iterator, Optional, Tuple
 import config
+import extractive
+import generation
+import metrics
+import search_filters
+from rate_limiter import RateLimiter
 from vector_store import VectorStore
 
 
@@ -11,31 +16,92 @@ class RAGEngine:
     """Retrieval Augmented Generation engine for Q&A"""
     
     def __init__(self):
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
-        self.vector_store = VectorStore()
+        # Clients are created on first use to keep construction cheap
+        self._generator = None
+        self._vector_store = None
+        self._encoding = None
+        self._faq_store = None
+        
+        # Shared by all bulk answering so concurrent jobs respect one budget
+        self.chat_limiter = RateLimiter(config.CHAT_REQUESTS_PER_MINUTE)
+    
+    @property
+    def generator(self) -> generation.GenerationProvider:
+        """Chat model provider (see generation.py)"""
+        if self._generator is None:
+            self._generator = generation.get_generation_provider()
+        return self._generator
+    
+    @property
+    def vector_store(self) -> VectorStore:
+        if self._vector_store is None:
+            self._vector_store = VectorStore()
+        return self._vector_store
     
-    def retrieve_context(self, query: str, top_k: int = 5) -> List[Dict]:
+    @property
+    def faq_store(self):
+        """Precomputed FAQ answers (see faq_store.py), or None when disabled"""
+        if self._faq_store is None and config.FAQ_STORE_ENABLED:
+            from faq_store import FAQStore
+            self._faq_store = FAQStore()
+        return self._faq_store
+    
+    def warm_up(self):
+        """Create the clients and open the collection ahead of the first question"""
+        self.generator
+        self.vector_store.get_collection_count()
+    
+    def retrieve_context(self, query: str, top_k: int = 5, filters: Optional[Dict] = None,
+                         embedding: List[float] = None) -> List[Dict]:
         """
         Retrieve relevant context from vector store
+        `filters` ({'url_prefix', 'title', 'tags'}) restricts the search to matching chunks;
+        pass the query's `embedding` if it was already computed
+        """
+        where = search_filters.build_where(filters)
+        with metrics.span("retrieve_context"):
+            if embedding is not None:
+                results = self.vector_store.query_by_embeddings([embedding], top_k, where)
+            else:
+                results = self.vector_store.query(query, n_results=top_k, where=where)
+        
+        return self.format_contexts(results)
+    
+    def retrieve_contexts_batch(self, queries: List[str], top_k: int = 5,
+                                embeddings: List[List[float]] = None) -> List[List[Dict]]:
+        """
+        Retrieve context for many queries at once
+        Embeds all queries in one API call (unless their `embeddings` are
+        given) and runs one multi-query lookup
         """
-        results = self.vector_store.query(query, n_results=top_k)
+        if not queries:
+            return []
         
-        # Format results
+        with metrics.span("retrieve_context_batch"):
+            if embeddings is None:
+                embeddings = self.vector_store.generate_embeddings(queries)
+            results = self.vector_store.query_by_embeddings(embeddings, n_results=top_k)
+        
+        return [self.format_contexts(results, i) for i in range(len(queries))]
+    
+    def format_contexts(self, results: Dict, index: int = 0) -> List[Dict]:
+        """Turn one query's entry of a collection.query response into context dicts"""
         contexts = []
         if results['documents']:
-            for i, doc in enumerate(results['documents'][0]):
+            for i, doc in enumerate(results['documents'][index]):
                 context = {
                     'text': doc,
-                    'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                    'distance': results['distances'][0][i] if results['distances'] else None
+                    'metadata': results['metadatas'][index][i] if results['metadatas'] else {},
+                    'distance': results['distances'][index][i] if results['distances'] else None
                 }
                 contexts.append(context)
         
         return contexts
     
-    def generate_answer(self, query: str, contexts: List[Dict]) -> Dict:
+    def build_prompt(self, query: str, contexts: List[Dict], history: List[Dict] = None) -> List[Dict]:
         """
-        Generate answer using retrieved context and LLM
+        Build the chat messages for a question and its retrieved context
+        `history` (earlier conversation turns as chat messages) goes before the question
         """
         # Build context string
         context_text = "\n\n".join([
@@ -61,72 +127,343 @@ Question: {query}
 
 Please provide an answer based only on the context above."""
         
+        return [
+            {"role": "system", "content": system_prompt},
+            *(history or []),
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def generate_answer(self, query: str, contexts: List[Dict], history: List[Dict] = None) -> Dict:
+        """
+        Generate answer using retrieved context and LLM
+        Provider errors (including GenerationBusy) are raised, so a failure is
+        never returned, counted or stored in a session as an answer
+        """
+        with metrics.span("prompt_build"):
+            messages = self.build_prompt(query, contexts, history)
+        
         try:
             # Generate response
-            response = self.client.chat.completions.create(
-                model=config.CHAT_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=500
-            )
-            
-            answer = response.choices[0].message.content
-            
-            # Prepare sources
-            sources = [
-                {
-                    'title': ctx['metadata'].get('title', 'Unknown'),
-                    'url': ctx['metadata'].get('url', '')
-                }
-                for ctx in contexts
-            ]
-            
-            # Remove duplicates
-            unique_sources = []
-            seen_urls = set()
-            for source in sources:
-                if source['url'] not in seen_urls:
-                    unique_sources.append(source)
-                    seen_urls.add(source['url'])
-            
-            return {
-                'answer': answer,
-                'sources': unique_sources,
-                'context_used': len(contexts)
-            }
-            
+            with metrics.span("chat_completion"):
+                completion = self.generator.complete(messages, temperature=0.3, max_tokens=500)
         except Exception as e:
             print(f"Error generating answer: {str(e)}")
-            return {
-                'answer': f"Error generating answer: {str(e)}",
-                'sources': [],
-                'context_used': 0
-            }
+            metrics.record_answer_path("error")
+            raise
+        
+        answer = completion['text']
+        if completion['prompt_tokens'] is not None:
+            metrics.observe_tokens(completion['prompt_tokens'], completion['completion_tokens'])
+        
+        return {
+            'answer': answer,
+            'sources': self.unique_sources(contexts),
+            'context_used': len(contexts)
+        }
+    
+    def unique_sources(self, contexts: List[Dict]) -> List[Dict]:
+        """Title and URL of each context's page, once per URL"""
+        unique_sources = []
+        seen_urls = set()
+        for ctx in contexts:
+            url = ctx['metadata'].get('url', '')
+            if url not in seen_urls:
+                unique_sources.append({'title': ctx['metadata'].get('title', 'Unknown'), 'url': url})
+                seen_urls.add(url)
+        return unique_sources
     
-    def answer_question(self, query: str, top_k: int = None) -> Dict:
+    def answer_question(self, query: str, top_k: int = None, filters: Optional[Dict] = None) -> Dict:
         """
         Main method: Retrieve context and generate answer
         """
         if top_k is None:
             top_k = config.TOP_K_RESULTS
         
+        with metrics.span("answer_question"):
+            return self._answer_question(query, top_k, filters)
+    
+    def _answer_question(self, query: str, top_k: int, filters: Optional[Dict] = None) -> Dict:
+        result, embedding = self.faq_answer(query, filters)
+        if result is not None:
+            return result
+        
         # Retrieve relevant context
-        contexts = self.retrieve_context(query, top_k=top_k)
+        contexts = self.retrieve_context(query, top_k=top_k, filters=filters, embedding=embedding)
+        
+        return self.answer_from_contexts(query, contexts)
+    
+    def faq_answer(self, query: str, filters: Optional[Dict] = None) -> Tuple[Optional[Dict], Optional[List[float]]]:
+        """
+        A precomputed FAQ answer for the question, or None; also returns the
+        query embedding if one was computed, so retrieval can reuse it
+        """
+        # Precomputed FAQ answers cover the whole site, so filtered questions skip them
+        if filters or self.faq_store is None or not self.faq_store.active(self):
+            return None, None
+        embedding = self.vector_store.embed_query(query)
+        result = self.faq_store.lookup(embedding)
+        if result is not None:
+            metrics.record_answer_path("faq")
+            result['answer_path'] = "faq"
+        return result, embedding
+    
+    def stream_answer(self, query: str, top_k: int = None, filters: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Answer a question as a stream of events: a 'sources' event, then
+        'delta' events carrying pieces of the answer, then 'done'
+        FAQ, extractive and no-context answers arrive as a single delta.
+        Retrieval and the start of generation run before the first event, so
+        their errors (e.g. GenerationBusy) are raised before anything is sent.
+        """
+        if top_k is None:
+            top_k = config.TOP_K_RESULTS
+        
+        result, embedding = self.faq_answer(query, filters)
+        if result is None:
+            contexts = self.retrieve_context(query, top_k=top_k, filters=filters, embedding=embedding)
+            if not contexts:
+                # The no-context reply; the chat model is not called
+                result = self.answer_from_contexts(query, contexts)
+            else:
+                metrics.observe_chunks_retrieved(len(contexts))
+                result = self.extractive_answer(query, contexts)
+        
+        if result is not None:
+            deltas = iter([result['answer']])
+            sources, context_used, answer_path = result['sources'], result['context_used'], result['answer_path']
+        else:
+            with metrics.span("prompt_build"):
+                messages = self.build_prompt(query, contexts)
+            deltas = self.generator.stream(messages, temperature=0.3, max_tokens=500)
+            sources, context_used, answer_path = self.unique_sources(contexts), len(contexts), "generated"
+            metrics.record_answer_path("generated")
+        
+        return self._stream_events(deltas, sources, context_used, answer_path)
+    
+    def _stream_events(self, deltas, sources: List[Dict], context_used: int, answer_path: str) -> Iterator[Dict]:
+        try:
+            yield {'event': 'sources', 'sources': sources, 'context_used': context_used, 'answer_path': answer_path}
+            for text in deltas:
+                yield {'event': 'delta', 'text': text}
+            yield {'event': 'done'}
+        finally:
+            # Frees the generation slot if the client goes away mid-answer
+            if hasattr(deltas, 'close'):
+                deltas.close()
+    
+    def answer_from_contexts(self, query: str, contexts: List[Dict], limiter: RateLimiter = None) -> Dict:
+        """
+        Generate an answer for already-retrieved contexts
+        `limiter` is only waited on when the chat model is actually called
+        """
+        metrics.observe_chunks_retrieved(len(contexts))
         
         if not contexts:
+            metrics.record_answer_path("no_context")
             return {
                 'answer': "I couldn't find any relevant information to answer your question.",
                 'sources': [],
-                'context_used': 0
+                'context_used': 0,
+                'answer_path': "no_context"
             }
         
+        result = self.extractive_answer(query, contexts)
+        if result is not None:
+            return result
+        
         # Generate answer
+        if limiter is not None:
+            limiter.acquire()
         result = self.generate_answer(query, contexts)
+        result['answer_path'] = "generated"
+        metrics.record_answer_path("generated")
+        
+        return result
+    
+    def extractive_answer(self, query: str, contexts: List[Dict]) -> Optional[Dict]:
+        """
+        Fast path: when the best chunk is within EXTRACTIVE_MAX_DISTANCE,
+        answer with its sentences that best match the question (no chat call)
+        """
+        if not config.EXTRACTIVE_ANSWERS_ENABLED:
+            return None
+        best = min(contexts, key=lambda ctx: float('inf') if ctx['distance'] is None else ctx['distance'])
+        if best['distance'] is None or best['distance'] > config.EXTRACTIVE_MAX_DISTANCE:
+            return None
+        
+        with metrics.span("extractive_answer"):
+            answer = extractive.extract_answer(query, best['text'], config.EXTRACTIVE_MAX_SENTENCES)
+        if answer is None:
+            return None
+        
+        metrics.record_answer_path("extractive")
+        return {
+            'answer': answer,
+            'sources': [{
+                'title': best['metadata'].get('title', 'Unknown'),
+                'url': best['metadata'].get('url', '')
+            }],
+            'context_used': 1,
+            'answer_path': "extractive"
+        }
+    
+    def answer_in_session(self, session, query: str, top_k: int = None, filters: Optional[Dict] = None) -> Dict:
+        """
+        Answer a question as the next turn of a conversation (see sessions.py)
+        The question is rewritten into a standalone search query, chunks
+        already retrieved in the session are reused when they are close
+        enough, and older turns are summarized to keep the prompt bounded
+        """
+        if top_k is None:
+            top_k = config.TOP_K_RESULTS
+        
+        # One turn at a time per session, so history stays in order
+        with metrics.span("answer_question"), session.lock:
+            standalone = self.rewrite_query(session, query)
+            contexts = self.retrieve_session_context(session, standalone, top_k, filters)
+            metrics.observe_chunks_retrieved(len(contexts))
+            
+            if not contexts:
+                metrics.record_answer_path("no_context")
+                result = {
+                    'answer': "I couldn't find any relevant information to answer your question.",
+                    'sources': [],
+                    'context_used': 0,
+                    'answer_path': "no_context"
+                }
+            else:
+                # Match sentences against the standalone query, which carries the follow-up's subject
+                result = self.extractive_answer(standalone, contexts)
+                if result is None:
+                    result = self.generate_answer(query, contexts, history=session.history_messages())
+                    result['answer_path'] = "generated"
+                    metrics.record_answer_path("generated")
+            
+            session.add_turn(query, standalone, result['answer'])
+            self.compact_history(session)
         
+        result['standalone_question'] = standalone
         return result
+    
+    def rewrite_query(self, session, query: str) -> str:
+        """Turn a follow-up question into a standalone search query using the conversation so far"""
+        if not session.turns:
+            return query
+        if not config.SESSION_QUERY_REWRITE:
+            return f"{session.turns[-1]['standalone']} {query}"
+        
+        conversation = "\n".join(
+            f"User: {turn['question']}\nAssistant: {turn['answer']}" for turn in session.turns[-3:]
+        )
+        if session.summary:
+            conversation = f"Earlier: {session.summary}\n{conversation}"
+        messages = [
+            {"role": "system", "content": "Rewrite the user's latest question as a standalone search query, "
+                                          "resolving references using the conversation. Reply with the query only."},
+            {"role": "user", "content": f"Conversation:\n{conversation}\n\nLatest question: {query}"}
+        ]
+        try:
+            with metrics.span("query_rewrite"):
+                completion = self.generator.complete(messages, temperature=0, max_tokens=100)
+            rewritten = completion['text'].strip()
+            return rewritten or query
+        except Exception as e:
+            print(f"Error rewriting query: {str(e)}")
+            return f"{session.turns[-1]['standalone']} {query}"
+    
+    def retrieve_session_context(self, session, query: str, top_k: int, filters: Optional[Dict] = None) -> List[Dict]:
+        """Retrieve context for a session turn, reusing the session's chunks when they are close enough"""
+        where = search_filters.build_where(filters)
+        with metrics.span("retrieve_context"):
+            embedding = self.vector_store.generate_embedding(query)
+            
+            contexts = session.reusable_contexts(embedding, top_k, where)
+            metrics.record_cache("session_chunks", contexts is not None)
+            if contexts is not None:
+                return contexts
+            
+            results = self.vector_store.query_by_embeddings([embedding], top_k, where, include_embeddings=True)
+        
+        session.remember(results)
+        return self.format_contexts(results)
+    
+    def count_tokens(self, text: str) -> int:
+        if self._encoding is None:
+            import tiktoken
+            self._encoding = tiktoken.encoding_for_model(config.CHAT_MODEL)
+        return len(self._encoding.encode(text))
+    
+    def compact_history(self, session):
+        """Fold the oldest turns into the session summary while the history exceeds its token budget"""
+        def history_tokens() -> int:
+            return self.count_tokens(session.summary) + sum(
+                self.count_tokens(turn['question']) + self.count_tokens(turn['answer']) for turn in session.turns
+            )
+        
+        while len(session.turns) > 1 and history_tokens() > config.SESSION_HISTORY_TOKENS:
+            # Summarize the older half, keeping the latest turns verbatim
+            older = session.turns[:max(1, len(session.turns) // 2)]
+            session.turns = session.turns[len(older):]
+            transcript = "\n".join(f"User: {turn['question']}\nAssistant: {turn['answer']}" for turn in older)
+            messages = [
+                {"role": "system", "content": "Summarize this support conversation in a few sentences, "
+                                              "keeping the facts, products and questions discussed."},
+                {"role": "user", "content": f"{session.summary}\n{transcript}".strip()}
+            ]
+            try:
+                with metrics.span("history_summary"):
+                    completion = self.generator.complete(
+                        messages, temperature=0.3, max_tokens=config.SESSION_SUMMARY_TOKENS
+                    )
+                session.summary = completion['text'].strip()
+            except Exception as e:
+                # Without a summary the older turns are simply dropped
+                print(f"Error summarizing conversation: {str(e)}")
+            
+            if self.count_tokens(session.summary) > config.SESSION_HISTORY_TOKENS:
+                session.summary = ""
+    
+    def answer_questions(
+        self,
+        queries: List[str],
+        top_k: int = None,
+        concurrency: int = None,
+        query_embeddings: List[List[float]] = None
+    ) -> Iterator[Tuple[int, Optional[Dict], Optional[Exception]]]:
+        """
+        Answer many questions, yielding (index, result, error) as each completes
+        
+        Retrieval is batched (one embeddings call, one multi-query lookup);
+        answers are generated in parallel under the shared chat rate limit.
+        Pass `query_embeddings` when the caller has already embedded the questions.
+        """
+        if top_k is None:
+            top_k = config.TOP_K_RESULTS
+        concurrency = concurrency or config.BATCH_CONCURRENCY
+        
+        try:
+            all_contexts = self.retrieve_contexts_batch(queries, top_k=top_k, embeddings=query_embeddings)
+        except Exception as e:
+            print(f"Batch retrieval failed ({str(e)}), retrieving per question")
+            all_contexts = [None] * len(queries)
+        
+        def answer(index: int) -> Dict:
+            contexts = all_contexts[index]
+            if contexts is None:
+                contexts = self.retrieve_context(queries[index], top_k=top_k)
+            return self.answer_from_contexts(queries[index], contexts, limiter=self.chat_limiter)
+        
+        pool = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            futures = {pool.submit(answer, i): i for i in range(len(queries))}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+        finally:
+            # Closed early (e.g. the client disconnected): answers not started yet are never generated
+            pool.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":
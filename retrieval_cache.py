@@ -0,0 +1,89 @@
+"""
+Retrieval result cache
+Maps (query embedding, top_k, filter, collection version) to one query's
+search results, so repeated questions skip the vector search. Bounded by an
+estimate of the memory held, evicting the least recently used entries.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import config
+
+
+# Rough per-entry cost of the dicts, lists and key beyond the text it holds
+ENTRY_OVERHEAD_BYTES = 200
+RESULT_OVERHEAD_BYTES = 100
+
+
+def result_size(result: Dict) -> int:
+    """Approximate bytes held by one query's results"""
+    size = ENTRY_OVERHEAD_BYTES
+    for i, chunk_id in enumerate(result['ids'][0]):
+        size += RESULT_OVERHEAD_BYTES + len(chunk_id) + len(result['documents'][0][i] or "")
+        size += len(json.dumps(result['metadatas'][0][i] or {}))
+    return size
+
+
+class RetrievalCache:
+    """Thread-safe LRU of single-query results, bounded by max_bytes"""
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(config.RETRIEVAL_CACHE_MAX_MB * 1024 * 1024)
+        self._entries: "OrderedDict[Tuple, Tuple[Dict, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(embedding: List[float], n_results: int, where: Optional[Dict], version: str) -> Tuple:
+        digest = hashlib.blake2b(np.asarray(embedding, dtype=np.float32).tobytes(), digest_size=16).digest()
+        return digest, n_results, json.dumps(where, sort_keys=True), version
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Tuple, result: Dict):
+        size = result_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+_cache: Optional[RetrievalCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> Optional[RetrievalCache]:
+    """The process-wide cache, or None when RETRIEVAL_CACHE_ENABLED is off"""
+    global _cache
+    if not config.RETRIEVAL_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RetrievalCache()
+    return _cache
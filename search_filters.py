@@ -0,0 +1,104 @@
+"""
+Metadata filters for retrieval
+Chunks are tagged at ingest with their host, path segments and tags, so a
+filter (URL prefix, title, tags) becomes an exact-match `where` clause that
+Chroma or the shared index applies before ranking
+"""
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+import config
+
+
+TAG_PREFIX = "tag_"
+
+
+def _clean_tag(tag: str) -> str:
+    return re.sub(r"[^a-z0-9_-]+", "-", tag.strip().lower()).strip("-")
+
+
+def path_segments(path: str) -> List[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+def parse_tag_rules(spec: str) -> Dict[str, List[str]]:
+    """Parse "tag=/prefix/,tag2=/other/" into {tag: [path prefix, ...]}"""
+    rules: Dict[str, List[str]] = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        tag, prefix = item.split("=", 1)
+        if _clean_tag(tag) and prefix.strip():
+            rules.setdefault(_clean_tag(tag), []).append(prefix.strip())
+    return rules
+
+
+_tag_rules = parse_tag_rules(config.INDEX_TAG_RULES)
+
+
+def chunk_metadata(chunk: Dict) -> Dict:
+    """
+    Filterable metadata for a chunk: host, path, the first
+    FILTER_PATH_LEVELS path segments and one boolean key per tag
+    (from the chunk's own 'tags' and INDEX_TAG_RULES)
+    """
+    parsed = urlparse(chunk.get('url', ''))
+    path = parsed.path or "/"
+    metadata = {'host': parsed.netloc.lower(), 'path': path}
+    for level, segment in enumerate(path_segments(path)[:config.FILTER_PATH_LEVELS]):
+        metadata[f'path_{level}'] = segment
+
+    tags = set(filter(None, map(_clean_tag, chunk.get('tags') or [])))
+    for tag, prefixes in _tag_rules.items():
+        if any(path.startswith(prefix) for prefix in prefixes):
+            tags.add(tag)
+    for tag in tags:
+        metadata[TAG_PREFIX + tag] = True
+    return metadata
+
+
+def build_where(filters: Optional[Dict]) -> Optional[Dict]:
+    """
+    Translate {'url_prefix', 'title', 'tags'} into a Chroma `where` clause
+    URL prefixes match whole path segments: "/docs/api" matches
+    /docs/api and /docs/api/..., not /docs/api-v2. Raises ValueError
+    for prefixes deeper than the indexed path levels.
+    """
+    if not filters:
+        return None
+
+    conditions = []
+    url_prefix = filters.get('url_prefix')
+    if url_prefix:
+        parsed = urlparse(url_prefix)
+        if parsed.netloc:
+            conditions.append({'host': parsed.netloc.lower()})
+        segments = path_segments(parsed.path)
+        if len(segments) > config.FILTER_PATH_LEVELS:
+            raise ValueError(f"url_prefix may have at most {config.FILTER_PATH_LEVELS} path segments")
+        conditions.extend({f'path_{level}': segment} for level, segment in enumerate(segments))
+
+    if filters.get('title'):
+        conditions.append({'title': filters['title']})
+
+    for tag in filters.get('tags') or []:
+        if _clean_tag(tag):
+            conditions.append({TAG_PREFIX + _clean_tag(tag): True})
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {'$and': conditions}
+
+
+def matches(metadata: Dict, where: Optional[Dict]) -> bool:
+    """Evaluate a where clause from build_where against one chunk's metadata"""
+    if not where:
+        return True
+    if '$and' in where:
+        return all(matches(metadata, condition) for condition in where['$and'])
+    for key, expected in where.items():
+        if isinstance(expected, dict):
+            expected = expected.get('$eq')
+        if metadata.get(key) != expected:
+            return False
+    return True
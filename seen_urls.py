@@ -0,0 +1,85 @@
+"""
+Compact set of crawled URLs for very large crawls
+A Bloom filter in memory answers most lookups; possible hits are confirmed
+against an exact SQLite set on disk, so there are no false positives
+"""
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+from typing import Iterable
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class SeenUrls:
+    """
+    Set-like store of URLs: a Bloom filter sized for `capacity` in memory,
+    with the exact URLs in a temporary SQLite database
+    """
+
+    def __init__(self, capacity: int, directory: str = None):
+        self.bloom = BloomFilter(capacity)
+        fd, self.path = tempfile.mkstemp(prefix="seen-urls-", suffix=".db", dir=directory)
+        os.close(fd)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE urls (url TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._count = 0
+
+    def add(self, url: str):
+        if url in self:
+            return
+        self.bloom.add(url)
+        self._db.execute("INSERT OR IGNORE INTO urls (url) VALUES (?)", (url,))
+        self._count += 1
+
+    def __contains__(self, url: str) -> bool:
+        if url not in self.bloom:
+            return False
+        # Possible hit: confirm exactly
+        return self._db.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        for (url,) in self._db.execute("SELECT url FROM urls"):
+            yield url
+
+    def close(self):
+        """Close and delete the on-disk store"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def __del__(self):
+        self.close()
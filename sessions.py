@@ -0,0 +1,127 @@
+"""
+Conversation sessions for follow-up questions
+Each session keeps its recent turns, a running summary of older turns and
+the chunks (with embeddings) retrieved so far, in memory with TTL and LRU eviction
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+import config
+import search_filters
+
+
+class Session:
+    """State of one conversation"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns: List[Dict[str, str]] = []
+        self.summary = ""
+        # Chunks retrieved in this session, most recently used last
+        self.chunks: "OrderedDict[str, Dict]" = OrderedDict()
+        # k-th distance of the last fresh retrieval: cached chunks this close are good enough
+        self.radius: Optional[float] = None
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add_turn(self, question: str, standalone: str, answer: str):
+        self.turns.append({'question': question, 'standalone': standalone, 'answer': answer})
+
+    def history_messages(self) -> List[Dict[str, str]]:
+        """Summary of older turns plus the recent turns, as chat messages"""
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn['question']})
+            messages.append({"role": "assistant", "content": turn['answer']})
+        return messages
+
+    def remember(self, results: Dict):
+        """Keep the chunks (and embeddings) of a single-query lookup made with embeddings included"""
+        embeddings = results.get('embeddings')
+        if not results.get('ids') or embeddings is None or embeddings[0] is None:
+            return
+        distances = results['distances'][0]
+        for i, chunk_id in enumerate(results['ids'][0]):
+            self.chunks[chunk_id] = {
+                'text': results['documents'][0][i],
+                'metadata': results['metadatas'][0][i] or {},
+                'embedding': np.asarray(embeddings[0][i], dtype=np.float32)
+            }
+            self.chunks.move_to_end(chunk_id)
+        while len(self.chunks) > config.SESSION_MAX_CHUNKS:
+            self.chunks.popitem(last=False)
+        if distances:
+            self.radius = max(distances)
+
+    def reusable_contexts(self, embedding: List[float], top_k: int, where: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """
+        The top_k cached chunks for a query, if all of them are as close as
+        the last fresh retrieval's results; None means retrieve again
+        """
+        if self.radius is None:
+            return None
+        candidates = [
+            (chunk_id, chunk) for chunk_id, chunk in self.chunks.items()
+            if search_filters.matches(chunk['metadata'], where)
+        ]
+        if len(candidates) < top_k:
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32)
+        vectors = np.stack([chunk['embedding'] for _, chunk in candidates])
+        # Squared L2, as the vector store ranks
+        distances = np.einsum('ij,ij->i', vectors - query, vectors - query)
+        top = np.argsort(distances)[:top_k]
+        if distances[top[-1]] > self.radius:
+            return None
+
+        contexts = []
+        for i in top:
+            chunk_id, chunk = candidates[i]
+            self.chunks.move_to_end(chunk_id)
+            contexts.append({'text': chunk['text'], 'metadata': chunk['metadata'], 'distance': float(distances[i])})
+        return contexts
+
+
+class ConversationStore:
+    """In-memory sessions; idle sessions expire after a TTL and the least recently used go first when full"""
+
+    def __init__(self, ttl_seconds: float = None, max_sessions: int = None):
+        self.ttl = config.SESSION_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_sessions = max_sessions or config.SESSION_MAX_SESSIONS
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id: str) -> Session:
+        with self._lock:
+            self._evict()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def _evict(self):
+        """Drop expired sessions; the oldest-used are at the front"""
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            del self._sessions[session_id]
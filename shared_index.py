@@ -0,0 +1,367 @@
+"""
+Shared read-only index: memory-mapped snapshots of the vector store
+Lets several API worker processes serve queries from one copy of the
+vectors and metadata held in the OS page cache
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+import config
+import search_filters
+from projection import Projection
+
+
+CURRENT_POINTER = "CURRENT"
+SOURCE_FILE = "source.json"
+FILTER_KEYS_FILE = "filter_keys.json"
+
+
+def _write_blob(path: str, items: List[str]):
+    """Write strings as one UTF-8 blob plus an offsets array for random access"""
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    with open(path + ".bin", 'wb') as f:
+        position = 0
+        for i, item in enumerate(items):
+            data = item.encode('utf-8')
+            f.write(data)
+            position += len(data)
+            offsets[i + 1] = position
+    np.save(path + ".offsets.npy", offsets)
+
+
+def is_filter_key(key: str) -> bool:
+    """Metadata keys search_filters.build_where can filter on"""
+    return key in ('host', 'title') or key.startswith('path_') or key.startswith(search_filters.TAG_PREFIX)
+
+
+def _write_filter_columns(snapshot_dir: str, metadatas: List[Dict]):
+    """
+    Filterable metadata as one int32 code per row and key (-1 when absent),
+    so workers filter on a memory-mapped array instead of parsing metadata
+    The distinct values of each key, JSON-encoded, go to FILTER_KEYS_FILE
+    """
+    keys = sorted({key for metadata in metadatas for key in (metadata or {}) if is_filter_key(key)})
+    columns = {key: column for column, key in enumerate(keys)}
+    values: Dict[str, Dict[str, int]] = {key: {} for key in keys}
+    codes = np.full((len(metadatas), len(keys)), -1, dtype=np.int32)
+    for row, metadata in enumerate(metadatas):
+        for key, value in (metadata or {}).items():
+            if key in columns:
+                codes[row, columns[key]] = values[key].setdefault(json.dumps(value), len(values[key]))
+
+    np.save(os.path.join(snapshot_dir, "filter_codes.npy"), codes)
+    with open(os.path.join(snapshot_dir, FILTER_KEYS_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'keys': keys, 'values': {key: list(values[key]) for key in keys}}, f)
+
+
+def export_snapshot(collection, directory: str = None, page_size: int = 1000) -> str:
+    """
+    Export a Chroma collection to a new snapshot directory and make it current
+    Returns the snapshot version
+    """
+    ids, documents, metadatas, embeddings = [], [], [], []
+    total = collection.count()
+    for offset in range(0, total, page_size):
+        page = collection.get(
+            include=['embeddings', 'documents', 'metadatas'],
+            limit=page_size,
+            offset=offset
+        )
+        ids.extend(page['ids'])
+        documents.extend(page['documents'])
+        metadatas.extend(page['metadatas'])
+        embeddings.extend(page['embeddings'])
+
+    vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+    source = {'collection': collection.name, 'collection_id': str(collection.id), 'count': len(ids)}
+    return write_snapshot(ids, documents, metadatas, vectors, directory, source=source)
+
+
+def write_snapshot(ids: List[str], documents: List[str], metadatas: List[Dict], vectors: np.ndarray,
+                   directory: str = None, version: str = None, projection_method: str = None,
+                   projection_dimensions: int = None, source: Dict = None) -> str:
+    """
+    Write a snapshot and make it current; returns its version
+    With a projection method other than "none" (PROJECTION_METHOD by
+    default), reduced vectors for the first-pass search are stored too.
+    `source` describes the collection it was exported from (see snapshot_source)
+    """
+    directory = directory or config.SHARED_INDEX_DIR
+    version = version or datetime.now().strftime("%Y%m%d%H%M%S%f")
+    snapshot_dir = os.path.join(directory, version)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    method = projection_method or config.PROJECTION_METHOD
+    dimensions = projection_dimensions or config.PROJECTION_DIMENSIONS
+
+    np.save(os.path.join(snapshot_dir, "vectors.npy"), vectors)
+    np.save(os.path.join(snapshot_dir, "norms.npy"), np.einsum('ij,ij->i', vectors, vectors))
+    _write_blob(os.path.join(snapshot_dir, "ids"), ids)
+    _write_blob(os.path.join(snapshot_dir, "documents"), documents)
+    _write_blob(os.path.join(snapshot_dir, "metadatas"), [json.dumps(m or {}) for m in metadatas])
+    _write_filter_columns(snapshot_dir, metadatas)
+    if source is not None:
+        with open(os.path.join(snapshot_dir, SOURCE_FILE), 'w', encoding='utf-8') as f:
+            json.dump(source, f)
+
+    if method != "none" and len(vectors) > 1 and dimensions < vectors.shape[1]:
+        projection = Projection.fit(vectors, dimensions, method)
+        reduced = projection.transform(vectors)
+        projection.save(os.path.join(snapshot_dir, "projection.npz"))
+        np.save(os.path.join(snapshot_dir, "reduced.npy"), reduced)
+        np.save(os.path.join(snapshot_dir, "reduced_norms.npy"), np.einsum('ij,ij->i', reduced, reduced))
+        explained = f", {projection.explained_variance:.0%} of variance" if projection.explained_variance else ""
+        print(f"Projected vectors to {dimensions} dimensions ({method}{explained})")
+
+    # Atomically point readers at the new snapshot
+    pointer_tmp = os.path.join(directory, CURRENT_POINTER + ".tmp")
+    with open(pointer_tmp, 'w') as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(directory, CURRENT_POINTER))
+
+    print(f"Exported {len(ids)} vectors to shared index snapshot {version}")
+    prune_snapshots(directory, keep=config.SHARED_INDEX_KEEP)
+    return version
+
+
+def snapshot_source(directory: str = None) -> Optional[Dict]:
+    """The collection (name, id and count) the current snapshot was exported from, or None"""
+    directory = directory or config.SHARED_INDEX_DIR
+    try:
+        with open(os.path.join(directory, CURRENT_POINTER)) as f:
+            version = f.read().strip()
+        with open(os.path.join(directory, version, SOURCE_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def prune_snapshots(directory: str, keep: int = 2):
+    """
+    Remove all but the newest `keep` snapshots
+    Workers still mapping a removed snapshot keep working until they swap
+    """
+    versions = sorted(
+        name for name in os.listdir(directory)
+        if os.path.isdir(os.path.join(directory, name))
+    )
+    for version in versions[:-keep] if keep > 0 else []:
+        snapshot_dir = os.path.join(directory, version)
+        for name in os.listdir(snapshot_dir):
+            os.remove(os.path.join(snapshot_dir, name))
+        os.rmdir(snapshot_dir)
+
+
+class _Snapshot:
+    """One memory-mapped snapshot version"""
+
+    def __init__(self, snapshot_dir: str, version: str):
+        self.version = version
+        self.vectors = np.load(os.path.join(snapshot_dir, "vectors.npy"), mmap_mode='r')
+        self.norms = np.load(os.path.join(snapshot_dir, "norms.npy"), mmap_mode='r')
+        # Reduced vectors for the first pass, when the snapshot was exported with a projection
+        self.projection = Projection.load(os.path.join(snapshot_dir, "projection.npz"))
+        if self.projection is not None:
+            self.reduced = np.load(os.path.join(snapshot_dir, "reduced.npy"), mmap_mode='r')
+            self.reduced_norms = np.load(os.path.join(snapshot_dir, "reduced_norms.npy"), mmap_mode='r')
+        self._blobs = {}
+        for name in ("ids", "documents", "metadatas"):
+            path = os.path.join(snapshot_dir, name)
+            offsets = np.load(path + ".offsets.npy", mmap_mode='r')
+            data = np.memmap(path + ".bin", dtype=np.uint8, mode='r') if offsets[-1] > 0 else b""
+            self._blobs[name] = (data, offsets)
+        # Filterable metadata codes (snapshots written before these have none)
+        self.filter_codes = None
+        keys_path = os.path.join(snapshot_dir, FILTER_KEYS_FILE)
+        if os.path.exists(keys_path):
+            with open(keys_path, encoding='utf-8') as f:
+                filter_keys = json.load(f)
+            self.filter_codes = np.load(os.path.join(snapshot_dir, "filter_codes.npy"), mmap_mode='r')
+            self._filter_columns = {key: column for column, key in enumerate(filter_keys['keys'])}
+            self._filter_values = {
+                key: {value: code for code, value in enumerate(values)}
+                for key, values in filter_keys['values'].items()
+            }
+        # Rows matching each recently used filter, so repeated filters skip the scan
+        self._filter_rows: Dict[str, np.ndarray] = {}
+        self._filter_lock = threading.Lock()
+
+    def _item(self, name: str, index: int) -> str:
+        data, offsets = self._blobs[name]
+        return bytes(data[offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+    def count(self) -> int:
+        return self.vectors.shape[0]
+
+    def filter_rows(self, where: Dict) -> np.ndarray:
+        """Indices of the rows whose metadata matches `where`"""
+        key = json.dumps(where, sort_keys=True)
+        rows = self._filter_rows.get(key)
+        if rows is None:
+            mask = self._filter_mask(where)
+            if mask is not None:
+                rows = np.flatnonzero(mask)
+            else:
+                # Keys without codes: parse each row's metadata once, keeping none of it
+                rows = np.array(
+                    [i for i in range(self.count())
+                     if search_filters.matches(json.loads(self._item("metadatas", i)), where)],
+                    dtype=np.int64
+                )
+            with self._filter_lock:
+                if len(self._filter_rows) >= config.SHARED_INDEX_FILTER_CACHE:
+                    self._filter_rows.pop(next(iter(self._filter_rows)))
+                self._filter_rows[key] = rows
+        return rows
+
+    def _filter_mask(self, where: Dict) -> Optional[np.ndarray]:
+        """Rows matching `where`, from the filter codes; None if a condition cannot use them"""
+        if self.filter_codes is None:
+            return None
+        mask = np.ones(self.count(), dtype=bool)
+        for condition in where['$and'] if '$and' in where else [where]:
+            for key, expected in condition.items():
+                if isinstance(expected, dict):
+                    expected = expected.get('$eq')
+                if key not in self._filter_columns:
+                    if not is_filter_key(key) or expected is None:
+                        return None
+                    # No row has this key
+                    mask[:] = False
+                    continue
+                code = self._filter_values[key].get(json.dumps(expected))
+                if code is None:
+                    mask[:] = False
+                else:
+                    mask &= self.filter_codes[:, self._filter_columns[key]] == code
+        return mask
+
+    def query(self, query_embeddings: List[List[float]], n_results: int, where: Optional[Dict] = None,
+              include_embeddings: bool = False) -> Dict:
+        """
+        Brute-force squared-L2 search, matching Chroma's default distance
+        With `where`, only matching rows are scored (pre-filtering)
+        """
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        if include_embeddings:
+            results['embeddings'] = []
+        rows = self.filter_rows(where) if where else None
+        candidates = self.count() if rows is None else len(rows)
+        if candidates == 0:
+            for key in results:
+                results[key] = [[] for _ in query_embeddings]
+            return results
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        k = min(n_results, candidates)
+        nearest = self._projected if self.projection is not None else self._exact
+
+        for indices, distances in nearest(queries, rows, k):
+            results['ids'].append([self._item("ids", i) for i in indices])
+            results['documents'].append([self._item("documents", i) for i in indices])
+            results['metadatas'].append([json.loads(self._item("metadatas", i)) for i in indices])
+            results['distances'].append([float(d) for d in distances])
+            if include_embeddings:
+                results['embeddings'].append(np.asarray(self.vectors[indices]))
+
+        return results
+
+    def _exact(self, queries: np.ndarray, rows: Optional[np.ndarray], k: int):
+        """(row indices, distances) of the k nearest rows for each query, scoring every row"""
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        norms = self.norms if rows is None else self.norms[rows]
+        # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x
+        distances = (
+            np.einsum('ij,ij->i', queries, queries)[:, None]
+            + norms[None, :]
+            - 2.0 * queries @ vectors.T
+        )
+        for row in distances:
+            top = np.argpartition(row, k - 1)[:k]
+            top = top[np.argsort(row[top])]
+            yield (top if rows is None else rows[top]), row[top]
+
+    def _projected(self, queries: np.ndarray, rows: Optional[np.ndarray], k: int):
+        """
+        Like _exact, but the first pass scores the reduced vectors and only
+        the best k * PROJECTION_CANDIDATES rows are re-scored with full vectors
+        Returned distances are exact; recall depends on the candidate count
+        """
+        reduced_queries = self.projection.transform(queries)
+        reduced = self.reduced if rows is None else self.reduced[rows]
+        reduced_norms = self.reduced_norms if rows is None else self.reduced_norms[rows]
+        approximate = (
+            np.einsum('ij,ij->i', reduced_queries, reduced_queries)[:, None]
+            + reduced_norms[None, :]
+            - 2.0 * reduced_queries @ reduced.T
+        )
+        candidates = min(len(reduced), k * config.PROJECTION_CANDIDATES)
+
+        for query, row in zip(queries, approximate):
+            top = np.argpartition(row, candidates - 1)[:candidates]
+            # Ascending row order reads the memory-mapped full vectors front to back
+            indices = np.sort(top if rows is None else rows[top])
+            distances = float(query @ query) + self.norms[indices] - 2.0 * (self.vectors[indices] @ query)
+            best = np.argsort(distances)[:k]
+            yield indices[best], distances[best]
+
+
+class SharedIndex:
+    """
+    Read-only view over the current snapshot
+    Picks up new snapshots when the CURRENT pointer changes
+    """
+
+    def __init__(self, directory: str = None, check_interval: float = None):
+        self.directory = directory or config.SHARED_INDEX_DIR
+        self.check_interval = (
+            check_interval if check_interval is not None else config.SHARED_INDEX_CHECK_INTERVAL
+        )
+        self._snapshot: Optional[_Snapshot] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.maybe_reload(force=True)
+
+    def _read_pointer(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, CURRENT_POINTER)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def maybe_reload(self, force: bool = False):
+        """Swap to the current snapshot if it changed since the last check"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            version = self._read_pointer()
+            if version is None or (self._snapshot and self._snapshot.version == version):
+                return
+            try:
+                self._snapshot = _Snapshot(os.path.join(self.directory, version), version)
+                print(f"Loaded shared index snapshot {version} ({self._snapshot.count()} vectors)")
+            except Exception as e:
+                print(f"Error loading shared index snapshot {version}: {str(e)}")
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._snapshot.version if self._snapshot else None
+
+    def count(self) -> int:
+        self.maybe_reload()
+        return self._snapshot.count() if self._snapshot else 0
+
+    def query(self, query_embeddings: List[List[float]], n_results: int = 5, where: Optional[Dict] = None,
+              include_embeddings: bool = False) -> Dict:
+        self.maybe_reload()
+        # Hold a reference so a concurrent swap cannot change the snapshot mid-query
+        snapshot = self._snapshot
+        if snapshot is None:
+            empty = [[] for _ in query_embeddings]
+            return {'ids': empty, 'documents': list(empty), 'metadatas': list(empty), 'distances': list(empty)}
+        return snapshot.query(query_embeddings, n_results, where, include_embeddings)
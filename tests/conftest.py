@@ -0,0 +1,24 @@
+import uuid
+
+import pytest
+
+import clients
+import config
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """
+    A VectorStore on its own Chroma directory, collection name and index
+    pointer, so tests do not see each other's collections
+    """
+    monkeypatch.setattr(config, "OPENAI_API_KEY", config.OPENAI_API_KEY or "sk-test")
+    monkeypatch.setattr(config, "COLLECTION_NAME", f"test_{uuid.uuid4().hex[:12]}")
+    monkeypatch.setattr(config, "INDEX_POINTER_FILE", str(tmp_path / "index_pointer.json"))
+    monkeypatch.setattr(config, "CHROMA_PERSIST_DIRECTORY", str(tmp_path / "chroma_db"))
+    monkeypatch.setattr(clients, "_chroma_client", None)
+    monkeypatch.setattr(config, "SHARED_INDEX_ENABLED", False)
+    monkeypatch.setattr(config, "QUERY_BATCH_ENABLED", False)
+
+    from vector_store import VectorStore
+    return VectorStore()
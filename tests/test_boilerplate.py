@@ -0,0 +1,38 @@
+import boilerplate
+
+
+FOOTER = "Subscribe to our newsletter for product updates and exclusive offers today"
+
+
+def make_pages(count):
+    return [
+        {'url': f"https://example.com/{i}", 'content': f"Page {i} explains topic number {i} in detail. {FOOTER}"}
+        for i in range(count)
+    ]
+
+
+def test_repeated_block_is_stripped():
+    pages = boilerplate.remove_boilerplate(make_pages(10), min_share=0.5, min_pages=3, shingle_words=4)
+    assert len(pages) == 10
+    for i, page in enumerate(pages):
+        assert "newsletter" not in page['content']
+        assert f"topic number {i}" in page['content']
+
+
+def test_small_corpus_is_left_alone():
+    pages = make_pages(2)
+    assert boilerplate.find_boilerplate(pages, min_share=0.5, min_pages=3, shingle_words=4) == set()
+    assert boilerplate.remove_boilerplate(pages, min_share=0.5, min_pages=3, shingle_words=4) == pages
+
+
+def test_text_below_share_survives():
+    pages = make_pages(10)
+    pages[0]['content'] += " a rare phrase appearing on a couple of pages only"
+    pages[1]['content'] += " a rare phrase appearing on a couple of pages only"
+    cleaned = boilerplate.remove_boilerplate(pages, min_share=0.5, min_pages=3, shingle_words=4)
+    assert "rare phrase" in cleaned[0]['content']
+
+
+def test_pages_left_empty_are_dropped():
+    pages = [{'url': f"https://example.com/{i}", 'content': FOOTER} for i in range(5)]
+    assert boilerplate.remove_boilerplate(pages, min_share=0.5, min_pages=3, shingle_words=4) == []
@@ -0,0 +1,58 @@
+import pytest
+
+import config
+from crawler import WebCrawler
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b""):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode("utf-8")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeSite:
+    """Page n links to pages n+1..n+3 and declares a canonical alias of itself"""
+
+    def __init__(self):
+        self.fetched = []
+
+    def get(self, url, timeout=None):
+        path = url.split("example.com", 1)[1]
+        if path in ("/robots.txt", "/sitemap.xml"):
+            return FakeResponse(404)
+        self.fetched.append(url)
+        n = int(path.strip("/") or 0)
+        links = "".join(f'<a href="/{i}">page {i}</a>' for i in range(n + 1, n + 4))
+        words = " ".join(f"word{n}x{j}" for j in range(80))
+        html = (f'<html><head><title>Page {n}</title><link rel="canonical" href="/{n}?alias=1"></head>'
+                f'<body><main><p>Page {n}: {words}</p>{links}</main></body></html>')
+        return FakeResponse(200, html.encode("utf-8"))
+
+
+@pytest.fixture
+def crawler(monkeypatch):
+    monkeypatch.setattr(config, "REQUEST_DELAY", 0)
+    crawler = WebCrawler("https://example.com/", max_pages=10, extract_workers=0)
+    crawler.session = FakeSite()
+    return crawler
+
+
+def test_canonical_aliases_do_not_use_up_the_page_budget(crawler):
+    pages = crawler.crawl()
+    assert len(crawler.session.fetched) == 10
+    assert crawler.pages_fetched == 10
+    assert len(pages) == 10
+    assert len(crawler.visited_urls) == 20
+    assert pages[0]['url'] == "https://example.com/0?alias=1"
+
+
+def test_requests_use_the_robots_user_agent():
+    import clients
+
+    assert clients.get_http_session().headers['User-Agent'] == config.CRAWLER_USER_AGENT
+    assert config.CRAWLER_USER_AGENT.split("/")[0] == "RAGSupportBot"
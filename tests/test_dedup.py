@@ -0,0 +1,52 @@
+import pytest
+
+import dedup
+
+
+def test_canonicalize_url_normalizes_equivalent_forms():
+    assert dedup.canonicalize_url("HTTP://Example.COM:80/docs?b=2&a=1#intro") == "http://example.com/docs?a=1&b=2"
+    assert dedup.canonicalize_url("https://example.com:443") == "https://example.com/"
+    assert dedup.canonicalize_url("https://example.com:8443/x") == "https://example.com:8443/x"
+
+
+def test_canonicalize_url_drops_tracking_params():
+    url = "https://example.com/page?utm_source=mail&id=7&fbclid=abc&UTM_Medium=x"
+    assert dedup.canonicalize_url(url) == "https://example.com/page?id=7"
+
+
+def test_canonicalize_url_keeps_malformed_port():
+    assert dedup.canonicalize_url("http://example.com:bad/x#frag") == "http://example.com:bad/x"
+
+
+def test_simhash_is_stable_and_close_for_small_edits():
+    text = " ".join(f"word{i}" for i in range(200))
+    edited = text.replace("word100", "changed")
+    assert dedup.simhash(text) == dedup.simhash(text)
+    assert dedup.hamming_distance(dedup.simhash(text), dedup.simhash(edited)) <= 3
+    other = " ".join(f"other{i}" for i in range(200))
+    assert dedup.hamming_distance(dedup.simhash(text), dedup.simhash(other)) > 10
+
+
+def test_near_duplicate_index_reports_first_url():
+    index = dedup.NearDuplicateIndex(max_distance=3)
+    text = " ".join(f"word{i}" for i in range(200))
+    assert index.check(text, "https://example.com/a") is None
+    assert index.check(text + " footer", "https://example.com/b") == "https://example.com/a"
+    assert index.check("completely different content here", "https://example.com/c") is None
+
+
+def test_near_duplicate_index_rejects_distance_beyond_bands():
+    with pytest.raises(ValueError):
+        dedup.NearDuplicateIndex(max_distance=dedup.BANDS)
+
+
+def test_drop_near_duplicates_keeps_first_of_group():
+    body = " ".join(f"word{i}" for i in range(200))
+    pages = [
+        {'url': "https://example.com/a", 'content': body},
+        {'url': "https://example.com/b", 'content': body},
+        {'url': "https://example.com/c", 'content': "unrelated text about something else"},
+    ]
+    assert [page['url'] for page in dedup.drop_near_duplicates(pages)] == [
+        "https://example.com/a", "https://example.com/c"
+    ]
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+from distributed import Coordinator, TaskQueue
+
+
+def make_queue(tmp_path, max_pages):
+    queue = TaskQueue(str(tmp_path / "queue.db"))
+    queue.set_meta("max_pages", max_pages)
+    return queue
+
+
+def test_claims_stay_within_the_page_budget(tmp_path):
+    queue = make_queue(tmp_path, 2)
+    queue.add_urls([(f"https://example.com/{i}", 1, float(i)) for i in range(5)])
+    assert [url for url, _ in queue.claim_urls("w1", 10, 60)] == ["https://example.com/0", "https://example.com/1"]
+    assert queue.claim_urls("w2", 10, 60) == []
+
+
+def test_aliases_do_not_use_up_the_page_budget(tmp_path):
+    queue = make_queue(tmp_path, 3)
+    queue.add_urls([("https://example.com/", 0, 0.0), ("https://example.com/b", 1, 1.0),
+                    ("https://example.com/c", 1, 2.0), ("https://example.com/home", 1, 0.5)])
+    [(url, _)] = queue.claim_urls("w1", 1, 60)
+    aliases = ["https://example.com/home", "https://example.com/index"]
+    page = {'url': aliases[0], 'content': "text", 'title': "Home"}
+    assert queue.complete_url(url, "w1", page, [], aliases)
+
+    counts = queue.counts()
+    assert counts['urls'] == {'done': 1, 'alias': 2, 'pending': 2}
+    # Without the text processor, which needs the tiktoken encoding
+    assert not Coordinator._crawl_done(SimpleNamespace(max_pages=3), counts)
+    # The known alias is never fetched; the two real pages still fit the budget
+    assert [url for url, _ in queue.claim_urls("w1", 10, 60)] == ["https://example.com/b", "https://example.com/c"]
+
+
+def test_lost_lease_is_ignored(tmp_path):
+    queue = make_queue(tmp_path, 5)
+    queue.add_urls([("https://example.com/", 0, 0.0)])
+    [(url, _)] = queue.claim_urls("w1", 1, 60)
+    assert not queue.complete_url(url, "w2", None, [("https://example.com/x", 1, 1.0)])
+    assert queue.counts()['urls'] == {'leased': 1}
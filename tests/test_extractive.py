@@ -0,0 +1,35 @@
+from extractive import content_words, extract_answer, split_sentences
+
+
+TEXT = (
+    "Our office opens at 9am. Refunds are issued within 30 days of purchase! "
+    "Shipping is free on orders over $50. Refunds for digital goods need a support ticket? "
+    "The team is based in Berlin."
+)
+
+
+def test_split_sentences():
+    assert split_sentences("One. Two!  Three?\nFour") == ["One.", "Two!", "Three?", "Four"]
+    assert split_sentences("   ") == []
+
+
+def test_content_words_drop_stopwords_and_single_letters():
+    assert content_words("How do I get a refund for my order?") == {"get", "refund", "order"}
+
+
+def test_extract_answer_keeps_best_sentences_in_original_order():
+    answer = extract_answer("How are refunds for digital goods issued?", TEXT, max_sentences=2)
+    assert answer == (
+        "Refunds are issued within 30 days of purchase! "
+        "Refunds for digital goods need a support ticket?"
+    )
+
+
+def test_extract_answer_limits_sentences():
+    assert extract_answer("refunds digital", TEXT, max_sentences=1) == "Refunds for digital goods need a support ticket?"
+
+
+def test_extract_answer_none_without_overlap():
+    assert extract_answer("What is the weather like?", TEXT) is None
+    assert extract_answer("the and of", TEXT) is None
+    assert extract_answer("refunds", "") is None
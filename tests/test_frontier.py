@@ -0,0 +1,123 @@
+import gzip
+from datetime import datetime, timezone
+
+import pytest
+
+from frontier import CrawlFrontier, RobotsPolicy, fetch_sitemap_entries, parse_w3c_datetime
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b""):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode("utf-8", "replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    """Serves canned responses by URL; anything else is a 404"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def get(self, url, timeout=None):
+        self.requested.append(url)
+        return self.responses.get(url, FakeResponse(404))
+
+
+def test_frontier_pops_shallow_pages_first():
+    frontier = CrawlFrontier(priority_weight=2.0)
+    frontier.push("https://example.com/deep", 3)
+    frontier.push("https://example.com/a", 1)
+    frontier.push("https://example.com/b", 1)
+    assert [frontier.pop()[0] for _ in range(3)] == [
+        "https://example.com/a", "https://example.com/b", "https://example.com/deep"
+    ]
+    with pytest.raises(IndexError):
+        frontier.pop()
+
+
+def test_sitemap_priority_moves_page_forward():
+    frontier = CrawlFrontier(priority_weight=2.0)
+    frontier.push("https://example.com/normal", 1)
+    frontier.push("https://example.com/important", 2, priority=1.0)
+    frontier.push("https://example.com/minor", 1, priority=0.0)
+    # Scores 1, 1 and 2: equal scores keep discovery order
+    assert [frontier.pop() for _ in range(3)] == [
+        ("https://example.com/normal", 1), ("https://example.com/important", 2), ("https://example.com/minor", 1)
+    ]
+
+    frontier = CrawlFrontier(priority_weight=4.0)
+    frontier.push("https://example.com/normal", 1)
+    frontier.push("https://example.com/important", 2, priority=1.0)
+    assert frontier.pop() == ("https://example.com/important", 2)
+
+
+def test_repush_keeps_best_score_only():
+    frontier = CrawlFrontier()
+    frontier.push("https://example.com/x", 4)
+    frontier.push("https://example.com/x", 1)
+    frontier.push("https://example.com/x", 5)
+    assert len(frontier) == 1
+    assert frontier.pop() == ("https://example.com/x", 1)
+    assert len(frontier) == 0
+    with pytest.raises(IndexError):
+        frontier.pop()
+
+
+def test_parse_w3c_datetime():
+    assert parse_w3c_datetime("2024-05-01") == datetime(2024, 5, 1, tzinfo=timezone.utc)
+    assert parse_w3c_datetime("2024-05-01T12:00:00+02:00") == datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+    assert parse_w3c_datetime("2024-05-01T10:00:00Z") == datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+    assert parse_w3c_datetime("not a date") is None
+    assert parse_w3c_datetime(None) is None
+
+
+def test_robots_policy_rules_and_crawl_delay():
+    robots = b"User-agent: RAGSupportBot\nDisallow: /private\nCrawl-delay: 2\n"
+    session = FakeSession({"https://example.com/robots.txt": FakeResponse(200, robots)})
+    policy = RobotsPolicy(session, "https://example.com/docs/")
+    assert policy.allowed("https://example.com/docs/page")
+    assert not policy.allowed("https://example.com/private/page")
+    assert policy.crawl_delay == 2.0
+
+
+@pytest.mark.parametrize("status, allowed", [(404, True), (403, False), (401, False)])
+def test_robots_policy_status_semantics(status, allowed):
+    session = FakeSession({"https://example.com/robots.txt": FakeResponse(status)})
+    assert RobotsPolicy(session, "https://example.com/").allowed("https://example.com/page") is allowed
+
+
+def test_sitemap_index_is_followed_and_entries_parsed():
+    index = b"""<?xml version="1.0"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/pages.xml.gz</loc></sitemap>
+</sitemapindex>"""
+    pages = b"""<?xml version="1.0"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://example.com/a</loc><lastmod>2024-01-02</lastmod><priority>0.9</priority></url>
+  <url><loc>https://example.com/b</loc><priority>7</priority></url>
+  <url><loc>https://example.com/c</loc><priority>high</priority></url>
+</urlset>"""
+    session = FakeSession({
+        "https://example.com/sitemap.xml": FakeResponse(200, index),
+        "https://example.com/pages.xml.gz": FakeResponse(200, gzip.compress(pages)),
+    })
+    entries = fetch_sitemap_entries(session, "https://example.com/sitemap.xml")
+    assert [(entry['url'], entry['priority']) for entry in entries] == [
+        ("https://example.com/a", 0.9), ("https://example.com/b", 1.0), ("https://example.com/c", 0.5)
+    ]
+    assert entries[0]['lastmod'] == datetime(2024, 1, 2, tzinfo=timezone.utc)
+    assert entries[1]['lastmod'] is None
+
+
+def test_sitemap_respects_max_urls_and_missing_sitemap():
+    urls = "".join(f"<url><loc>https://example.com/{i}</loc></url>" for i in range(10))
+    body = f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'.encode()
+    session = FakeSession({"https://example.com/sitemap.xml": FakeResponse(200, body)})
+    assert len(fetch_sitemap_entries(session, "https://example.com/sitemap.xml", max_urls=3)) == 3
+    assert fetch_sitemap_entries(session, "https://example.com/missing.xml") == []
@@ -0,0 +1,115 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import index_versions
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_pointer_defaults_to_legacy_collection(tmp_path):
+    path = str(tmp_path / "missing.json")
+    assert index_versions.read_pointer(path)['active'] == index_versions.config.COLLECTION_NAME
+    assert index_versions.pointer_mtime(path) is None
+
+
+def test_pointer_round_trip(tmp_path):
+    path = str(tmp_path / "nested" / "pointer.json")
+    index_versions.write_pointer("docs_v2", ["docs_v1"], path)
+    pointer = index_versions.read_pointer(path)
+    assert (pointer['active'], pointer['history']) == ("docs_v2", ["docs_v1"])
+    assert index_versions.pointer_mtime(path) is not None
+    assert not (tmp_path / "nested" / "pointer.json.tmp").exists()
+
+
+def test_corrupt_pointer_falls_back(tmp_path):
+    path = tmp_path / "pointer.json"
+    path.write_text("{not json")
+    assert index_versions.read_pointer(str(path))['history'] == []
+
+
+def test_version_labels():
+    name = index_versions.new_collection_name()
+    assert name.startswith(index_versions.config.COLLECTION_NAME + "_v")
+    assert index_versions.version_of(name) == name.rsplit("_v", 1)[1]
+    assert index_versions.version_of(index_versions.config.COLLECTION_NAME) == "initial"
+
+
+def test_activate_and_rollback(store):
+    initial = store.collection_name
+    first = store.create_build_collection().name
+    store.activate_collection(first)
+    second = store.create_build_collection().name
+    store.activate_collection(second)
+    assert store.collection_name == second
+    assert index_versions.read_pointer()['history'] == [first, initial]
+
+    assert store.rollback() == first
+    assert store.collection_name == first
+    assert index_versions.read_pointer()['history'] == [second, initial]
+
+    assert store.rollback() == second
+    assert store.rollback() == first
+    assert store.rollback() == second
+
+
+def test_rollback_without_history(store):
+    assert store.rollback() is None
+    assert store.collection_name == index_versions.config.COLLECTION_NAME
+
+
+def test_activation_prunes_old_versions(store):
+    names = []
+    for _ in range(3):
+        names.append(store.create_build_collection().name)
+        store.activate_collection(names[-1], keep=1)
+    assert index_versions.read_pointer()['history'] == [names[1]]
+    existing = {collection.name for collection in store.chroma_client.list_collections()}
+    assert names[0] not in existing and names[2] in existing
+
+
+def test_other_stores_follow_the_pointer(store):
+    from vector_store import VectorStore
+
+    other = VectorStore()
+    build = store.create_build_collection().name
+    store.activate_collection(build)
+    assert other.collection_name == build
+    store.rollback()
+    assert other.collection_name == store.collection_name
+
+
+def run_in_new_process(tmp_path, code):
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="sk-test",
+        CHROMA_PERSIST_DIRECTORY=str(tmp_path / "chroma_db"),
+        INDEX_POINTER_FILE=str(tmp_path / "index_pointer.json"),
+        SHARED_INDEX_ENABLED="false",
+    )
+    script = "from vector_store import VectorStore\nstore = VectorStore()\n" + textwrap.dedent(code)
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_activated_collection_survives_restart(tmp_path):
+    built = run_in_new_process(tmp_path, """
+        build = store.create_build_collection()
+        build.add(ids=["a"], embeddings=[[1.0, 0.0]], documents=["alpha"])
+        store.activate_collection(build.name)
+        print(build.name)
+    """)
+    assert run_in_new_process(tmp_path, """
+        print(store.collection_name, store.collection.count())
+    """) == f"{built} 1"
+
+    # Rolling back in another process is seen after a restart too
+    run_in_new_process(tmp_path, "store.rollback()")
+    assert run_in_new_process(tmp_path, """
+        print(store.index_version, store.collection.count())
+    """) == "initial 0"
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+import config
+from projection import Projection
+from shared_index import SharedIndex, write_snapshot
+
+
+def low_rank(count=400, dimensions=32, rank=4, seed=0):
+    """Vectors that lie (up to tiny noise) in a `rank`-dimensional subspace"""
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, dimensions))
+    noise = 1e-3 * rng.standard_normal((count, dimensions))
+    return (rng.standard_normal((count, rank)) @ basis + noise + 5.0).astype(np.float32)
+
+
+def test_pca_keeps_the_variance_of_low_rank_data():
+    vectors = low_rank()
+    projection = Projection.fit(vectors, 4, "pca")
+    assert projection.dimensions == 4
+    assert projection.explained_variance > 0.999
+    # Distances survive the projection
+    reduced = projection.transform(vectors)
+    full = np.linalg.norm(vectors[0] - vectors[1])
+    assert np.linalg.norm(reduced[0] - reduced[1]) == pytest.approx(full, rel=1e-3)
+    assert np.allclose(projection.transform(vectors[0]), reduced[0], atol=1e-4)
+
+
+def test_random_projection_is_orthonormal():
+    projection = Projection.fit(low_rank(), 8, "random")
+    assert projection.explained_variance is None
+    assert np.allclose(projection.components.T @ projection.components, np.eye(8), atol=1e-5)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        Projection.fit(low_rank(), 4, "svd")
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "projection.npz")
+    assert Projection.load(path) is None
+    for method in ("pca", "random"):
+        projection = Projection.fit(low_rank(), 4, method)
+        projection.save(path)
+        loaded = Projection.load(path)
+        assert loaded.method == method
+        assert loaded.explained_variance == projection.explained_variance
+        assert np.array_equal(loaded.components, projection.components)
+
+
+def test_transform_in_batches_matches_single_pass():
+    vectors = low_rank()
+    projection = Projection.fit(vectors, 4, "pca")
+    assert np.allclose(projection.transform(vectors, batch_size=7), projection.transform(vectors), atol=1e-5)
+
+
+def test_projected_search_returns_exact_distances(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROJECTION_CANDIDATES", 5)
+    vectors = low_rank()
+    ids = [f"chunk_{i}" for i in range(len(vectors))]
+    write_snapshot(ids, ids, [{} for _ in ids], vectors, str(tmp_path / "pca"),
+                   projection_method="pca", projection_dimensions=4)
+    write_snapshot(ids, ids, [{} for _ in ids], vectors, str(tmp_path / "exact"), projection_method="none")
+    projected = SharedIndex(str(tmp_path / "pca"), check_interval=0)
+    exact = SharedIndex(str(tmp_path / "exact"), check_interval=0)
+    assert (tmp_path / "pca" / projected.version / "projection.npz").exists()
+
+    queries = (vectors[:10] + 0.05).tolist()
+    projected_results = projected.query(queries, n_results=5)
+    exact_results = exact.query(queries, n_results=5)
+    assert projected_results['ids'] == exact_results['ids']
+    assert np.allclose(projected_results['distances'], exact_results['distances'], rtol=1e-4, atol=1e-3)
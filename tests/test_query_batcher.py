@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+import config
+from query_batcher import QueryBatcher, split_results
+
+
+class FakeStore:
+    """Embeds a text as [len(text)] and returns the query vectors as results"""
+
+    def __init__(self):
+        self.embedding_calls = 0
+        self.lookups = []
+        self.fail_next = None
+
+    def generate_embeddings(self, texts):
+        self.embedding_calls += 1
+        if self.fail_next:
+            error, self.fail_next = self.fail_next, None
+            raise error
+        return [[float(len(text))] for text in texts]
+
+    def query_by_embeddings(self, embeddings, n_results, where=None):
+        self.lookups.append((len(embeddings), n_results, where))
+        return {
+            'ids': [[f"{e[0]}-{i}" for i in range(n_results)] for e in embeddings],
+            'distances': [[float(i) for i in range(n_results)] for _ in embeddings],
+            'embeddings': None,
+            'included': ['distances'],
+        }
+
+
+def test_split_results():
+    results = {'ids': [["a", "b"], ["c", "d"]], 'embeddings': None, 'documents': [None, None], 'included': ['ids']}
+    assert split_results(results, 1, 1) == {'ids': [["c"]], 'embeddings': None, 'documents': [None], 'included': ['ids']}
+
+
+def test_concurrent_queries_share_one_batch():
+    store = FakeStore()
+    batcher = QueryBatcher(store, max_wait_ms=200, max_batch_size=8)
+    results = {}
+
+    def ask(text, n_results, where):
+        results[text] = batcher.submit(text, n_results, where)
+
+    threads = [
+        threading.Thread(target=ask, args=("a", 2, None)),
+        threading.Thread(target=ask, args=("bb", 3, None)),
+        threading.Thread(target=ask, args=("ccc", 1, {'tag_docs': True})),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.embedding_calls == 1
+    assert sorted(store.lookups, key=str) == sorted([(2, 3, None), (1, 1, {'tag_docs': True})], key=str)
+    assert results["a"]['ids'] == [["1.0-0", "1.0-1"]]
+    assert results["bb"]['ids'] == [["2.0-0", "2.0-1", "2.0-2"]]
+    assert results["ccc"]['ids'] == [["3.0-0"]]
+
+
+def test_embed_only_requests():
+    store = FakeStore()
+    batcher = QueryBatcher(store, max_wait_ms=0)
+    assert batcher.embed("abcd") == [4.0]
+    assert store.lookups == []
+
+
+def test_errors_fail_the_batch_but_not_the_batcher():
+    store = FakeStore()
+    batcher = QueryBatcher(store, max_wait_ms=0)
+    store.fail_next = RuntimeError("embeddings down")
+    with pytest.raises(RuntimeError):
+        batcher.submit("a")
+    assert batcher.submit("a", 1)['ids'] == [["1.0-0"]]
+
+
+def test_unexpected_errors_keep_the_worker_alive():
+    store = FakeStore()
+    batcher = QueryBatcher(store, max_wait_ms=0)
+    # Results of the wrong shape make the batch itself fail
+    store.query_by_embeddings = lambda embeddings, n_results, where=None: {'ids': []}
+    with pytest.raises(IndexError):
+        batcher.submit("a")
+    del store.query_by_embeddings
+    assert batcher._worker.is_alive()
+    assert batcher.submit("a", 1)['ids'] == [["1.0-0"]]
+
+
+def test_submit_times_out(monkeypatch):
+    monkeypatch.setattr(config, "QUERY_BATCH_TIMEOUT", 0.2)
+    store = FakeStore()
+    release = threading.Event()
+    store.generate_embeddings = lambda texts: release.wait() and [[0.0] for _ in texts]
+    batcher = QueryBatcher(store, max_wait_ms=0)
+    with pytest.raises(TimeoutError):
+        batcher.submit("a")
+    release.set()
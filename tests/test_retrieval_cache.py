@@ -0,0 +1,112 @@
+import time
+
+import config
+from retrieval_cache import RetrievalCache, result_size
+
+
+def result(ids, text="chunk text"):
+    return {
+        'ids': [ids],
+        'documents': [[text for _ in ids]],
+        'metadatas': [[{'url': "https://example.com/"} for _ in ids]],
+        'distances': [[0.1 for _ in ids]],
+    }
+
+
+def test_key_depends_on_every_part():
+    key = RetrievalCache.key([0.1, 0.2], 5, {'title': "FAQ"}, "v1")
+    assert key == RetrievalCache.key([0.1, 0.2], 5, {'title': "FAQ"}, "v1")
+    assert key != RetrievalCache.key([0.1, 0.3], 5, {'title': "FAQ"}, "v1")
+    assert key != RetrievalCache.key([0.1, 0.2], 3, {'title': "FAQ"}, "v1")
+    assert key != RetrievalCache.key([0.1, 0.2], 5, None, "v1")
+    assert key != RetrievalCache.key([0.1, 0.2], 5, {'title': "FAQ"}, "v2")
+
+
+def test_lru_eviction_by_size():
+    one = result(["a"])
+    cache = RetrievalCache(max_bytes=result_size(one) * 2)
+    cache.put("k1", one)
+    cache.put("k2", result(["b"]))
+    assert cache.get("k1") is one
+    cache.put("k3", result(["c"]))
+    assert cache.get("k2") is None
+    assert cache.get("k1") is one and cache.get("k3") is not None
+    assert cache.stats()['entries'] == 2
+
+
+def test_oversized_results_are_not_cached():
+    cache = RetrievalCache(max_bytes=100)
+    cache.put("k", result(["a"], text="x" * 1000))
+    assert cache.get("k") is None
+    assert cache.stats()['bytes'] == 0
+
+
+def test_replacing_an_entry_keeps_size_accurate():
+    cache = RetrievalCache(max_bytes=10_000)
+    cache.put("k", result(["a"]))
+    cache.put("k", result(["a"]))
+    assert cache.stats()['bytes'] == result_size(result(["a"]))
+    cache.clear()
+    assert cache.stats() == {'entries': 0, 'bytes': 0, 'max_bytes': 10_000}
+
+
+def add_chunks(collection, ids, vectors):
+    collection.add(
+        ids=ids,
+        embeddings=vectors,
+        documents=[f"text of {chunk_id}" for chunk_id in ids],
+        metadatas=[{'url': f"https://example.com/{chunk_id}"} for chunk_id in ids]
+    )
+
+
+def test_cached_results_invalidated_when_collection_changes(store, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    store.retrieval_cache = RetrievalCache(max_bytes=1_000_000)
+    add_chunks(store.collection, ["a", "b"], [[0.0, 0.0, 1.0], [0.0, 1.0, 0.0]])
+
+    first = store.query_by_embeddings([[1.0, 0.0, 0.0]], 3)
+    assert sorted(first['ids'][0]) == ["a", "b"]
+    version = store.collection_version
+    assert store.query_by_embeddings([[1.0, 0.0, 0.0]], 3) == first
+
+    # Chunks added through another handle (indexer CLI, distributed worker)
+    # are picked up at the next check, not on every query
+    other = store.chroma_client.get_collection(name=store.collection_name)
+    add_chunks(other, ["c"], [[1.0, 0.0, 0.0]])
+    assert store.collection_version == version
+    assert store.query_by_embeddings([[1.0, 0.0, 0.0]], 3) == first
+
+    clock[0] += config.COLLECTION_STATS_REFRESH_SECONDS + 1
+    assert store.collection_version != version
+    assert store.query_by_embeddings([[1.0, 0.0, 0.0]], 3)['ids'][0][0] == "c"
+
+
+def test_writes_from_this_process_change_the_version_at_once(store, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    store.retrieval_cache = RetrievalCache(max_bytes=1_000_000)
+    store.collection.add(ids=["seed"], embeddings=[[0.0, 1.0]])
+    version = store.collection_version
+    monkeypatch.setattr(store, "generate_embeddings", lambda texts: [[1.0, 0.0] for _ in texts])
+
+    store.add_documents([{'text': "alpha", 'url': "https://example.com/a", 'title': "A"}])
+    assert store.collection_version != version
+    assert store.query_by_embeddings([[1.0, 0.0]], 1)['documents'][0] == ["alpha"]
+
+
+def test_activation_and_rollback_change_the_version(store):
+    store.retrieval_cache = RetrievalCache(max_bytes=1_000_000)
+    add_chunks(store.collection, ["old"], [[1.0, 0.0, 0.0]])
+    assert store.query_by_embeddings([[1.0, 0.0, 0.0]], 1)['ids'][0] == ["old"]
+    old_version = store.collection_version
+
+    build = store.create_build_collection()
+    add_chunks(build, ["new"], [[1.0, 0.0, 0.0]])
+    store.activate_collection(build.name)
+    assert store.collection_version != old_version
+    assert store.query_by_embeddings([[1.0, 0.0, 0.0]], 1)['ids'][0] == ["new"]
+
+    store.rollback()
+    assert store.collection_version == old_version
+    assert store.query_by_embeddings([[1.0, 0.0, 0.0]], 1)['ids'][0] == ["old"]
@@ -0,0 +1,61 @@
+import pytest
+
+import config
+import search_filters
+
+
+def test_chunk_metadata_tags_path_levels(monkeypatch):
+    monkeypatch.setattr(search_filters, "_tag_rules", search_filters.parse_tag_rules("docs=/docs/, French = /fr/"))
+    metadata = search_filters.chunk_metadata({
+        'url': "https://Example.com/docs/api/v2/auth/tokens/refresh",
+        'tags': ["Beta Feature", "!!"],
+    })
+    assert metadata['host'] == "example.com"
+    assert metadata['path'] == "/docs/api/v2/auth/tokens/refresh"
+    assert [metadata.get(f'path_{level}') for level in range(config.FILTER_PATH_LEVELS + 1)] == [
+        "docs", "api", "v2", "auth", None
+    ]
+    assert metadata['tag_docs'] is True
+    assert metadata['tag_beta-feature'] is True
+    assert 'tag_french' not in metadata
+
+
+def test_parse_tag_rules_skips_malformed_items():
+    assert search_filters.parse_tag_rules("docs=/docs/,broken,=/x/,docs=/guide/,empty=") == {
+        'docs': ["/docs/", "/guide/"]
+    }
+
+
+def test_build_where_combines_conditions():
+    assert search_filters.build_where(None) is None
+    assert search_filters.build_where({'tags': ["", "  "]}) is None
+    assert search_filters.build_where({'title': "FAQ"}) == {'title': "FAQ"}
+    assert search_filters.build_where({'url_prefix': "https://Example.com/docs/api", 'tags': ["Beta"]}) == {
+        '$and': [
+            {'host': "example.com"},
+            {'path_0': "docs"},
+            {'path_1': "api"},
+            {'tag_beta': True},
+        ]
+    }
+
+
+def test_build_where_rejects_prefix_deeper_than_indexed_levels():
+    too_deep = "/" + "/".join(f"s{i}" for i in range(config.FILTER_PATH_LEVELS + 1))
+    with pytest.raises(ValueError):
+        search_filters.build_where({'url_prefix': too_deep})
+
+
+def test_url_prefix_matches_whole_segments():
+    where = search_filters.build_where({'url_prefix': "/docs/api"})
+    docs_api = search_filters.chunk_metadata({'url': "https://example.com/docs/api/auth"})
+    docs_api_v2 = search_filters.chunk_metadata({'url': "https://example.com/docs/api-v2/auth"})
+    assert search_filters.matches(docs_api, where)
+    assert not search_filters.matches(docs_api_v2, where)
+
+
+def test_matches_supports_eq_operator():
+    metadata = {'title': "FAQ", 'tag_docs': True}
+    assert search_filters.matches(metadata, None)
+    assert search_filters.matches(metadata, {'title': {'$eq': "FAQ"}})
+    assert not search_filters.matches(metadata, {'$and': [{'title': "FAQ"}, {'tag_beta': True}]})
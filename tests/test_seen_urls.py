@@ -0,0 +1,35 @@
+import os
+
+from seen_urls import BloomFilter, SeenUrls
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"https://example.com/{i}")
+    assert all(f"https://example.com/{i}" in bloom for i in range(1000))
+    false_positives = sum(f"https://other.com/{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_seen_urls_is_exact_set(tmp_path):
+    seen = SeenUrls(100, directory=str(tmp_path))
+    for i in range(500):
+        seen.add(f"https://example.com/{i}")
+    seen.add("https://example.com/0")
+
+    assert len(seen) == 500
+    assert "https://example.com/499" in seen
+    assert not any(f"https://example.com/missing/{i}" in seen for i in range(2000))
+    assert sorted(seen) == sorted(f"https://example.com/{i}" for i in range(500))
+    seen.close()
+
+
+def test_close_removes_database(tmp_path):
+    seen = SeenUrls(10, directory=str(tmp_path))
+    seen.add("https://example.com/")
+    path = seen.path
+    assert os.path.exists(path)
+    seen.close()
+    seen.close()
+    assert not os.path.exists(path)
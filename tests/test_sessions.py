@@ -0,0 +1,83 @@
+import config
+from sessions import ConversationStore, Session
+
+
+def lookup(ids, vectors, distances, metadatas=None):
+    """A single-query collection.query response with embeddings included"""
+    return {
+        'ids': [ids],
+        'documents': [[f"text of {chunk_id}" for chunk_id in ids]],
+        'metadatas': [metadatas or [{} for _ in ids]],
+        'distances': [distances],
+        'embeddings': [vectors],
+    }
+
+
+def test_history_includes_summary_and_turns():
+    session = Session("s1")
+    session.summary = "asked about billing"
+    session.add_turn("How do refunds work?", "How do refunds work?", "Within 30 days.")
+    assert session.history_messages() == [
+        {"role": "system", "content": "Summary of the earlier conversation: asked about billing"},
+        {"role": "user", "content": "How do refunds work?"},
+        {"role": "assistant", "content": "Within 30 days."},
+    ]
+
+
+def test_reuse_needs_a_fresh_retrieval_first():
+    assert Session("s1").reusable_contexts([0.0, 0.0], top_k=1) is None
+
+
+def test_cached_chunks_reused_within_radius():
+    session = Session("s1")
+    session.remember(lookup(["a", "b"], [[0.0, 0.0], [1.0, 0.0]], [0.0, 1.0]))
+    assert session.radius == 1.0
+
+    contexts = session.reusable_contexts([0.1, 0.0], top_k=2)
+    assert [context['text'] for context in contexts] == ["text of a", "text of b"]
+    assert abs(contexts[0]['distance'] - 0.01) < 1e-6
+
+    # The second-nearest cached chunk is farther than the last retrieval reached
+    assert session.reusable_contexts([5.0, 0.0], top_k=2) is None
+    assert session.reusable_contexts([0.1, 0.0], top_k=3) is None
+
+
+def test_reuse_respects_filters():
+    session = Session("s1")
+    session.remember(lookup(
+        ["a", "b"], [[0.0, 0.0], [0.5, 0.0]], [0.0, 0.5],
+        metadatas=[{'tag_docs': True}, {}]
+    ))
+    contexts = session.reusable_contexts([0.4, 0.0], top_k=1, where={'tag_docs': True})
+    assert [context['text'] for context in contexts] == ["text of a"]
+
+
+def test_remember_ignores_results_without_embeddings(monkeypatch):
+    session = Session("s1")
+    session.remember({'ids': [["a"]], 'documents': [["x"]], 'metadatas': [[{}]], 'distances': [[0.1]], 'embeddings': None})
+    assert not session.chunks and session.radius is None
+
+    monkeypatch.setattr(config, "SESSION_MAX_CHUNKS", 2)
+    session.remember(lookup(["a", "b", "c"], [[0.0], [1.0], [2.0]], [0.0, 1.0, 2.0]))
+    assert list(session.chunks) == ["b", "c"]
+
+
+def test_store_evicts_least_recently_used():
+    store = ConversationStore(ttl_seconds=60, max_sessions=2)
+    first = store.get_or_create("a")
+    store.get_or_create("b")
+    assert store.get_or_create("a") is first
+    store.get_or_create("c")
+    assert len(store) == 2
+    assert store.delete("a")
+    assert not store.delete("b")
+
+
+def test_store_expires_idle_sessions(monkeypatch):
+    store = ConversationStore(ttl_seconds=10, max_sessions=5)
+    clock = [100.0]
+    monkeypatch.setattr("sessions.time.monotonic", lambda: clock[0])
+    first = store.get_or_create("a")
+    clock[0] += 11
+    assert store.get_or_create("a") is not first
+    assert len(store) == 1
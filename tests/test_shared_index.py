@@ -0,0 +1,131 @@
+import os
+
+import numpy as np
+import pytest
+
+import config
+import search_filters
+import shared_index
+from shared_index import SharedIndex, _Snapshot, snapshot_source, write_snapshot
+
+
+def corpus(count=50, dimensions=8, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimensions)).astype(np.float32)
+    ids = [f"chunk_{i}" for i in range(count)]
+    documents = [f"document {i}" for i in range(count)]
+    metadatas = [{'url': f"https://example.com/{i}", 'tag_even': True} if i % 2 == 0 else {} for i in range(count)]
+    return ids, documents, metadatas, vectors
+
+
+def nearest(vectors, query, k, rows=None):
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    distances = ((vectors[rows] - query) ** 2).sum(axis=1)
+    return [f"chunk_{i}" for i in rows[np.argsort(distances)[:k]]]
+
+
+def test_query_matches_brute_force(tmp_path):
+    ids, documents, metadatas, vectors = corpus()
+    write_snapshot(ids, documents, metadatas, vectors, str(tmp_path), projection_method="none")
+    index = SharedIndex(str(tmp_path), check_interval=0)
+    queries = vectors[:3] + 0.01
+
+    results = index.query(queries.tolist(), n_results=4)
+    for query, found in zip(queries, results['ids']):
+        assert found == nearest(vectors, query, 4)
+    assert results['documents'][0][0] == "document 0"
+    assert results['metadatas'][0][0] == metadatas[0]
+    assert results['distances'][0][0] == pytest.approx(float(((queries[0] - vectors[0]) ** 2).sum()), abs=1e-4)
+
+
+def test_filters_restrict_candidates(tmp_path):
+    ids, documents, metadatas, vectors = corpus()
+    write_snapshot(ids, documents, metadatas, vectors, str(tmp_path), projection_method="none")
+    index = SharedIndex(str(tmp_path), check_interval=0)
+
+    results = index.query([vectors[1].tolist()], n_results=3, where={'tag_even': True})
+    assert results['ids'][0] == nearest(vectors, vectors[1], 3, rows=range(0, 50, 2))
+    empty = index.query([vectors[1].tolist()], n_results=3, where={'tag_missing': True})
+    assert empty['ids'] == [[]]
+
+
+def test_filters_use_memory_mapped_codes(tmp_path):
+    ids, documents, metadatas, vectors = corpus(count=20)
+    for i, metadata in enumerate(metadatas):
+        metadata.update(search_filters.chunk_metadata({'url': f"https://example.com/{'docs' if i < 10 else 'blog'}/{i}"}))
+        metadata['title'] = f"Title {i % 3}"
+    version = write_snapshot(ids, documents, metadatas, vectors, str(tmp_path), projection_method="none")
+    snapshot = _Snapshot(str(tmp_path / version), version)
+    assert isinstance(snapshot.filter_codes, np.memmap)
+    assert snapshot.filter_codes.shape[0] == 20
+
+    def scan(where):
+        return [i for i, metadata in enumerate(metadatas) if search_filters.matches(metadata, where)]
+
+    filters = [
+        {'url_prefix': "https://example.com/docs"},
+        {'url_prefix': "/blog", 'tags': ["even"], 'title': "Title 1"},
+        {'title': "Title 9"},
+        {'tags': ["missing"]},
+        {'url_prefix': "https://other.com/"},
+    ]
+    for filters_ in filters:
+        where = search_filters.build_where(filters_)
+        assert snapshot._filter_mask(where) is not None
+        assert snapshot.filter_rows(where).tolist() == scan(where)
+
+    # Keys without codes fall back to scanning the metadata
+    assert snapshot._filter_mask({'url': "https://example.com/4"}) is None
+    assert snapshot.filter_rows({'url': "https://example.com/4"}).tolist() == [4]
+
+
+def test_snapshots_without_filter_codes_still_filter(tmp_path):
+    ids, documents, metadatas, vectors = corpus(count=10)
+    version = write_snapshot(ids, documents, metadatas, vectors, str(tmp_path), projection_method="none")
+    os.remove(tmp_path / version / shared_index.FILTER_KEYS_FILE)
+    snapshot = _Snapshot(str(tmp_path / version), version)
+    assert snapshot.filter_codes is None
+    assert snapshot.filter_rows({'tag_even': True}).tolist() == [0, 2, 4, 6, 8]
+
+
+def test_empty_directory_serves_nothing(tmp_path):
+    index = SharedIndex(str(tmp_path), check_interval=0)
+    assert index.version is None and index.count() == 0
+    assert index.query([[0.0, 1.0]], n_results=3)['ids'] == [[]]
+    assert snapshot_source(str(tmp_path)) is None
+
+
+def test_new_snapshot_is_picked_up_and_old_ones_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SHARED_INDEX_KEEP", 2)
+    ids, documents, metadatas, vectors = corpus()
+    write_snapshot(ids, documents, metadatas, vectors, str(tmp_path), version="001", projection_method="none")
+    index = SharedIndex(str(tmp_path), check_interval=0)
+    assert index.version == "001" and index.count() == 50
+
+    write_snapshot(ids[:10], documents[:10], metadatas[:10], vectors[:10], str(tmp_path), version="002",
+                   projection_method="none", source={'collection_id': "abc", 'count': 10})
+    write_snapshot(ids[:5], documents[:5], metadatas[:5], vectors[:5], str(tmp_path), version="003",
+                   projection_method="none")
+    assert index.count() == 5 and index.version == "003"
+    assert sorted(os.listdir(tmp_path)) == ["002", "003", shared_index.CURRENT_POINTER]
+    # The current snapshot (003) records no source
+    assert snapshot_source(str(tmp_path)) is None
+
+
+def test_export_records_source_collection(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SHARED_INDEX_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(config, "PROJECTION_METHOD", "none")
+    assert not store.shared_snapshot_is_current()
+
+    store.collection.add(ids=["a", "b"], embeddings=[[1.0, 0.0], [0.0, 1.0]],
+                         documents=["alpha", "beta"], metadatas=[{'n': 1}, {'n': 2}])
+    store.export_shared_snapshot()
+    source = snapshot_source()
+    assert source == {'collection': store.collection_name, 'collection_id': str(store.collection.id), 'count': 2}
+    assert store.shared_snapshot_is_current()
+
+    index = SharedIndex(check_interval=0)
+    assert index.query([[0.9, 0.1]], n_results=1)['documents'] == [["alpha"]]
+
+    store.collection.add(ids=["c"], embeddings=[[1.0, 1.0]], documents=["gamma"], metadatas=[{'n': 3}])
+    assert not store.shared_snapshot_is_current()
@@ -5,6 +5,7 @@ import re
 import tiktoken
 from typing import List, Dict
 import config
+import metrics
 
 
 class TextProcessor:
@@ -80,7 +81,12 @@ class TextProcessor:
         """
         Process multiple documents into chunks
         Each document should have 'content', 'url', and 'title'
+        (and may have 'tags', used by search filters)
         """
+        with metrics.span("process_documents"):
+            return self._process_documents(documents)
+    
+    def _process_documents(self, documents: List[Dict[str, str]]) -> List[Dict[str, any]]:
         all_chunks = []
         
         for doc in documents:
@@ -96,6 +102,8 @@ class TextProcessor:
                 'url': url,
                 'title': title
             }
+            if doc.get('tags'):
+                metadata['tags'] = doc['tags']
             
             # Chunk the document
             chunks = self.chunk_text(content, metadata)
@@ -1,136 +1,535 @@
 """
 Vector database for storing and retrieving embeddings
 """
-import chromadb
-from chromadb.config import Settings
-from openai import OpenAI
 from typing import List, Dict, Optional
+from datetime import datetime
+import threading
+import time
+import uuid
+import clients
 import config
+import embeddings
+import index_versions
+import metrics
+import retrieval_cache
+import search_filters
+
+
+class CollectionStats:
+    """
+    Cached statistics for one collection
+    Kept up to date by add/delete/reset so hot paths rarely query Chroma for
+    them; checked against collection.count() every
+    COLLECTION_STATS_REFRESH_SECONDS to pick up writes from other processes
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.url_counts: Dict[str, int] = {}
+        self.last_indexed_at: Optional[str] = None
+        self.checked_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def load(cls, collection, page_size: int = 1000) -> "CollectionStats":
+        """Build stats from an existing collection (one-off scan)"""
+        stats = cls()
+        total = collection.count()
+        for offset in range(0, total, page_size):
+            page = collection.get(include=['metadatas'], limit=page_size, offset=offset)
+            stats.record_add(page['metadatas'], timestamp=None)
+        return stats
+    
+    def record_add(self, metadatas: List[Dict], timestamp: Optional[str] = ""):
+        """Account for newly added chunks; pass timestamp=None to leave last_indexed_at unchanged"""
+        with self.lock:
+            self.count += len(metadatas)
+            for metadata in metadatas:
+                url = (metadata or {}).get('url', '')
+                self.url_counts[url] = self.url_counts.get(url, 0) + 1
+            if timestamp is not None:
+                self.last_indexed_at = timestamp or datetime.now().isoformat()
+    
+    def to_dict(self) -> Dict:
+        with self.lock:
+            return {
+                'total_chunks': self.count,
+                'pages_indexed': len(self.url_counts),
+                'chunks_per_url': dict(self.url_counts),
+                'last_indexed_at': self.last_indexed_at
+            }
+
+
+# Stats per collection name, shared by every VectorStore in the process so
+# that chunks added by an Indexer are reflected in the serving engine
+_collection_stats: Dict[str, CollectionStats] = {}
+_collection_stats_lock = threading.Lock()
+
+# Names of collections whose embedding tag matches this process's provider
+_checked_collections = set()
+
+# Fields of a cached query result
+RESULT_KEYS = ('ids', 'documents', 'metadatas', 'distances')
+
+# Collections created before tagging were filled by the OpenAI default
+LEGACY_EMBEDDING_TAG = {
+    'embedding_provider': 'openai',
+    'embedding_model': 'text-embedding-ada-002',
+    'embedding_dimensions': 1536
+}
 
 
 class VectorStore:
     """Manages vector embeddings storage and retrieval using ChromaDB"""
     
     def __init__(self):
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+        # Shared, pooled clients from the process-wide registry
+        self.client = clients.get_openai_client()
+        self.chroma_client = clients.get_chroma_client()
+        # Chunks and queries are embedded by the provider chosen in config
+        self.embedder = embeddings.get_embedding_provider()
+        
+        # The active collection is chosen by the index pointer so that
+        # rebuilds can happen in a fresh collection (blue/green)
+        self._collection = None
+        self._collection_name = None
+        self._pointer_mtime = None
+        self._pointer_checked_at = 0.0
+        self._pointer_writes = None
+        self._pinned = False
+        self._activation_lock = threading.Lock()
+        self._sync_active_collection()
         
-        # Initialize ChromaDB
-        self.chroma_client = chromadb.Client(Settings(
-            persist_directory=config.CHROMA_PERSIST_DIRECTORY,
-            anonymized_telemetry=False
-        ))
+        # In multi-worker serving, queries are answered from a shared
+        # memory-mapped snapshot instead of this process's collection
+        self.shared_index = None
+        if config.SHARED_INDEX_ENABLED:
+            from shared_index import SharedIndex
+            self.shared_index = SharedIndex()
         
-        # Get or create collection
+        # Results of repeated queries, keyed on the collection version (see retrieval_cache.py)
+        self.retrieval_cache = retrieval_cache.get_retrieval_cache()
+        
+        # Query micro-batcher is started lazily on first query
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+    
+    @property
+    def collection(self):
+        """The active collection, following pointer swaps made by other VectorStores"""
+        self._check_pointer()
+        return self._collection
+    
+    @property
+    def collection_name(self) -> str:
+        self._check_pointer()
+        return self._collection_name
+    
+    @property
+    def index_version(self) -> str:
+        """Version label of the active collection"""
+        return index_versions.version_of(self.collection_name)
+    
+    @property
+    def collection_version(self) -> str:
+        """
+        Changes whenever query results may change: the shared snapshot
+        version, or else the active collection's id (new on activation and
+        reset) and its cached chunk count. Writes made by this process show
+        up at once; chunks added or versions activated by other processes
+        (indexer CLI, distributed coordinator) within
+        COLLECTION_STATS_REFRESH_SECONDS, without a Chroma call per query
+        """
+        if self.shared_index is not None:
+            self.shared_index.maybe_reload()
+            return f"snapshot:{self.shared_index.version}"
+        collection = self.collection
+        return f"{collection.id}:{self._stats_for(collection).count}"
+    
+    def _check_pointer(self):
+        """
+        Resync if the index pointer changed since we last read it
+        Pointer writes by this process are followed at once; the file is
+        checked for other processes' writes every COLLECTION_STATS_REFRESH_SECONDS
+        """
+        if self._pinned:
+            return
+        now = time.monotonic()
+        if (self._pointer_writes == index_versions.local_writes()
+                and now - self._pointer_checked_at < config.COLLECTION_STATS_REFRESH_SECONDS):
+            return
+        self._pointer_checked_at = now
+        self._pointer_writes = index_versions.local_writes()
+        if index_versions.pointer_mtime() != self._pointer_mtime:
+            self._sync_active_collection()
+    
+    def pin_collection(self, name: str):
+        """
+        Serve this store from a specific collection, ignoring the index pointer
+        Used to evaluate build collections or old versions without activating them
+        """
+        with self._activation_lock:
+            self._collection = self.chroma_client.get_collection(name=name)
+            self._collection_name = name
+            self._pinned = True
+    
+    def unpin_collection(self):
+        """Follow the index pointer again"""
+        self._pinned = False
+        self._pointer_mtime = None
+        self._pointer_writes = None
+        self._sync_active_collection()
+    
+    def _get_or_create(self, name: str):
+        """Get a collection by name, creating it if it does not exist"""
         try:
-            self.collection = self.chroma_client.get_collection(
-                name=config.COLLECTION_NAME
-            )
-            print(f"Loaded existing collection: {config.COLLECTION_NAME}")
+            collection = self.chroma_client.get_collection(name=name)
+            print(f"Loaded existing collection: {name}")
         except:
-            self.collection = self.chroma_client.create_collection(
-                name=config.COLLECTION_NAME,
-                metadata={"description": "Website content embeddings"}
+            collection = self.chroma_client.create_collection(
+                name=name,
+                metadata=self._collection_metadata()
             )
-            print(f"Created new collection: {config.COLLECTION_NAME}")
+            print(f"Created new collection: {name}")
+        return collection
     
-    def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for a text using OpenAI API"""
+    def _sync_active_collection(self):
+        """Point this store at the collection named by the index pointer"""
+        with self._activation_lock:
+            self._pointer_mtime = index_versions.pointer_mtime()
+            active = index_versions.read_pointer()['active']
+            if active != self._collection_name:
+                self._collection = self._get_or_create(active)
+                self._collection_name = active
+    
+    def create_build_collection(self):
+        """
+        Create a fresh versioned collection for a rebuild
+        The active collection keeps serving until activate_collection is called
+        """
+        name = index_versions.new_collection_name()
+        collection = self.chroma_client.create_collection(
+            name=name,
+            metadata=self._collection_metadata()
+        )
+        _collection_stats[name] = CollectionStats()
+        print(f"Created build collection: {name}")
+        return collection
+    
+    def discard_collection(self, collection):
+        """Drop a build collection that will not be activated"""
         try:
-            response = self.client.embeddings.create(
-                input=text,
-                model=config.EMBEDDING_MODEL
+            self.chroma_client.delete_collection(name=collection.name)
+            _collection_stats.pop(collection.name, None)
+            print(f"Discarded build collection: {collection.name}")
+        except Exception:
+            pass
+    
+    def activate_collection(self, name: str, keep: int = None):
+        """
+        Atomically make a collection the live one
+        Keeps the `keep` most recent previous versions for rollback and deletes older ones
+        """
+        keep = config.INDEX_KEEP_VERSIONS if keep is None else keep
+        pointer = index_versions.read_pointer()
+        previous = pointer['active']
+        history = [n for n in [previous] + pointer.get('history', []) if n != name]
+        
+        index_versions.write_pointer(name, history[:keep])
+        self._sync_active_collection()
+        print(f"Activated collection: {name} (version {self.index_version})")
+        
+        for old_name in history[keep:]:
+            try:
+                self.chroma_client.delete_collection(name=old_name)
+                _collection_stats.pop(old_name, None)
+                print(f"Deleted old collection: {old_name}")
+            except Exception:
+                pass
+    
+    def rollback(self) -> Optional[str]:
+        """Reactivate the most recent previous version; returns its name, or None if there is none"""
+        pointer = index_versions.read_pointer()
+        history = pointer.get('history', [])
+        if not history:
+            return None
+        
+        target, rest = history[0], history[1:]
+        index_versions.write_pointer(target, [pointer['active']] + rest)
+        self._sync_active_collection()
+        print(f"Rolled back to collection: {target}")
+        return target
+    
+    def _collection_metadata(self) -> Dict:
+        """Metadata for new collections, tagged with the embedding provider that fills them"""
+        return {"description": "Website content embeddings", **self.embedder.tag()}
+    
+    def _check_embedder(self, collection):
+        """
+        Refuse to mix embeddings: raise ValueError if the collection was
+        filled by a different provider, model or dimension
+        Collections from before tagging hold OpenAI ada-002 vectors; empty
+        untagged collections are tagged for the current provider
+        """
+        if collection.name in _checked_collections:
+            return
+        metadata = collection.metadata or {}
+        tag = self.embedder.tag()
+        if 'embedding_provider' not in metadata:
+            if self._stats_for(collection).count == 0:
+                collection.modify(metadata={**metadata, **tag})
+                metadata = tag
+            else:
+                metadata = LEGACY_EMBEDDING_TAG
+        stored = {key: metadata.get(key) for key in tag}
+        if stored != tag:
+            raise ValueError(
+                f"Collection {collection.name} holds {stored['embedding_provider']}/{stored['embedding_model']} "
+                f"embeddings ({stored['embedding_dimensions']} dimensions) but the configured provider is "
+                f"{tag['embedding_provider']}/{tag['embedding_model']} ({tag['embedding_dimensions']} dimensions); "
+                f"rebuild the index or change EMBEDDING_PROVIDER"
             )
-            return response.data[0].embedding
+        _checked_collections.add(collection.name)
+    
+    def _stats_for(self, collection, refresh: bool = False) -> CollectionStats:
+        """
+        Cached stats for a collection, scanning it once if not seen before
+        Rescanned when its Chroma count no longer matches, checked every
+        COLLECTION_STATS_REFRESH_SECONDS (or now, with refresh=True)
+        """
+        stats = _collection_stats.get(collection.name)
+        metrics.record_cache("collection_stats", stats is not None)
+        if stats is None or refresh or time.monotonic() - stats.checked_at > config.COLLECTION_STATS_REFRESH_SECONDS:
+            with _collection_stats_lock:
+                current = _collection_stats.get(collection.name)
+                if current is not None and current is not stats:
+                    # Another thread loaded or refreshed it meanwhile
+                    return current
+                if current is not None and collection.count() == current.count:
+                    current.checked_at = time.monotonic()
+                    return current
+                stats = CollectionStats.load(collection)
+                if current is not None:
+                    stats.last_indexed_at = current.last_indexed_at
+                    print(f"Collection {collection.name} changed outside this process; reloaded its stats")
+                _collection_stats[collection.name] = stats
+        return stats
+    
+    def generate_embedding(self, text: str) -> List[float]:
+        """Generate embedding for a text with the configured provider"""
+        return self.generate_embeddings([text])[0]
+    
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts in as few provider calls as possible"""
+        try:
+            return self.embedder.embed(texts)
         except Exception as e:
-            print(f"Error generating embedding: {str(e)}")
+            print(f"Error generating embeddings: {str(e)}")
             raise
     
-    def add_documents(self, chunks: List[Dict[str, any]], batch_size: int = 100):
+    def add_documents(self, chunks: List[Dict[str, any]], batch_size: int = 100, collection=None,
+                      embeddings: List[List[float]] = None):
         """
         Add document chunks to the vector store
         Processes in batches for efficiency
+        
+        Pass `collection` (from create_build_collection) to fill a new
+        version instead of the active collection, and `embeddings`
+        (aligned with `chunks`) when they were computed elsewhere
         """
+        with metrics.span("add_documents"):
+            self._add_documents(chunks, batch_size, collection, embeddings)
+    
+    def _add_documents(self, chunks: List[Dict[str, any]], batch_size: int, collection, precomputed):
+        target = collection if collection is not None else self.collection
+        self._check_embedder(target)
+        # Fresh counts, in case another process wrote to the collection since the last check
+        stats = self._stats_for(target, refresh=True)
         print(f"Adding {len(chunks)} chunks to vector store...")
         
         for i in range(0, len(chunks), batch_size):
             batch = chunks[i:i + batch_size]
             
+            # One provider call embeds the whole batch
+            if precomputed is not None:
+                embeddings = list(precomputed[i:i + batch_size])
+            else:
+                embeddings = self.generate_embeddings([chunk['text'] for chunk in batch])
+            
             # Prepare batch data
             documents = []
-            embeddings = []
             metadatas = []
             ids = []
             
-            for idx, chunk in enumerate(batch):
-                chunk_id = f"chunk_{i + idx}"
+            for chunk in batch:
+                # Random ids never collide with chunks added by other processes
+                chunk_id = f"chunk_{uuid.uuid4().hex}"
                 text = chunk['text']
                 
-                # Generate embedding
-                embedding = self.generate_embedding(text)
-                
                 # Prepare metadata
                 metadata = {
                     'url': chunk.get('url', ''),
                     'title': chunk.get('title', ''),
                     'chunk_index': chunk.get('chunk_index', 0),
-                    'token_count': chunk.get('token_count', 0)
+                    'token_count': chunk.get('token_count', 0),
+                    # Host, path segments and tags, for filtered queries
+                    **search_filters.chunk_metadata(chunk)
                 }
                 
                 documents.append(text)
-                embeddings.append(embedding)
                 metadatas.append(metadata)
                 ids.append(chunk_id)
             
             # Add to collection
-            self.collection.add(
+            target.add(
                 documents=documents,
                 embeddings=embeddings,
                 metadatas=metadatas,
                 ids=ids
             )
+            stats.record_add(metadatas)
             
             print(f"Added batch {i // batch_size + 1}/{(len(chunks) - 1) // batch_size + 1}")
         
         print("All chunks added successfully!")
     
-    def query(self, query_text: str, n_results: int = 5) -> Dict:
+    def query(self, query_text: str, n_results: int = 5, where: Optional[Dict] = None) -> Dict:
         """
         Query the vector store with a question
-        Returns top k most similar chunks
+        Returns top k most similar chunks, restricted to chunks whose
+        metadata matches `where` (see search_filters.build_where)
+        
+        When query batching is enabled, concurrent callers are coalesced
+        into one embeddings call and one collection lookup
         """
-        # Generate embedding for the query
-        query_embedding = self.generate_embedding(query_text)
+        with metrics.span("vector_store_query"):
+            if config.QUERY_BATCH_ENABLED:
+                return self._get_batcher().submit(query_text, n_results=n_results, where=where)
+            
+            # Generate embedding for the query
+            query_embedding = self.generate_embedding(query_text)
+            
+            # Query the collection
+            return self.query_by_embeddings([query_embedding], n_results, where)
+    
+    def embed_query(self, query_text: str) -> List[float]:
+        """Embedding for a query, coalesced with concurrent queries when batching is enabled"""
+        if config.QUERY_BATCH_ENABLED:
+            return self._get_batcher().embed(query_text)
+        return self.generate_embedding(query_text)
+    
+    def query_by_embeddings(self, query_embeddings: List[List[float]], n_results: int,
+                            where: Optional[Dict] = None, include_embeddings: bool = False) -> Dict:
+        """
+        Run a nearest-neighbour lookup against the shared snapshot or the collection
+        Embeddings already searched with the same n_results and filter
+        against the current collection version are answered from the
+        retrieval cache; only the rest are searched
+        """
+        with metrics.span("vector_search"):
+            if self.retrieval_cache is None or include_embeddings:
+                return self._search(query_embeddings, n_results, where, include_embeddings)
+            
+            version = self.collection_version
+            keys = [self.retrieval_cache.key(e, n_results, where, version) for e in query_embeddings]
+            cached = [self.retrieval_cache.get(key) for key in keys]
+            for result in cached:
+                metrics.record_cache("retrieval", result is not None)
+            misses = [i for i, result in enumerate(cached) if result is None]
+            
+            if misses:
+                from query_batcher import split_results
+                results = self._search([query_embeddings[i] for i in misses], n_results, where)
+                for position, i in enumerate(misses):
+                    single = split_results(results, position, n_results)
+                    cached[i] = {key: single[key] for key in RESULT_KEYS}
+                    self.retrieval_cache.put(keys[i], cached[i])
+            
+            return {key: [result[key][0] for result in cached] for key in RESULT_KEYS}
+    
+    def _search(self, query_embeddings: List[List[float]], n_results: int, where: Optional[Dict],
+                include_embeddings: bool = False) -> Dict:
+        if self.shared_index is not None:
+            return self.shared_index.query(
+                query_embeddings, n_results=n_results, where=where, include_embeddings=include_embeddings
+            )
         
-        # Query the collection
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
+        self._check_embedder(self.collection)
+        include = ['documents', 'metadatas', 'distances']
+        if include_embeddings:
+            include.append('embeddings')
+        return self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where,
+            include=include
         )
-        
-        return results
+    
+    def _get_batcher(self):
+        """Create the query batcher on first use"""
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    from query_batcher import QueryBatcher
+                    self._batcher = QueryBatcher(self)
+        return self._batcher
     
     def get_collection_count(self) -> int:
-        """Get the number of documents in the collection"""
-        return self.collection.count()
+        """Get the number of documents in the collection (cached, no Chroma round trip)"""
+        if self.shared_index is not None:
+            return self.shared_index.count()
+        return self._stats_for(self.collection).count
+    
+    def get_collection_stats(self) -> Dict:
+        """Cached statistics for the active collection: counts per URL and last index time"""
+        stats = self._stats_for(self.collection).to_dict()
+        if self.shared_index is not None:
+            stats['total_chunks'] = self.shared_index.count()
+        return stats
+    
+    def shared_snapshot_is_current(self) -> bool:
+        """Whether the current shared snapshot was exported from the active collection as it is now"""
+        from shared_index import snapshot_source
+        collection = self.collection
+        source = snapshot_source()
+        return (source is not None and source.get('collection_id') == str(collection.id)
+                and source.get('count') == collection.count())
+    
+    def export_shared_snapshot(self) -> str:
+        """Publish the collection as a new shared snapshot for serving workers"""
+        from shared_index import export_snapshot
+        version = export_snapshot(self.collection)
+        if self.shared_index is not None:
+            self.shared_index.maybe_reload(force=True)
+        return version
     
     def delete_collection(self):
-        """Delete the collection"""
-        self.chroma_client.delete_collection(name=config.COLLECTION_NAME)
-        print(f"Deleted collection: {config.COLLECTION_NAME}")
+        """Delete the active collection"""
+        name = self.collection_name
+        self.chroma_client.delete_collection(name=name)
+        _collection_stats.pop(name, None)
+        _checked_collections.discard(name)
+        print(f"Deleted collection: {name}")
     
     def reset_collection(self):
-        """Reset the collection by deleting and recreating it"""
+        """
+        Reset the active collection by deleting and recreating it
+        Queries see an empty store until it is refilled; use
+        create_build_collection/activate_collection for zero-downtime rebuilds
+        """
+        name = self.collection_name
         try:
             self.delete_collection()
         except:
             pass
         
-        self.collection = self.chroma_client.create_collection(
-            name=config.COLLECTION_NAME,
-            metadata={"description": "Website content embeddings"}
-        )
-        print(f"Reset collection: {config.COLLECTION_NAME}")
+        with self._activation_lock:
+            self._collection = self.chroma_client.create_collection(
+                name=name,
+                metadata=self._collection_metadata()
+            )
+        _collection_stats[name] = CollectionStats()
+        print(f"Reset collection: {name}")
 
 
 if __name__ == "__main__":